@@ -8,29 +8,14 @@ import streamlit as st
 import warnings
 
 # --- Importaciones Clave de LangChain ---
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings, ChatOllama # ChatOllama es necesario para Agentes
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain.tools import tool # El decorador para crear herramientas
-from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage
 from langgraph.checkpoint.memory import InMemorySaver 
 
-# Importar tools desde archivo externo
-from tools_celsia import (
-    get_telefono_celsia,
-    get_social_media_celsia,
-    get_pqr_celsia,
-    get_direccion_celsia,
-    get_pago_de_factura_celsia,
-    generar_factura_simulada,
-    verificar_estado_servicio,
-    calcular_instalacion_solar,
-    reportar_dano_servicio,
-    consultar_estado_reporte
-)
+# Componentes compartidos con la API (main.py): embeddings, Chroma, clientes de
+# Ollama y herramientas se crean una sola vez por proceso y sobreviven a los reruns.
+from src.agent.core import extract_final_response, load_agent_and_rag_components
+from src.agent.factory import get_retriever, get_vectorstore
+from src.utils.config import EMBEDDING_MODEL, OLLAMA_ROUTER_MODEL, OLLAMA_RAG_MODEL
 
 # Ignorar advertencias (opcional, para limpiar la consola)
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -41,6 +26,10 @@ warnings.filterwarnings("ignore", category=UserWarning)
 if "checkpointer" not in st.session_state:
     st.session_state.checkpointer = InMemorySaver()
 
+# Grafos de esta sesión, uno por combinación de parámetros (usan su checkpointer)
+if "agentes" not in st.session_state:
+    st.session_state.agentes = {}
+
 # Thread ID: Un ID fijo para que la conversación sea continua
 if "thread_id" not in st.session_state:
     st.session_state.thread_id = "1" 
@@ -76,165 +65,25 @@ st.write("En que puedo ayudarte hoy?")
 
 
 # --- FUNCIÓN PRINCIPAL DE CARGA (Cacheada) ---
-# Ya no usamos cache porque queremos que los parámetros sean dinámicos
+# Los componentes pesados se cachean en src/agent/factory.py; mover un slider solo
+# arma de nuevo los wrappers del LLM (milisegundos). Cada combinación se guarda en
+# la sesión, junto a su checkpointer, y se libera con ella.
 def cargar_agente_y_rag(temperature=0.5, top_k=40, top_p=0.9, retriever_k=5):
     """
-    Esta función carga todos los componentes (VectorDB, LLM, RAG chain)
-    y construye el Agente final con parámetros configurables.
+    Devuelve el Agente para estos parámetros, el retriever y el vectorstore
+    compartidos (para depurar y mostrar información de la base de datos).
     """
-    
-    with st.spinner("⏳ Iniciando sistemas... (esto puede tardar un momento)"):
-        
-        # --- 1. Configuración del LLM ---
-        # Usamos ChatOllama para que el agente pueda tener conversaciones
-        llm = ChatOllama(
-            model="qwen3:4b",
-            base_url="http://localhost:11434",
+    clave = (temperature, top_k, top_p, retriever_k)
+    if clave not in st.session_state.agentes:
+        st.session_state.agentes[clave] = load_agent_and_rag_components(
             temperature=temperature,
             top_k=top_k,
-            top_p=top_p
-        )
-
-        # --- 2. Configuración de Embeddings y Vectorstore (Retriever) ---
-        embeddings = OllamaEmbeddings(
-            model="nomic-embed-text",
-            base_url="http://localhost:11434"
-        )
-        
-        vectorstore = Chroma(
-            persist_directory="./chromadb_storage",
-            embedding_function=embeddings,
-            collection_name="rag_collection"
-        )
-        
-        # El 'retriever' es la parte que busca en la base de datos
-        # Usamos MMR (Maximum Marginal Relevance) para obtener mayor diversidad
-        retriever = vectorstore.as_retriever(
-            search_type="mmr",
-            search_kwargs={
-                "k": retriever_k,  # Documentos finales a retornar
-                "fetch_k": retriever_k * 4,  # Documentos iniciales a buscar (más pool para diversidad)
-                "lambda_mult": 0.5  # Balance entre relevancia (1.0) y diversidad (0.0)
-            }
-        )
-        
-        # --- 3. Definición de la Cadena RAG ---
-        # Este es el "cerebro" de nuestra herramienta de búsqueda.
-        
-        prompt_rag = PromptTemplate(
-            template="""**[ROL Y MISIÓN MAESTRA: ASISTENTE OFICIAL DE DOCUMENTOS CELSIA]**
-Eres el **Buscador Oficial de Documentos de CELSIA**. Tu función es la de un **Agente RAG (Retrieval-Augmented Generation) de Zero-Shot**.
-Tu fuente de conocimiento es **ÚNICAMENTE** el **CONTEXTO** proporcionado. Tu misión es extraer y presentar la información más relevante para la **PREGUNTA** con un 100% de **fidelidad a la fuente**.
-
-**[PROTOCOLO ESTRICTO DE RESPUESTA Y ANTI-ALUCINACIÓN]**
-
-Tu proceso de respuesta es inflexible:
-
-1.  **ANÁLISIS DE AUTORIDAD (CONTEXTO):** Lee el **CONTEXTO**. Este es tu único universo de datos.
-2.  **IDENTIFICACIÓN Y VERIFICACIÓN:** Localiza la información que responde a la **PREGUNTA**.
-    * *Definición Implícita:* Una respuesta implícita es una conclusión lógica e irrefutable que puede ser deducida **directamente** de dos o más hechos presentes en el CONTEXTO (no una inferencia o adivinanza).
-3.  **FORMULACIÓN Y SÍNTESIS:** Genera una respuesta cortés, profesional, **directa y amable**, utilizando el lenguaje y los términos exactos del CONTEXTO.
-
-**[REGLAS INQUEBRANTABLES (GUARDRAILS DE SEGURIDAD)]**
-
-1.  **CONDICIÓN DE ÉXITO:** **SI** la respuesta puede ser verificada explícita o lógicamente (implícitamente) con la información del CONTEXTO, procede con la respuesta.
-2.  **CONDICIÓN DE FALLO/CERO INFORMACIÓN:** **SI** la respuesta no existe, la información es contradictoria, insuficiente, ambigua, o no se puede verificar con certeza, debes responder **ÚNICAMENTE** con esta frase, sin preámbulos ni explicaciones adicionales:
-    > "Lamento no poder ofrecer una respuesta precisa basada en la información disponible. Por favor, consulta los canales oficiales de CELSIA o llama a la línea de servicio al cliente."
-3.  **PROHIBICIONES ABSOLUTAS:**
-    * **NUNCA** utilices conocimiento general, fechas, tarifas, procesos, o cualquier dato que no figure en el CONTEXTO.
-    * **NUNCA** intentes rellenar huecos o especular.
-    * **NUNCA** reformules la frase de *fallback* (Regla 2).
-
-**[VERIFICACIÓN FINAL (Self-Check)]**
-Antes de entregar la respuesta, realiza una auto-corrección: ¿Cada afirmación en la respuesta se deriva **directamente** del CONTEXTO? Si la respuesta es No, activa la Condición de Fallo (Regla 2).
-
-Contexto:
-{context}
-
-Pregunta: {question}
-
-Respuesta:""",
-            input_variables=["context", "question"]
-        )
-        
-        def formato_docs(docs):
-            return "\n\n".join([doc.page_content for doc in docs])
-        
-        # Definimos la cadena RAG completa
-        rag_chain = (
-            {"context": retriever | formato_docs, "question": RunnablePassthrough()}
-            | prompt_rag
-            | llm # El mismo LLM puede usarse para la cadena RAG
-            | StrOutputParser() # Nos aseguramos que la salida sea un string
-        )
-
-        # --- 4. HERRAMIENTA 2: La Cadena RAG como Herramienta ---
-        # Aquí convertimos nuestra 'rag_chain' en una herramienta que el agente puede usar
-        @tool
-        def BuscadorDocumentosCelsia(pregunta: str) -> str:
-            """
-            Herramienta para buscar información en la base de datos de Celsia.
-            """
-            return rag_chain.invoke(pregunta)
-
-        # --- 5. Creación del Agente ---
-        
-        # Lista de herramientas que el agente puede elegir
-        tools = [
-            # Tools informativas
-            get_telefono_celsia,
-            get_direccion_celsia,
-            get_social_media_celsia,
-            get_pqr_celsia,
-            get_pago_de_factura_celsia,
-            # Tools funcionales
-            generar_factura_simulada,
-            verificar_estado_servicio,
-            calcular_instalacion_solar,
-            reportar_dano_servicio,
-            consultar_estado_reporte,
-            # Tool RAG
-            BuscadorDocumentosCelsia
-        ]
-        
-        # Prompt del sistema: Las instrucciones maestras para el Agente
-        system_prompt_agent = """Eres un asistente virtual de Celsia.
-Tu trabajo es ayudar a los usuarios con sus preguntas. Responde siempre en español.
-
-**IMPORTANTE - Orden de prioridad para usar herramientas:**
-
-1. **PRIMERO**: Analiza si la pregunta solicita información específica que puedes obtener con las herramientas directas:
-   - `get_telefono_celsia`: Teléfono de Celsia
-   - `get_direccion_celsia`: Direcciones de oficinas
-   - `get_social_media_celsia`: Redes sociales
-   - `get_pqr_celsia`: Sistema de PQR
-   - `get_pago_de_factura_celsia`: Cómo pagar facturas
-   - `generar_factura_simulada`: Si piden ver una factura con número de cuenta y mes
-   - `verificar_estado_servicio`: Si preguntan por interrupciones en una ciudad
-   - `calcular_instalacion_solar`: Si quieren cotizar paneles solares
-   - `reportar_dano_servicio`: Si quieren reportar un daño o falla
-   - `consultar_estado_reporte`: Si tienen un ticket y quieren consultarlo
-
-2. **SEGUNDO**: Si la pregunta NO se puede responder con las tools anteriores, usa:
-   - `BuscadorDocumentosCelsia`: Para preguntas generales sobre Celsia, servicios, tarifas, procesos, etc.
-
-**Estrategia de respuesta:**
-- Si usaste `get_telefono_celsia` o `get_direccion_celsia`, responde ÚNICAMENTE con esa información, no uses el buscador.
-- Si usaste `BuscadorDocumentosCelsia`, basa tu respuesta ÚNICAMENTE en lo que la herramienta te devolvió.
-- Si el BuscadorDocumentosCelsia no tiene información suficiente, indícale al usuario que contacte los canales oficiales.
-
-**Analiza la situación y selecciona la acción o respuesta final, sé conciso y profesional."""
-        
-        # Creamos el Agente
-        agent_graph = create_agent(
-            llm, # El LLM que tomará las decisiones
-            tools=tools, # La lista de herramientas que puede usar
-            system_prompt=system_prompt_agent,
+            top_p=top_p,
+            retriever_k=retriever_k,
             checkpointer=st.session_state.checkpointer,
         )
-        
-        # Devolvemos el agente (ya no la 'rag_chain') y el retriever (para depurar)
-        return agent_graph, retriever, vectorstore
+    agent_graph = st.session_state.agentes[clave]
+    return agent_graph, get_retriever(retriever_k), get_vectorstore()
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -314,8 +163,8 @@ with st.sidebar:
         st.warning("No se pudo contar los documentos de ChromaDB.")
     
     st.write(f"""    
-    - **Modelo LLM**: qwen3:4b
-    - **Embeddings**: nomic-embed-text
+    - **Modelo LLM**: {OLLAMA_ROUTER_MODEL} (enrutamiento) / {OLLAMA_RAG_MODEL} (RAG)
+    - **Embeddings**: {EMBEDDING_MODEL}
     - **Base de datos**: ChromaDB
     - **Framework**: LangGraph (Agente)
     - **Búsqueda**: MMR (Max Marginal Relevance)
@@ -327,6 +176,7 @@ with st.sidebar:
         st.session_state.messages = []
         # Limpiamos también la memoria del agente
         st.session_state.checkpointer = InMemorySaver()
+        st.session_state.agentes = {}
         st.rerun() # Recarga la página
 
 # --- Lógica del Chat ---
@@ -360,16 +210,10 @@ if pregunta:
             respuesta_dict = agent_graph.invoke(input_data, config=config)
             
             # 4. Extraemos la respuesta final del agente
-            # La respuesta útil está en el último mensaje de la lista 'messages'
-            respuesta_final_str = ""
+            # (último AIMessage, o la salida de las herramientas de retorno directo)
+            respuesta_final_str = "Error: El agente no devolvió ningún mensaje."
             if "messages" in respuesta_dict and respuesta_dict["messages"]:
-                last_message = respuesta_dict["messages"][-1]
-                if isinstance(last_message, AIMessage):
-                    respuesta_final_str = last_message.content
-                else:
-                    respuesta_final_str = "Error: El agente no produjo una respuesta final."
-            else:
-                respuesta_final_str = "Error: El agente no devolvió ningún mensaje."
+                respuesta_final_str = extract_final_response(respuesta_dict["messages"])
             
             # 5. Mostrar la respuesta en la UI
             st.markdown(respuesta_final_str)
@@ -0,0 +1,124 @@
+"""
+Benchmark de los modos de la herramienta RAG (RAG_TOOL_MODE)
+
+- generate: BuscadorDocumentosCelsia ejecuta su propia cadena RAG (prompt + LLM)
+            y el agente vuelve a generar sobre esa respuesta.
+- context:  la herramienta devuelve el contexto compactado con IDs de fuente y
+            el agente responde una sola vez bajo las reglas de grounding.
+
+Para cada modo se ejecutan las mismas preguntas (sesiones nuevas) y se mide la
+latencia extremo a extremo, el número de llamadas al LLM y los tokens de
+entrada / salida reportados por Ollama.
+
+Uso:
+    python benchmark_rag_modes.py
+    python benchmark_rag_modes.py --questions preguntas.txt --modes context
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from src.agent.core import load_agent_and_rag_components
+
+DEFAULT_QUESTIONS = [
+    "¿Qué es Celsia y qué servicios ofrece?",
+    "¿Qué proyectos de energía solar tiene Celsia?",
+    "¿Cómo funciona la facturación de la energía?",
+    "¿Qué hace Celsia en el Tolima?",
+    "¿Qué es la movilidad eléctrica de Celsia?",
+]
+
+
+class UsageCounter(BaseCallbackHandler):
+    """Cuenta las llamadas al LLM y los tokens (incluidas las de la cadena RAG anidada)."""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def run_mode(mode, questions, retriever_k):
+    agent = load_agent_and_rag_components(retriever_k=retriever_k, rag_tool_mode=mode)
+    rows = []
+    for question in questions:
+        counter = UsageCounter()
+        config = {"configurable": {"thread_id": f"bench-{mode}-{uuid.uuid4()}"}, "callbacks": [counter]}
+        start = time.perf_counter()
+        result = agent.invoke({"messages": [HumanMessage(content=question)]}, config=config)
+        elapsed = time.perf_counter() - start
+        answer = result["messages"][-1].content
+        rows.append({
+            "question": question,
+            "seconds": elapsed,
+            "llm_calls": counter.llm_calls,
+            "input_tokens": counter.input_tokens,
+            "output_tokens": counter.output_tokens,
+            "answer": answer,
+        })
+        print(f"  [{mode}] {elapsed:6.2f}s  {counter.llm_calls} llamadas  "
+              f"{counter.input_tokens:>6} in / {counter.output_tokens:>5} out  | {question}")
+    return rows
+
+
+def print_summary(results):
+    print("\n" + "=" * 80)
+    print(f"{'modo':<10} {'p50 s':>7} {'p95 s':>7} {'media s':>8} {'llamadas':>9} {'tokens in':>10} {'tokens out':>11}")
+    for mode, rows in results.items():
+        seconds = [r["seconds"] for r in rows]
+        print(
+            f"{mode:<10} {percentile(seconds, 50):>7.2f} {percentile(seconds, 95):>7.2f} "
+            f"{statistics.mean(seconds):>8.2f} "
+            f"{statistics.mean(r['llm_calls'] for r in rows):>9.1f} "
+            f"{statistics.mean(r['input_tokens'] for r in rows):>10.0f} "
+            f"{statistics.mean(r['output_tokens'] for r in rows):>11.0f}"
+        )
+    print("(promedios por pregunta)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara RAG_TOOL_MODE=generate vs context")
+    parser.add_argument("--questions", default=None, help="Archivo con una pregunta por línea")
+    parser.add_argument("--modes", nargs="+", default=["generate", "context"], choices=["generate", "context"])
+    parser.add_argument("--retriever-k", type=int, default=5)
+    parser.add_argument("--show-answers", action="store_true")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    results = {}
+    for mode in args.modes:
+        print(f"\n🧪 Modo: {mode}")
+        results[mode] = run_mode(mode, questions, args.retriever_k)
+
+    print_summary(results)
+    if args.show_answers:
+        for mode, rows in results.items():
+            print(f"\n--- Respuestas ({mode}) ---")
+            for r in rows:
+                print(f"\n❓ {r['question']}\n{r['answer']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Calibración del umbral de relevancia (RAG_MIN_RELEVANCE)
+
+BuscadorDocumentosCelsia devuelve directamente el mensaje de respaldo, sin llamar
+al LLM, cuando el fragmento más relevante de ChromaDB queda por debajo de
+RAG_MIN_RELEVANCE. Este script calcula esa relevancia para un conjunto de
+preguntas etiquetadas (respondibles o no con los documentos) y propone el
+umbral más alto que conserva al menos --min-recall de las respondibles.
+
+Formato de --labels (JSONL, una pregunta por línea):
+    {"query": "¿Qué es Celsia?", "answerable": true}
+
+Uso:
+    python calibrate_relevance.py
+    python calibrate_relevance.py --labels preguntas_etiquetadas.jsonl --min-recall 0.95
+"""
+
+import argparse
+import json
+import math
+
+from src.agent.factory import get_vectorstore
+from src.agent.relevance import best_relevance
+
+DEFAULT_LABELS = [
+    {"query": "¿Qué es Celsia y qué servicios ofrece?", "answerable": True},
+    {"query": "¿Qué proyectos de energía solar tiene Celsia?", "answerable": True},
+    {"query": "¿Cómo funciona la facturación de la energía?", "answerable": True},
+    {"query": "¿Qué hace Celsia en el Tolima?", "answerable": True},
+    {"query": "¿Qué es la movilidad eléctrica de Celsia?", "answerable": True},
+    {"query": "¿Cuál es la receta del ajiaco santafereño?", "answerable": False},
+    {"query": "¿Quién ganó el mundial de fútbol de 2014?", "answerable": False},
+    {"query": "¿Cómo configuro una VPN en mi celular?", "answerable": False},
+    {"query": "Recomiéndame una película de terror", "answerable": False},
+    {"query": "¿Cuál es la capital de Australia?", "answerable": False},
+]
+
+
+def score_queries(labels):
+    vectorstore = get_vectorstore()
+    rows = []
+    for item in labels:
+        embedding = vectorstore.embeddings.embed_query(item["query"])
+        rows.append({**item, "relevance": best_relevance(vectorstore, embedding)})
+    return rows
+
+
+def choose_threshold(rows, min_recall):
+    """Umbral más alto con recall de respondibles >= min_recall (0.0 si no hay respondibles)."""
+    answerable = sorted((r["relevance"] for r in rows if r["answerable"]), reverse=True)
+    if not answerable:
+        return 0.0
+    # Se conservan las `keep` respondibles más relevantes; el umbral es la última de ellas
+    keep = math.ceil(round(min_recall * len(answerable), 6))
+    # Redondeado hacia abajo para que la última respondible conservada siga pasando
+    return math.floor(answerable[min(max(keep, 1), len(answerable)) - 1] * 1000) / 1000
+
+
+def evaluate(rows, threshold):
+    answerable = [r for r in rows if r["answerable"]]
+    unanswerable = [r for r in rows if not r["answerable"]]
+    kept = sum(r["relevance"] >= threshold for r in answerable)
+    skipped = sum(r["relevance"] < threshold for r in unanswerable)
+    return {
+        "recall": kept / len(answerable) if answerable else 1.0,
+        "skip_rate": skipped / len(unanswerable) if unanswerable else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra RAG_MIN_RELEVANCE con preguntas etiquetadas")
+    parser.add_argument("--labels", default=None, help="Archivo JSONL con {query, answerable}")
+    parser.add_argument("--min-recall", type=float, default=0.98,
+                        help="Fracción mínima de preguntas respondibles que deben seguir llegando al LLM")
+    args = parser.parse_args()
+
+    labels = DEFAULT_LABELS
+    if args.labels:
+        with open(args.labels, "r", encoding="utf-8") as f:
+            labels = [json.loads(line) for line in f if line.strip()]
+
+    print(f"🔎 Calculando relevancia de {len(labels)} preguntas...")
+    rows = score_queries(labels)
+
+    print("\n" + "=" * 80)
+    print(f"{'relevancia':>10}  {'respondible':<11}  pregunta")
+    for r in sorted(rows, key=lambda r: r["relevance"], reverse=True):
+        print(f"{r['relevance']:>10.3f}  {'sí' if r['answerable'] else 'no':<11}  {r['query']}")
+
+    threshold = choose_threshold(rows, args.min_recall)
+    result = evaluate(rows, threshold)
+    print("\n" + "=" * 80)
+    print(f"✅ Umbral propuesto: {threshold:.3f}")
+    print(f"   Respondibles que siguen al LLM: {result['recall']:.0%}")
+    print(f"   No respondibles resueltas sin LLM: {result['skip_rate']:.0%}")
+    print(f"\nAgrega a tu .env:\nRAG_MIN_RELEVANCE={threshold:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import argparse
+from dotenv import load_dotenv
+
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_chroma import Chroma
+
+from src.data.pipeline import IngestionPipeline
+from src.data.vectorstore import collection_fingerprint, fingerprint_metadata
+from src.utils.config import CHROMA_PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME, EMBEDDING_MODEL, embedding_fingerprint
+
+# The scrapers live with the notebooks and are not part of the src package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "notebooks", "web_scraping"))
+from celsia_unified_scraper import UnifiedCelsiaScraper  # noqa: E402
+from scrape_output import SectionSink, read_jsonl  # noqa: E402
+
+# Load environment variables
+load_dotenv()
+
+# --- Configuration ---
+DEFAULT_STATE_FILE = "./data/celsia_crawl_state.json"
+DEFAULT_INTERVAL_SECONDS = 300
+
+
+class PipelineSink(SectionSink):
+    """Section sink that hands each new or changed record to the pipeline."""
+
+    def __init__(self, section, emit, crawl_state):
+        super().__init__(section, crawl_state=crawl_state)
+        self.emit = emit
+
+    def store(self, record):
+        self.emit(self.section, record)
+
+
+class PipelineScraper(UnifiedCelsiaScraper):
+    """Incremental unified scraper whose output feeds the pipeline instead of a file."""
+
+    def __init__(self, **kwargs):
+        super().__init__(incremental=True, **kwargs)
+        self.emit = None
+        self.completed = False
+
+    def section_sink(self, section):
+        return PipelineSink(section, self.emit, self.crawl_state)
+
+    def finish_output(self, finished=True):
+        # The crawl state is saved by the pipeline once every record is upserted
+        self.completed = finished
+
+    def produce(self, emit):
+        self.emit = emit
+        self.completed = False
+        self.run()
+
+
+def jsonl_producer(path):
+    """Replays a scraper JSONL (see scrape_output.py) through the pipeline."""
+    def produce(emit):
+        for item in read_jsonl(path):
+            if item.get("type") == "record":
+                emit(item["section"], item["data"])
+    return produce
+
+
+def open_collection(embeddings):
+    db = Chroma(
+        persist_directory=CHROMA_PERSIST_DIRECTORY,
+        embedding_function=embeddings,
+        collection_name=CHROMA_COLLECTION_NAME,
+        collection_metadata=fingerprint_metadata()
+    )
+    fingerprint = collection_fingerprint(db._collection.metadata)
+    if fingerprint and fingerprint != embedding_fingerprint():
+        raise ValueError(
+            f"Collection '{CHROMA_COLLECTION_NAME}' was built with {fingerprint}, "
+            f"but the configured embeddings are {embedding_fingerprint()}."
+        )
+    return db._collection
+
+
+def run_pipeline(args):
+    if not os.getenv("GOOGLE_API_KEY"):
+        raise ValueError("GOOGLE_API_KEY not found in environment variables. Please set it in your .env file.")
+
+    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+    pipeline = IngestionPipeline(
+        open_collection(embeddings),
+        embeddings,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+    )
+
+    if args.from_jsonl:
+        pipeline.run(jsonl_producer(args.from_jsonl), report_every=args.report_every)
+        pipeline.print_stats()
+        return
+
+    scraper = PipelineScraper(delay=args.delay, base_url=args.base_url, state_path=args.state_file)
+    while True:
+        print(f"\n--- Pipeline pass started at {time.strftime('%Y-%m-%d %H:%M:%S')} ---")
+        pipeline.run(scraper.produce, report_every=args.report_every)
+        if scraper.completed:
+            scraper.crawl_state.save()
+        pipeline.print_stats()
+        if not args.watch or not scraper.completed:
+            return
+        print(f"Next pass in {args.interval} seconds (Ctrl+C to stop).")
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Crawl -> clean -> chunk -> dedupe -> embed -> upsert into ChromaDB as one streaming pipeline."
+    )
+    parser.add_argument("--from-jsonl", default=None, help="Ingest a scraper JSONL file instead of crawling.")
+    parser.add_argument("--base-url", default="https://www.celsia.com")
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds between scraper requests.")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_FILE, help="Crawl state (only new/changed pages are ingested).")
+    parser.add_argument("--watch", action="store_true", help="Keep running incremental passes.")
+    parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL_SECONDS, help="Seconds between passes in --watch mode.")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=200, help="Capacity of each inter-stage queue.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Chunks per dedupe/embed/upsert batch.")
+    parser.add_argument("--report-every", type=float, default=0, help="Print stage counters every N seconds (0 = only at the end).")
+    try:
+        run_pipeline(parser.parse_args())
+    except KeyboardInterrupt:
+        print("\nPipeline stopped by the user.")
@@ -0,0 +1,48 @@
+import argparse
+
+from src.data.vectorstore import export_snapshot, import_snapshot, read_snapshot_manifest, SnapshotError
+from src.utils.config import CHROMA_PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export/import the ChromaDB collection as a portable prebuilt-index snapshot."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Package the collection into a snapshot file.")
+    export_parser.add_argument("output", help="Path of the snapshot to write (e.g. celsia_index.snapshot).")
+    export_parser.add_argument("--persist-dir", default=CHROMA_PERSIST_DIRECTORY)
+    export_parser.add_argument("--collection", default=CHROMA_COLLECTION_NAME)
+
+    import_parser = subparsers.add_parser("import", help="Restore a snapshot (no embedding calls).")
+    import_parser.add_argument("snapshot", help="Snapshot file produced by 'export'.")
+    import_parser.add_argument("--persist-dir", default=CHROMA_PERSIST_DIRECTORY)
+    import_parser.add_argument("--collection", default=None, help="Target collection (default: the exported name).")
+    import_parser.add_argument("--overwrite", action="store_true", help="Replace the collection if it already exists.")
+
+    info_parser = subparsers.add_parser("info", help="Print the manifest of a snapshot.")
+    info_parser.add_argument("snapshot")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "export":
+            export_snapshot(args.output, persist_directory=args.persist_dir, collection_name=args.collection)
+        elif args.command == "import":
+            import_snapshot(
+                args.snapshot,
+                persist_directory=args.persist_dir,
+                collection_name=args.collection,
+                overwrite=args.overwrite
+            )
+        else:
+            manifest = read_snapshot_manifest(args.snapshot)
+            for key, value in manifest.items():
+                print(f"{key}: {value}")
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
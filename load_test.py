@@ -0,0 +1,195 @@
+"""
+Prueba de carga offline de la API (main.app)
+
+Arranca la API en el mismo proceso con backends simulados (STUB_BACKENDS=true):
+un modelo de chat con guion determinista (llamadas a herramientas y latencia por
+token configurable) y embeddings por hash sobre un ChromaDB temporal con los
+chunks de data/chunks. No necesita Ollama, clave de Google ni el índice real.
+
+Lanza muchas sesiones concurrentes contra /chat (varios turnos cada una) y
+reporta RPS, latencias p50/p95/p99 y el crecimiento de memoria en el tiempo,
+para detectar regresiones en la capa de API y en el checkpointer.
+
+Uso:
+    python load_test.py
+    python load_test.py --sessions 200 --turns 5 --concurrency 50 --token-latency 0.01
+    python load_test.py --json   # reporte en JSON (lo usa test_load_harness.py)
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import tempfile
+import time
+
+DEFAULT_MESSAGES = [
+    "¿Cuál es el teléfono de Celsia?",
+    "¿Qué proyectos de energía solar tiene Celsia?",
+    "Genera mi factura del mes",
+    "¿Hay interrupciones del servicio en Cali?",
+    "¿Qué es la movilidad eléctrica de Celsia?",
+    "¿Qué hace Celsia en el Tolima?",
+]
+
+CHUNKS_FILE = os.path.join("data", "chunks", "chunks_celsia.json")
+
+
+def configure_stub_environment(args, persist_dir):
+    """Debe llamarse antes de importar main / src (la configuración se lee al importar)."""
+    os.environ["STUB_BACKENDS"] = "true"
+    os.environ["STUB_TOKEN_LATENCY_SECONDS"] = str(args.token_latency)
+    os.environ["STUB_OUTPUT_TOKENS"] = str(args.output_tokens)
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = persist_dir
+    os.environ["RAG_PREFETCH"] = os.getenv("RAG_PREFETCH", "false")
+    if args.no_degraded:
+        os.environ["DEGRADED_MODE"] = "false"
+
+
+def seed_vectorstore(max_chunks):
+    from langchain_core.documents import Document
+    from src.agent.factory import get_vectorstore
+
+    vectorstore = get_vectorstore()
+    if vectorstore.get(limit=1)["ids"]:
+        return
+    with open(CHUNKS_FILE, "r", encoding="utf-8") as f:
+        chunks = json.load(f)[:max_chunks]
+    docs = [
+        Document(page_content=c["chunk"], metadata={"source": c.get("source") or "chunks_celsia.json"})
+        for c in chunks if c.get("chunk")
+    ]
+    vectorstore.add_documents(docs)
+
+
+def rss_mb():
+    """Memoria residente actual (Linux); en otros sistemas, el pico reportado por getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+async def run_load(sessions, turns, concurrency, messages, sample_interval):
+    import httpx
+    import main
+    from src.agent.core import CHECKPOINTER
+    from src.utils import metrics
+
+    await main.startup_event()
+    latencies, statuses, degraded = [], {}, 0
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+        async def session(index):
+            nonlocal degraded
+            for turn in range(turns):
+                payload = {
+                    "user_message": messages[(index + turn) % len(messages)],
+                    "session_id": f"load-{index}",
+                }
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/chat", json=payload)
+                    latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200 and response.json().get("degraded"):
+                    degraded += 1
+
+        async def sample_memory():
+            while True:
+                samples.append({
+                    "seconds": round(time.perf_counter() - started, 2),
+                    "completed": len(latencies),
+                    "rss_mb": round(rss_mb(), 1),
+                })
+                await asyncio.sleep(sample_interval)
+
+        started = time.perf_counter()
+        sampler = asyncio.create_task(sample_memory())
+        await asyncio.gather(*(session(i) for i in range(sessions)))
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+        samples.append({"seconds": round(elapsed, 2), "completed": len(latencies), "rss_mb": round(rss_mb(), 1)})
+
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "status_codes": statuses,
+        "errors": sum(count for code, count in statuses.items() if code != 200),
+        "degraded": degraded,
+        "degraded_reasons": metrics.by_label("chat_degraded", "reason"),
+        "checkpointed_sessions": len(getattr(CHECKPOINTER, "storage", {})),
+        "memory": samples,
+        "memory_growth_mb": round(samples[-1]["rss_mb"] - samples[0]["rss_mb"], 1),
+    }
+
+
+def print_report(report):
+    print("\n" + "=" * 80)
+    print(f"Peticiones: {report['requests']} en {report['seconds']:.2f}s  ->  {report['rps']:.2f} RPS")
+    print(f"Latencia: p50 {report['p50_ms']:.1f} ms | p95 {report['p95_ms']:.1f} ms | p99 {report['p99_ms']:.1f} ms")
+    print(f"Códigos HTTP: {report['status_codes']}  (errores: {report['errors']}, degradadas: {report['degraded']})")
+    if report["degraded_reasons"]:
+        print(f"Motivos de modo degradado: {report['degraded_reasons']}  (desactívalo con --no-degraded)")
+    print(f"Sesiones en el checkpointer: {report['checkpointed_sessions']}")
+    print(f"\n{'tiempo s':>9} {'completadas':>12} {'RSS MB':>8}")
+    for s in report["memory"]:
+        print(f"{s['seconds']:>9.2f} {s['completed']:>12} {s['rss_mb']:>8.1f}")
+    print(f"Crecimiento de memoria: {report['memory_growth_mb']:+.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga offline de /chat con backends simulados")
+    parser.add_argument("--sessions", type=int, default=50, help="Sesiones (session_id) distintas")
+    parser.add_argument("--turns", type=int, default=4, help="Turnos por sesión")
+    parser.add_argument("--concurrency", type=int, default=20, help="Peticiones /chat simultáneas")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Segundos por token del modelo simulado")
+    parser.add_argument("--output-tokens", type=int, default=40, help="Tokens máximos por respuesta simulada")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM_MAX_CONCURRENCY durante la prueba")
+    parser.add_argument("--max-chunks", type=int, default=400, help="Chunks de data/chunks a indexar")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Segundos entre muestras de memoria")
+    parser.add_argument("--messages", default=None, help="Archivo con un mensaje por línea")
+    parser.add_argument("--persist-dir", default=None, help="Directorio ChromaDB (por defecto, uno temporal)")
+    parser.add_argument("--no-degraded", action="store_true", help="Desactiva el modo degradado (DEGRADED_MODE=false)")
+    parser.add_argument("--verbose", action="store_true", help="Muestra los logs de la API")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte en JSON")
+    args = parser.parse_args()
+
+    configure_stub_environment(args, args.persist_dir or tempfile.mkdtemp(prefix="celsia-load-"))
+    messages = DEFAULT_MESSAGES
+    if args.messages:
+        with open(args.messages, "r", encoding="utf-8") as f:
+            messages = [line.strip() for line in f if line.strip()]
+
+    if not args.json:
+        print(f"🧪 {args.sessions} sesiones x {args.turns} turnos, concurrencia {args.concurrency}")
+    # The API prints one line per request; hidden unless --verbose
+    with open(os.devnull, "w") as devnull:
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+            seed_vectorstore(args.max_chunks)
+            report = asyncio.run(run_load(args.sessions, args.turns, args.concurrency, messages, args.sample_interval))
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
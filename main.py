@@ -1,10 +1,15 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional
 
 import warnings
+import logging
 import os
+import time
+import asyncio
+from contextlib import ExitStack
 from dotenv import load_dotenv
 
 # --- LangChain Imports ---
@@ -12,7 +17,7 @@ from dotenv import load_dotenv
 # from langchain_google_genai import GoogleGenerativeAIEmbeddings
 # from langchain_chroma import Chroma
 # from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, AIMessage # Still needed for API interaction
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage # Still needed for API interaction
 
 # Tools are imported within src/agent/core.py, but need to be accessible for core.py
 # If tools are not directly used in main.py, this import can be removed, or simplified.
@@ -25,9 +30,16 @@ from langchain_core.messages import HumanMessage, AIMessage # Still needed for A
 # )
 
 # Import agent components from src.agent.core
-from src.agent.core import load_agent_and_rag_components, CHECKPOINTER
+from src.agent.core import extract_final_response
+from src.agent.factory import get_agent, get_retriever
 # Import AgentState from the state module
 from src.agent.state import AgentState # Still needed for type hinting if AgentState is used in FastAPI models
+from src.agent.scheduler import SCHEDULER, DeadlineExceeded, deadline_scope
+from src.utils import metrics, query_log
+from src.utils.query_log import QUERY_LOG
+from src.agent.prefetch import prefetch_stats
+from src.agent.degraded import DegradedMode, AnswerCache, cacheable_answer, extractive_answer
+from src.utils.config import CHAT_DEADLINE_SECONDS, RAG_PREFETCH, OVERRIDE_RANGES, DEGRADED_MODE
 
 
 # Remove redundant imports as they are now in src/agent/state.py or src/agent/core.py
@@ -42,6 +54,9 @@ warnings.filterwarnings("ignore", category=UserWarning)
 # Load environment variables
 load_dotenv()
 
+# Per-request timing lines (enable with logging level DEBUG)
+logger = logging.getLogger(__name__)
+
 # --- FastAPI App Setup ---
 app = FastAPI(
     title="Celsia Chatbot API",
@@ -68,6 +83,13 @@ app.add_middleware(
 # Global instance for agent
 AGENT_GRAPH = None
 
+# How often a running /chat request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Extractive serving while the LLM is overloaded or down (see src/agent/degraded.py)
+DEGRADED = DegradedMode()
+ANSWER_CACHE = AnswerCache()
+
 # --- Startup Event ---
 @app.on_event("startup")
 async def startup_event():
@@ -75,7 +97,7 @@ async def startup_event():
     if AGENT_GRAPH is None: # Add this check
         try:
             # Load agent components with default parameters
-            AGENT_GRAPH = load_agent_and_rag_components(
+            AGENT_GRAPH = get_agent(
                 temperature=float(os.getenv("LLM_TEMPERATURE", 0.5)),
                 top_k=int(os.getenv("LLM_TOP_K", 40)),
                 top_p=float(os.getenv("LLM_TOP_P", 0.9)),
@@ -93,45 +115,218 @@ async def startup_event():
     else: # If AGENT_GRAPH is already set (e.g. by a test fixture)
         print("✅ Agent components already loaded (skipped startup_event loading).")
 
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the agent finished the turn."""
+
+
+async def repair_interrupted_turn(config) -> None:
+    """
+    A turn cancelled while tools were running leaves an AIMessage with tool calls
+    and no results in the checkpoint, which the agent rejects on the next turn.
+    Closes those calls with a cancellation note so the session stays usable.
+    """
+    state = await AGENT_GRAPH.aget_state(config)
+    messages = state.values.get("messages", []) if state else []
+    last = messages[-1] if messages else None
+    if isinstance(last, AIMessage) and last.tool_calls:
+        await AGENT_GRAPH.aupdate_state(
+            config,
+            {"messages": [
+                ToolMessage(content="Solicitud cancelada.", tool_call_id=call["id"], name=call["name"])
+                for call in last.tool_calls
+            ]},
+            as_node="tools",
+        )
+
+
+async def run_agent_turn(http_request: Request, inputs, config, deadline_seconds: float):
+    """
+    Runs one agent turn as a task and cancels it (together with any in-flight
+    LLM generation) if the client disconnects or the deadline passes.
+    """
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+    prefetcher = getattr(AGENT_GRAPH, "rag_prefetcher", None) if RAG_PREFETCH else None
+    with ExitStack() as scopes:
+        if prefetcher:
+            # Retrieval for the raw message overlaps with the agent's first LLM call
+            k = config["configurable"].get("overrides", {}).get("retriever_k")
+            scopes.enter_context(prefetcher.scope(inputs["messages"][-1].content, get_retriever(k) if k else None))
+        with deadline_scope(deadline_seconds):
+            # The task copies the current context, so every LLM call inside sees the deadline
+            task = asyncio.create_task(AGENT_GRAPH.ainvoke(inputs, config=config))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+                if done:
+                    return task.result()
+                if await http_request.is_disconnected():
+                    raise ClientDisconnected()
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise DeadlineExceeded("Chat request deadline exceeded.")
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await repair_interrupted_turn(config)
+
+
+def _override_field(name: str):
+    low, high = OVERRIDE_RANGES[name]
+    return Field(None, ge=low, le=high)
+
+
+class ChatOverrides(BaseModel):
+    """Optional per-request generation/retrieval settings, limited to OVERRIDE_RANGES."""
+    temperature: Optional[float] = _override_field("temperature")
+    top_k: Optional[int] = _override_field("top_k")
+    top_p: Optional[float] = _override_field("top_p")
+    retriever_k: Optional[int] = _override_field("retriever_k")
+
+
 class ChatRequest(BaseModel):
     user_message: str
     session_id: str
+    overrides: Optional[ChatOverrides] = None
 
 class ChatResponse(BaseModel):
     response: str
+    # True when the answer was produced without the LLM (degraded mode)
+    degraded: bool = False
     
 @app.get("/health")
 async def health_check():
     if AGENT_GRAPH:
-        return {"status": "ok", "message": "Agent loaded."}
+        return {
+            "status": "ok",
+            "message": "Agent loaded.",
+            "metrics": metrics.snapshot(),
+            "llm_scheduler": SCHEDULER.status(),
+            "rag_prefetch": {"enabled": RAG_PREFETCH, **prefetch_stats()},
+            "degraded_mode": {"enabled": DEGRADED_MODE, **DEGRADED.status()},
+        }
     else:
         raise HTTPException(status_code=503, detail="Agent not loaded yet.")
 
+async def degraded_response(request: ChatRequest, reason: str) -> ChatResponse:
+    k = (request.overrides.retriever_k if request.overrides else None) or int(os.getenv("RETRIEVER_K", 5))
+    answer, source = await extractive_answer(request.user_message, get_retriever(k), ANSWER_CACHE)
+    metrics.increment("chat_degraded", reason=reason)
+    metrics.increment("chat_degraded_answers", source=source)
+    query_log.note(route=f"degraded:{reason}", degraded_source=source)
+    return ChatResponse(response=answer, degraded=True)
+
+
+def turn_route(messages) -> str:
+    """Tools called by the agent since the last user message, e.g. "agent:BuscadorDocumentosCelsia"."""
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    tools = [call["name"] for m in messages[last_human + 1:] if isinstance(m, AIMessage) for call in m.tool_calls]
+    return "agent:" + ("+".join(tools) or "direct")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Counters, in-flight gauges and per-stage latency histograms in Prometheus text format."""
+    scheduler = SCHEDULER.status()
+    return PlainTextResponse(
+        metrics.prometheus_text({
+            "llm_scheduler_active": scheduler["active"],
+            "llm_scheduler_waiting": scheduler["waiting"],
+            "degraded_mode_open": int(DEGRADED.state != "closed"),
+        }),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     if not AGENT_GRAPH:
         raise HTTPException(status_code=503, detail="Agent not initialized.")
 
+    received = time.time()
+    started = time.monotonic()
+    outcome = "error"
+    # Route and retrieved ids noted by the agent code, for the query log
+    with query_log.capture() as record:
+        try:
+            with metrics.in_flight("chat_in_flight"):
+                # Collects the per-stage spans of this request (LLM calls, embedding, search, tools...)
+                with metrics.request_timings() as timings:
+                    try:
+                        response = await chat_turn(request, http_request)
+                        outcome = "degraded" if response.degraded else "ok"
+                    finally:
+                        metrics.observe("chat_seconds", time.monotonic() - started, outcome=outcome)
+        finally:
+            seconds = time.monotonic() - started
+            if logger.isEnabledFor(logging.DEBUG):
+                stages = " | ".join(f"{stage} {stage_seconds:.2f}s" for stage, stage_seconds in timings.items())
+                logger.debug("/chat %s: %.2fs (%s) %s", request.session_id, seconds, outcome, stages)
+            if QUERY_LOG.enabled:
+                QUERY_LOG.write({
+                    "t": round(received, 3),
+                    "query": query_log.anonymize(request.user_message),
+                    "session": query_log.session_hash(request.session_id),
+                    "outcome": outcome,
+                    "latency_ms": round(seconds * 1000, 1),
+                    "stages": timings,
+                    "overrides": request.overrides.model_dump(exclude_none=True) if request.overrides else {},
+                    **record,
+                })
+    return response
+
+
+async def chat_turn(request: ChatRequest, http_request: Request) -> ChatResponse:
+    """One /chat turn: degraded answer, or the agent with cancellation and deadline."""
+    trial = False
+    if DEGRADED_MODE:
+        reason, trial = DEGRADED.check(SCHEDULER.status()["waiting"])
+        if reason:
+            return await degraded_response(request, reason)
+
     config = {"configurable": {"thread_id": request.session_id}}
+    if request.overrides:
+        # Read by the LLM wrappers and the RAG tool through the graph's runnable config
+        config["configurable"]["overrides"] = request.overrides.model_dump(exclude_none=True)
+        metrics.increment("chat_requests_with_overrides")
     
+    started = time.monotonic()
     try:
-        # Invoke the agent
-        response_dict = AGENT_GRAPH.invoke(
+        # Invoke the agent (cancelled on client disconnect or deadline)
+        response_dict = await run_agent_turn(
+            http_request,
             {"messages": [HumanMessage(content=request.user_message)]},
-            config=config
+            config,
+            CHAT_DEADLINE_SECONDS,
         )
         
         # Extract the final response from the agent
         final_response_str = "No response from agent."
         if "messages" in response_dict and response_dict["messages"]:
-            for msg in reversed(response_dict["messages"]):
-                if isinstance(msg, AIMessage) and msg.content:
-                    final_response_str = msg.content
-                    break
-            if final_response_str == "No response from agent.":
-                final_response_str = "Lo siento, no pude generar una respuesta clara. Por favor, intenta de nuevo."
+            query_log.note(route=turn_route(response_dict["messages"]))
+            final_response_str = extract_final_response(response_dict["messages"])
+            # Runs with overrides answer differently from the default configuration
+            if not request.overrides and cacheable_answer(response_dict["messages"], final_response_str):
+                ANSWER_CACHE.put(request.user_message, final_response_str)
 
+        DEGRADED.record(latency=time.monotonic() - started, trial=trial)
         return ChatResponse(response=final_response_str)
+    except ClientDisconnected:
+        if trial:
+            DEGRADED.cancel_trial()
+        metrics.increment("chat_cancelled_client_disconnect")
+        print(f"Client disconnected, cancelled turn for session {request.session_id}")
+        # Nobody is listening; 499 is the conventional "client closed request" status
+        raise HTTPException(status_code=499, detail="Client closed request.")
+    except DeadlineExceeded as e:
+        DEGRADED.record(error=e, trial=trial)
+        metrics.increment("chat_deadline_exceeded")
+        print(f"Deadline exceeded for session {request.session_id}")
+        if DEGRADED_MODE:
+            return await degraded_response(request, "deadline")
+        raise HTTPException(status_code=504, detail="The assistant took too long to answer. Please try again.")
     except Exception as e:
+        DEGRADED.record(error=e, trial=trial)
         print(f"Error during agent invocation for session {request.session_id}: {e}")
+        if DEGRADED_MODE:
+            return await degraded_response(request, "error")
         raise HTTPException(status_code=500, detail="Internal server error during chat processing.")
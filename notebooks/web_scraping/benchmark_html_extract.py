@@ -0,0 +1,170 @@
+"""
+Benchmark del costo de parseo de los scrapers de Celsia.
+
+Compara, sobre HTML ya descargado, la ruta histórica (BeautifulSoup sobre el
+documento completo) con `html_extract` (XPath sobre lxml) y verifica que ambas
+producen exactamente los mismos registros. Reporta páginas/segundo por extractor.
+
+Fixtures aceptados:
+    --fixtures DIR     archivos *.html / *.html.gz
+    --cache-dir DIR    la caché HTTP de los scrapers (ver http_cache.py)
+
+Ejemplo:
+    python celsia_unified_scraper.py --cache-dir .http_cache --legacy-json
+    python benchmark_html_extract.py --cache-dir .http_cache --workers 4
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+import html_extract
+
+
+# --- Ruta histórica (copia literal de los parsers previos a html_extract) ---
+
+def bs4_link_hrefs(html):
+    soup = BeautifulSoup(html, 'lxml')
+    return [link['href'] for link in soup.find_all('a', href=True)]
+
+
+def bs4_news_listing_hrefs(html):
+    soup = BeautifulSoup(html, 'lxml')
+    return [a['href'] for a in soup.select('div.content-type-default-body a.item-new') if a.has_attr('href')]
+
+
+def bs4_news_article(url, html):
+    article_soup = BeautifulSoup(html, 'lxml')
+    title = article_soup.find('h1').get_text(strip=True) if article_soup.find('h1') else 'No título'
+    article_body = article_soup.find('div', class_='text-content')
+    content = ' '.join(p.get_text(strip=True) for p in article_body.find_all(['p', 'ul'])) if article_body else 'No contenido.'
+    return {'url': url, 'title': title, 'content': content}
+
+
+def bs4_corporate_page(url, html):
+    soup = BeautifulSoup(html, 'lxml')
+    title = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'Sin título'
+    main_content = soup.find('main') or soup
+    text = ' '.join(p.get_text(strip=True) for p in main_content.find_all('p', limit=15))
+    return {'url': url, 'page_title': title, 'summary': text}
+
+
+def bs4_atencion_page(url, html):
+    soup = BeautifulSoup(html, 'lxml')
+    title = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'Sin título'
+    text = ' '.join(p.get_text(strip=True) for p in soup.find('main').find_all('p')) if soup.find('main') else ''
+    emails = list(set(re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', html)))
+    phones = list(set(re.findall(r'01\s?8000[\s\d]+|\(\d+\)[\s\d-]+', html)))
+    return {
+        'url': url, 'type': 'informational', 'page_title': title,
+        'summary': (text[:500] + '...') if len(text) > 500 else text,
+        'extracted_emails': emails, 'extracted_phones': phones
+    }
+
+
+EXTRACTORS = {
+    'links': (bs4_link_hrefs, html_extract.link_hrefs, False),
+    'news_listing': (bs4_news_listing_hrefs, html_extract.news_listing_hrefs, False),
+    'news_article': (bs4_news_article, html_extract.news_article, True),
+    'corporate_page': (bs4_corporate_page, html_extract.corporate_page, True),
+    'atencion_page': (bs4_atencion_page, html_extract.atencion_page, True),
+}
+
+
+# La ruta histórica devuelve correos y teléfonos en el orden de un set;
+# html_extract los ordena. Se comparan sin importar el orden.
+UNORDERED_FIELDS = ('extracted_emails', 'extracted_phones')
+
+
+def same_output(old, new):
+    if isinstance(old, dict) and isinstance(new, dict):
+        old = {k: sorted(v) if k in UNORDERED_FIELDS else v for k, v in old.items()}
+        new = {k: sorted(v) if k in UNORDERED_FIELDS else v for k, v in new.items()}
+    return old == new
+
+
+def load_fixtures(fixtures_dir=None, cache_dir=None):
+    """Devuelve [(nombre, html)] desde una carpeta de fixtures o la caché HTTP."""
+    if cache_dir:
+        paths = glob.glob(os.path.join(cache_dir, '*', '*.html.gz'))
+    else:
+        paths = glob.glob(os.path.join(fixtures_dir, '*.html')) + glob.glob(os.path.join(fixtures_dir, '*.html.gz'))
+    pages = []
+    for path in sorted(paths):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read().decode('utf-8', errors='replace')))
+    return pages
+
+
+def run_extractor(func, with_url, pages):
+    if with_url:
+        return [func(name, html) for name, html in pages]
+    return [func(html) for _, html in pages]
+
+
+def time_extractor(func, with_url, pages, repeat):
+    best, output = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = run_extractor(func, with_url, pages)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def time_process_pool(pages, workers):
+    """Throughput del parseo de artículos repartido en un pool de procesos."""
+    names = [name for name, _ in pages]
+    htmls = [html for _, html in pages]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(html_extract.news_article, names[:workers], htmls[:workers]))  # arranque de workers
+        start = time.perf_counter()
+        list(pool.map(html_extract.news_article, names, htmls, chunksize=max(1, len(pages) // (workers * 4))))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parseo HTML (BeautifulSoup vs lxml/XPath)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--fixtures", help="Carpeta con archivos .html / .html.gz")
+    source.add_argument("--cache-dir", help="Caché HTTP de los scrapers")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por extractor (se reporta la mejor)")
+    parser.add_argument("--workers", type=int, default=0, help="Además, medir el parseo de artículos en un pool de N procesos")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures, args.cache_dir)
+    if not pages:
+        print("[X] No se encontraron páginas HTML.")
+        return
+    total_kb = sum(len(html) for _, html in pages) / 1024
+    print(f"[+] {len(pages)} páginas ({total_kb:.0f} KB)\n")
+
+    print(f"{'extractor':<16} {'bs4 pág/s':>10} {'lxml pág/s':>11} {'speedup':>8}  resultado")
+    total_old = total_new = 0.0
+    for name, (old, new, with_url) in EXTRACTORS.items():
+        old_seconds, old_output = time_extractor(old, with_url, pages, args.repeat)
+        new_seconds, new_output = time_extractor(new, with_url, pages, args.repeat)
+        total_old += old_seconds
+        total_new += new_seconds
+        mismatches = sum(1 for a, b in zip(old_output, new_output) if not same_output(a, b))
+        status = 'idéntico' if not mismatches else f'{mismatches} diferencias'
+        print(f"{name:<16} {len(pages) / old_seconds:>10.1f} {len(pages) / new_seconds:>11.1f} "
+              f"{old_seconds / new_seconds:>7.1f}x  {status}")
+
+    print(f"\n[+] Todos los extractores: {total_old:.2f}s (bs4) vs {total_new:.2f}s (lxml), "
+          f"{total_old / total_new:.1f}x más rápido")
+
+    if args.workers:
+        pool_seconds = time_process_pool(pages, args.workers)
+        print(f"[+] news_article en pool de {args.workers} procesos: {len(pages) / pool_seconds:.1f} pág/s")
+
+
+if __name__ == "__main__":
+    main()
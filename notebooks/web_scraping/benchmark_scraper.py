@@ -0,0 +1,92 @@
+"""
+Benchmark de los scrapers de Celsia contra el sitio simulado (mock_celsia_site.py).
+
+Levanta la réplica local con la latencia / tasa de errores / número de páginas
+indicados, ejecuta el scraper completo y reporta páginas/s, bytes/s y reintentos.
+
+Ejemplos:
+    python benchmark_scraper.py --news-pages 20 --latency-ms 30
+    python benchmark_scraper.py --engine async --error-rate 0.05 --latency-ms 80
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from celsia_unified_scraper import UnifiedCelsiaScraper
+from mock_celsia_site import add_site_arguments, site_from_args, start_mock_site
+
+
+def build_scraper(engine, base_url, output_path, checkpoint_path, delay, async_options=None):
+    if engine == 'async':
+        from celsia_async_scraper import AsyncUnifiedCelsiaScraper
+        return AsyncUnifiedCelsiaScraper(base_url=base_url, output_path=output_path,
+                                         checkpoint_path=checkpoint_path, **(async_options or {}))
+    return UnifiedCelsiaScraper(delay=delay, base_url=base_url, output_path=output_path, checkpoint_path=checkpoint_path)
+
+
+def run_benchmark(site, engine='sync', delay=0.0, verbose=False, async_options=None):
+    """Ejecuta un crawl completo contra `site` y devuelve las métricas."""
+    server, base_url = start_mock_site(site)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            scraper = build_scraper(engine, base_url, os.path.join(tmpdir, 'bench.jsonl'),
+                                    os.path.join(tmpdir, 'bench_checkpoint.json'), delay, async_options)
+            output = None if verbose else io.StringIO()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+                scraper.run()
+            elapsed = time.perf_counter() - start
+            records = scraper.writer.progress['records']
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = scraper.stats
+    pages = stats['requests'] - stats['retries'] - stats['errors']
+    return {
+        'engine': engine,
+        'seconds': elapsed,
+        'pages': pages,
+        'records': records,
+        'pages_per_second': pages / elapsed,
+        'bytes': stats['bytes'],
+        'bytes_per_second': stats['bytes'] / elapsed,
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'errors': stats['errors'],
+        'server': dict(site.stats),
+    }
+
+
+def print_report(result):
+    print(f"\n--- Benchmark ({result['engine']}) ---")
+    print(f"Tiempo:        {result['seconds']:.2f} s")
+    print(f"Páginas OK:    {result['pages']} ({result['pages_per_second']:.1f} pág/s)")
+    print(f"Bytes:         {result['bytes'] / 1024:.0f} KB ({result['bytes_per_second'] / 1024:.1f} KB/s)")
+    print(f"Solicitudes:   {result['requests']} (reintentos: {result['retries']}, fallidas: {result['errors']})")
+    print(f"Registros:     {result['records']}")
+    print(f"Servidor:      {result['server']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del scraper unificado contra un sitio simulado")
+    parser.add_argument("--engine", choices=["sync", "async"], default="sync")
+    parser.add_argument("--delay", type=float, default=0.0, help="Pausa entre solicitudes del scraper síncrono")
+    parser.add_argument("--per-host-concurrency", type=int, default=4, help="Solo --engine async")
+    parser.add_argument("--per-host-rate", type=float, default=4.0, help="Solo --engine async (solicitudes/s por host)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida del scraper")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    async_options = {'per_host_concurrency': args.per_host_concurrency, 'per_host_rate': args.per_host_rate}
+    result = run_benchmark(site_from_args(args), engine=args.engine, delay=args.delay,
+                           verbose=args.verbose, async_options=async_options)
+    print_report(result)
+
+
+if __name__ == "__main__":
+    main()
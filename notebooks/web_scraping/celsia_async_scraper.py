@@ -0,0 +1,393 @@
+"""
+Motor de descarga asíncrono para el Scraper Unificado de Celsia.
+
+Reemplaza el `time.sleep(self.delay)` antes de cada GET por:
+- un pool de conexiones acotado (aiohttp.TCPConnector),
+- límites de concurrencia y de tasa por host,
+- reintentos con backoff exponencial con jitter.
+
+El listado de noticias y la descarga de artículos se ejecutan en paralelo
+(pipeline): mientras se escanean las páginas del listado, un grupo de workers
+ya descarga los artículos encontrados. El formato de salida es el mismo de
+`UnifiedCelsiaScraper`.
+
+Con `parse_workers > 0` el parseo del HTML (`html_extract`) se ejecuta en un
+pool de procesos, así el event loop solo descarga mientras se extrae el texto.
+
+Requiere: aiohttp, lxml
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+from celsia_unified_scraper import UnifiedCelsiaScraper
+from http_cache import ResponseCache
+import html_extract
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostLimiter:
+    """Limita la concurrencia y la tasa de solicitudes hacia un mismo host."""
+
+    def __init__(self, concurrency, rate_per_second):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self.lock:
+                now = time.monotonic()
+                wait = max(0.0, self.next_slot - now)
+                self.next_slot = max(now, self.next_slot) + self.interval
+            if wait:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class AsyncFetcher:
+    """
+    Cliente HTTP asíncrono con pool acotado, límites por host y reintentos con jitter.
+    Se usa como context manager: `async with AsyncFetcher(...) as fetcher:`.
+    """
+
+    def __init__(self, headers=None, max_connections=16, per_host_concurrency=4,
+                 per_host_rate=4.0, max_retries=3, timeout=15, backoff_base=0.5,
+                 cache=None, offline=False):
+        self.headers = headers or {}
+        self.max_connections = max_connections
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rate = per_host_rate
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.cache = cache
+        self.offline = offline
+        self.session = None
+        self.limiters = {}
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_host_concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def limiter_for(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.per_host_concurrency, self.per_host_rate)
+        return self.limiters[host]
+
+    def backoff(self, attempt, retry_after=None):
+        """Backoff exponencial con jitter completo (o el Retry-After del servidor si es mayor)."""
+        delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    @staticmethod
+    def decode(body, content_type):
+        charset = 'utf-8'
+        if content_type and 'charset=' in content_type:
+            charset = content_type.split('charset=')[-1].split(';')[0].strip()
+        return body.decode(charset, errors='replace')
+
+    async def fetch(self, url):
+        """Descarga una URL y devuelve el HTML, o None si falla tras los reintentos."""
+        entry, cached_body = self.cache.load(url) if self.cache else (None, None)
+        if self.offline:
+            if entry is None:
+                print(f"[X] Modo offline: {url} no está en caché.")
+                return None
+            self.cache.stats['hits'] += 1
+            return self.decode(cached_body, entry.get('content_type'))
+        conditional = ResponseCache.conditional_headers(entry)
+
+        for attempt in range(self.max_retries):
+            retry_after = None
+            try:
+                async with self.limiter_for(url):
+                    self.stats['requests'] += 1
+                    async with self.session.get(url, headers=conditional) as response:
+                        if response.status == 304 and entry is not None:
+                            self.cache.mark_validated(url, entry)
+                            self.cache.stats['hits'] += 1
+                            return self.decode(cached_body, entry.get('content_type'))
+                        if response.status in RETRYABLE_STATUS:
+                            retry_after = response.headers.get('Retry-After')
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history,
+                                status=response.status, message=response.reason
+                            )
+                        response.raise_for_status()
+                        body = await response.read()
+                        self.stats['bytes'] += len(body)
+                        if self.cache:
+                            self.cache.store(url, body, response.headers)
+                            self.cache.stats['misses'] += 1
+                        return self.decode(body, response.headers.get('Content-Type'))
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRYABLE_STATUS:
+                    print(f"[X] {url} respondió {e.status}, no se reintenta.")
+                    self.stats['errors'] += 1
+                    return None
+                print(f"[!] Error en intento {attempt + 1} para {url}: {e.status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[!] Error en intento {attempt + 1} para {url}: {e!r}")
+
+            if attempt < self.max_retries - 1:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.backoff(attempt, retry_after))
+
+        print(f"[X] Falló la solicitud para {url} después de {self.max_retries} intentos.")
+        self.stats['errors'] += 1
+        return None
+
+
+class AsyncUnifiedCelsiaScraper(UnifiedCelsiaScraper):
+    """
+    Variante concurrente de `UnifiedCelsiaScraper`: misma extracción y mismo
+    formato de salida, pero las descargas pasan por `AsyncFetcher`.
+    """
+
+    def __init__(self, base_url="https://www.celsia.com", max_connections=16,
+                 per_host_concurrency=4, per_host_rate=4.0, article_workers=8,
+                 listing_lookahead=3, max_retries=3, timeout=15, cache_dir=None, offline=False,
+                 incremental=False, state_path="celsia_crawl_state.json",
+                 output_path=None, checkpoint_path="celsia_scrape_checkpoint.json", resume=False,
+                 parse_workers=0):
+        super().__init__(delay=0, base_url=base_url, cache_dir=cache_dir, offline=offline,
+                         incremental=incremental, state_path=state_path, output_path=output_path,
+                         checkpoint_path=checkpoint_path, resume=resume)
+        self.fetcher_options = {
+            'cache': self.session.cache if cache_dir else None,
+            'offline': offline,
+            'max_connections': max_connections,
+            'per_host_concurrency': per_host_concurrency,
+            'per_host_rate': per_host_rate,
+            'max_retries': max_retries,
+            'timeout': timeout,
+        }
+        self.article_workers = article_workers
+        self.parse_workers = parse_workers
+        self.parse_pool = None
+        self.listing_lookahead = listing_lookahead
+        self.fetcher = None
+
+    async def fetch(self, url):
+        print(f"[*] Obteniendo: {url}")
+        return await self.fetcher.fetch(url)
+
+    async def parse(self, func, *args):
+        """Ejecuta un extractor de `html_extract` en el pool de procesos (si hay)."""
+        if self.parse_pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.parse_pool, func, *args)
+
+    async def discover_sections_async(self):
+        print("\n--- Fase 1: Descubriendo Secciones Clave ---")
+        html = await self.fetch(self.base_url)
+        if not html:
+            print("[X] No se pudo acceder a la página principal. Abortando.")
+            return {}
+        return self.parse_sections(html)
+
+    async def process_noticias_async(self, urls, sink):
+        """
+        Pipeline de noticias: un productor recorre el listado (con algunas páginas
+        de anticipación) y encola artículos; varios workers los descargan en paralelo.
+        En modo streaming cada artículo se escribe apenas termina; si no, se conserva
+        el orden de descubrimiento.
+        """
+        queue = asyncio.Queue(maxsize=self.article_workers * 4)
+        results = {}
+        seen = set()
+
+        async def listing_producer():
+            pending = {}
+            next_page, page_num = 1, 1
+            while page_num <= self.MAX_NEWS_PAGES:
+                # Mantener `listing_lookahead` páginas del listado en vuelo
+                while next_page <= self.MAX_NEWS_PAGES and len(pending) < self.listing_lookahead:
+                    pending[next_page] = asyncio.create_task(self.fetch(self.news_listing_url(next_page)))
+                    next_page += 1
+
+                list_html = await pending.pop(page_num)
+                if list_html:
+                    hrefs = await self.parse(html_extract.news_listing_hrefs, list_html)
+                    article_links = [urljoin(self.news_url, href) for href in hrefs]
+                    if not article_links:
+                        print(f"[!] No se encontraron más artículos en la página {page_num}. Finalizando búsqueda de noticias.")
+                        break
+                    print(f"[+] Se encontraron {len(article_links)} artículos en la página {page_num}.")
+                    article_links = self.select_articles_to_fetch(article_links)
+                    if not article_links:
+                        print(f"[+] La página {page_num} solo contiene artículos conocidos. Fin del crawl incremental.")
+                        break
+                    for article_url in article_links:
+                        if article_url not in seen and not sink.is_done(article_url):
+                            seen.add(article_url)
+                            await queue.put((len(seen), article_url))
+                page_num += 1
+
+            for task in pending.values():
+                task.cancel()
+            for _ in range(self.article_workers):
+                await queue.put(None)
+
+        async def article_worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                order, article_url = item
+                article_html = await self.fetch(article_url)
+                if not article_html:
+                    record = {'url': article_url, 'error': 'No se pudo acceder al artículo.'}
+                else:
+                    record = await self.parse(html_extract.news_article, article_url, article_html)
+                if sink.writer is not None:
+                    sink.append(record)
+                else:
+                    results[order] = record
+
+        await asyncio.gather(listing_producer(), *(article_worker() for _ in range(self.article_workers)))
+        # Mismo orden de descubrimiento que la versión secuencial
+        sink.extend(results[order] for order in sorted(results))
+
+    async def process_quienes_somos_async(self, urls, sink):
+        async def one(url):
+            html = await self.fetch(url)
+            if not html:
+                return {'url': url, 'error': 'No se pudo acceder a la página.'}
+            record = await self.parse(html_extract.corporate_page, url, html)
+            print(f"[*] Procesada página corporativa: {record['page_title']}")
+            return record
+        pending = [url for url in urls if not sink.is_done(url)]
+        sink.extend(await asyncio.gather(*(one(url) for url in pending)))
+
+    async def process_atencion_cliente_async(self, urls, sink):
+        async def one(url):
+            if self.is_customer_portal(url):
+                print(f"[*] Enlace a portal conservado: {url}")
+                return self.portal_record(url)
+            html = await self.fetch(url)
+            if not html:
+                return {'url': url, 'error': 'No se pudo acceder a la página.'}
+            record = await self.parse(html_extract.atencion_page, url, html)
+            print(f"[*] Procesada página de atención al cliente: {record['page_title']}")
+            return record
+        pending = [url for url in urls if not sink.is_done(url)]
+        sink.extend(await asyncio.gather(*(one(url) for url in pending)))
+
+    async def process_generic_link_async(self, urls, sink):
+        self.process_generic_link(urls, sink)
+
+    async def run_async(self):
+        async with AsyncFetcher(headers=dict(self.session.headers), **self.fetcher_options) as fetcher:
+            self.fetcher = fetcher
+            if self.writer and self.writer.progress['sections']:
+                sections = self.writer.progress['sections']
+            else:
+                sections = await self.discover_sections_async()
+            sections = self.start_output(sections)
+
+            processors = {
+                'noticias': self.process_noticias_async,
+                'quienes_somos': self.process_quienes_somos_async,
+                'inversionistas': self.process_generic_link_async,
+                'atencion_cliente': self.process_atencion_cliente_async,
+                'servicios_y_facturacion': self.process_generic_link_async,
+                'puntos_atencion': self.process_generic_link_async,
+            }
+
+            print("\n--- Fase 2: Extracción de Datos Detallados (concurrente) ---")
+            section_names = [section for section, urls in sections.items() if urls]
+            sinks = {section: self.section_sink(section) for section in section_names}
+
+            async def process_section(section):
+                await processors.get(section, self.process_generic_link_async)(sections[section], sinks[section])
+                self.finish_section(section, sinks[section])
+
+            await asyncio.gather(*(process_section(section) for section in section_names))
+            self.stats = fetcher.stats
+
+    def run(self):
+        """Orquesta el scraping concurrente y guarda el resultado en el formato habitual."""
+        try:
+            if self.parse_workers:
+                self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+            asyncio.run(self.run_async())
+            self.finish_output()
+        except KeyboardInterrupt:
+            print("\n[!] Proceso interrumpido por el usuario.")
+            self.finish_output(finished=False)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown(cancel_futures=True)
+                self.parse_pool = None
+
+
+def main():
+    """Función principal para ejecutar el scraper unificado concurrente."""
+    parser = argparse.ArgumentParser(description="Scraper unificado de Celsia (asíncrono)")
+    parser.add_argument("--cache-dir", default=None, help="Carpeta de la caché HTTP (revalidación con ETag/Last-Modified)")
+    parser.add_argument("--offline", action="store_true", help="Re-ejecutar los parsers solo con el HTML en caché")
+    parser.add_argument("--incremental", action="store_true", help="Detenerse en artículos ya vistos y guardar solo el delta")
+    parser.add_argument("--state-file", default="celsia_crawl_state.json", help="Estado persistente del crawl incremental")
+    parser.add_argument("--per-host-concurrency", type=int, default=4)
+    parser.add_argument("--per-host-rate", type=float, default=4.0, help="Solicitudes por segundo por host")
+    parser.add_argument("--parse-workers", type=int, default=0, help="Procesos para parsear HTML (0 = en el event loop)")
+    parser.add_argument("--output", default=None, help="JSONL de salida (por defecto celsia_unified_data_<fecha>.jsonl)")
+    parser.add_argument("--checkpoint", default="celsia_scrape_checkpoint.json", help="Archivo de checkpoint del progreso")
+    parser.add_argument("--resume", action="store_true", help="Continuar desde el último checkpoint")
+    parser.add_argument("--legacy-json", action="store_true", help="Guardar un único JSON al final (sin streaming)")
+    args = parser.parse_args()
+    output_path = None
+    if not args.legacy_json and not args.resume:
+        output_path = args.output or f"celsia_unified_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+    print("="*70)
+    print("SCRAPER UNIFICADO DE CELSIA (ASÍNCRONO)")
+    print("="*70)
+
+    scraper = AsyncUnifiedCelsiaScraper(
+        per_host_concurrency=args.per_host_concurrency,
+        per_host_rate=args.per_host_rate,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
+        incremental=args.incremental,
+        state_path=args.state_file,
+        output_path=output_path,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+        parse_workers=args.parse_workers
+    )
+    scraper.run()
+
+
+if __name__ == "__main__":
+    main()
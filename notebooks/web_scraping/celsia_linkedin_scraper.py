@@ -2,11 +2,13 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
+from selenium.common.exceptions import TimeoutException
+import os
 import json
 import csv
 
+from linkedin_parser import parse_posts
+
 class LinkedInScraper:
     """
     Clase para extraer publicaciones de un perfil público de LinkedIn
@@ -53,80 +55,59 @@ class LinkedInScraper:
             print(f"Error configurando el driver: {e}")
             raise
 
-    def scroll_page(self, scroll_pause_time=2):
+    def wait_for_height_change(self, last_height, timeout=10):
         """
-        Desplaza la página hasta el final para cargar todo el contenido
-        
-        Args:
-            scroll_pause_time (int): Tiempo de pausa entre desplazamientos
+        Espera a que el contenido cargado tras un scroll cambie la altura de la página.
+
+        Returns:
+            int | None: Nueva altura, o None si no cambió dentro de `timeout` (fin del feed)
         """
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        
-        while True:
-            # Desplazar hacia abajo
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(scroll_pause_time)
-            
-            # Calcular nueva altura
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(
+                lambda driver: driver.execute_script("return document.body.scrollHeight") != last_height
+            )
+        except TimeoutException:
+            return None
+        return self.driver.execute_script("return document.body.scrollHeight")
 
-    def extract_post_data(self, post_element):
+    def scroll_snapshots(self, max_scrolls=50, scroll_timeout=10):
         """
-        Extrae datos de una publicación individual
+        Desplaza la página hasta el final y entrega una instantánea del HTML por paso
         
         Args:
-            post_element: Elemento web de la publicación
+            max_scrolls (int): Máximo de desplazamientos
+            scroll_timeout (int): Segundos de espera para que cargue más contenido
             
-        Returns:
-            dict: Datos de la publicación
+        Yields:
+            str: `page_source` antes del primer scroll y después de cada uno
         """
-        post_data = {}
-        
-        try:
-            # Texto de la publicación
-            text_element = post_element.find_element(By.CSS_SELECTOR, ".feed-shared-update-v2__description")
-            post_data['text'] = text_element.text.strip() if text_element else ""
-        except NoSuchElementException:
-            post_data['text'] = ""
-        
-        try:
-            # Fecha de la publicación
-            date_element = post_element.find_element(By.CSS_SELECTOR, ".feed-shared-actor__sub-description")
-            post_data['date'] = date_element.text.strip() if date_element else ""
-        except NoSuchElementException:
-            post_data['date'] = ""
-        
-        try:
-            # Reacciones
-            reactions_element = post_element.find_element(By.CSS_SELECTOR, ".social-details-social-counts__reactions-count")
-            post_data['reactions'] = reactions_element.text.strip() if reactions_element else "0"
-        except NoSuchElementException:
-            post_data['reactions'] = "0"
-        
-        try:
-            # Comentarios
-            comments_element = post_element.find_element(By.CSS_SELECTOR, ".social-details-social-counts__comments")
-            post_data['comments'] = comments_element.text.strip() if comments_element else "0"
-        except NoSuchElementException:
-            post_data['comments'] = "0"
+        yield self.driver.page_source
+        last_height = self.driver.execute_script("return document.body.scrollHeight")
         
-        return post_data
+        for _ in range(max_scrolls):
+            # Desplazar hacia abajo y esperar a que LinkedIn agregue publicaciones
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            new_height = self.wait_for_height_change(last_height, scroll_timeout)
+            if new_height is None:
+                break
+            last_height = new_height
+            yield self.driver.page_source
 
-    def scrape_profile_posts(self, profile_url, max_posts=50):
+    def scrape_profile_posts(self, profile_url, max_posts=50, snapshot_dir=None):
         """
         Extrae publicaciones de un perfil público de LinkedIn
         
         Args:
             profile_url (str): URL del perfil de LinkedIn
             max_posts (int): Número máximo de publicaciones a extraer
+            snapshot_dir (str): Carpeta donde guardar las instantáneas HTML
+                (para volver a parsearlas con linkedin_parser.py)
             
         Returns:
             list: Lista de diccionarios con datos de publicaciones
         """
         posts_data = []
+        seen_urns = set()
         
         try:
             print(f"Navegando a: {profile_url}")
@@ -136,34 +117,27 @@ class LinkedInScraper:
             WebDriverWait(self.driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, ".scaffold-layout__main"))
             )
+            if snapshot_dir:
+                os.makedirs(snapshot_dir, exist_ok=True)
             
-            # Desplazar para cargar más publicaciones
+            # Una instantánea por scroll; solo se extraen las publicaciones nuevas
             print("Cargando publicaciones...")
-            self.scroll_page()
-            
-            # Localizar publicaciones
-            posts = self.driver.find_elements(By.CSS_SELECTOR, ".feed-shared-update-v2")
-            print(f"Encontradas {len(posts)} publicaciones")
-            
-            # Extraer datos de cada publicación
-            for i, post in enumerate(posts[:max_posts]):
-                print(f"Procesando publicación {i+1}/{min(len(posts), max_posts)}")
-                
-                try:
-                    post_data = self.extract_post_data(post)
-                    post_data['post_id'] = i + 1
-                    posts_data.append(post_data)
-                    
-                    # Pausa para evitar ser bloqueado
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    print(f"Error extrayendo publicación {i+1}: {e}")
-                    continue
+            for step, html in enumerate(self.scroll_snapshots()):
+                if snapshot_dir:
+                    with open(os.path.join(snapshot_dir, f"snapshot_{step:03d}.html"), 'w', encoding='utf-8') as f:
+                        f.write(html)
+                new_posts = parse_posts(html, seen_urns)
+                posts_data.extend(new_posts)
+                print(f"Paso {step}: {len(new_posts)} publicaciones nuevas ({len(posts_data)} en total)")
+                if len(posts_data) >= max_posts:
+                    break
                     
         except Exception as e:
             print(f"Error durante el scraping: {e}")
         
+        posts_data = posts_data[:max_posts]
+        for i, post_data in enumerate(posts_data):
+            post_data['post_id'] = i + 1
         return posts_data
 
     def save_to_json(self, data, filename):
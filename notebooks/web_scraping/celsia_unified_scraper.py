@@ -2,23 +2,48 @@
 Scraper Unificado de Celsia - Combina el descubrimiento de secciones y la extracción detallada.
 """
 
+import argparse
 import requests
-from bs4 import BeautifulSoup
 import json
-import re
 import time
 from datetime import datetime
 from urllib.parse import urljoin
 
+from http_cache import CachedSession, OfflineCacheMiss
+from crawl_state import CrawlState
+from scrape_output import JsonlScrapeWriter, SectionSink
+import html_extract
+
 class UnifiedCelsiaScraper:
     """
     Una clase que encapsula toda la lógica de scraping para Celsia,
     desde el descubrimiento de URLs hasta la extracción de contenido detallado.
     """
-    def __init__(self, delay=1.0):
-        self.base_url = "https://www.celsia.com"
-        self.delay = delay
-        self.session = requests.Session()
+    MAX_NEWS_PAGES = 230
+
+    def __init__(self, delay=1.0, base_url="https://www.celsia.com", cache_dir=None, offline=False,
+                 incremental=False, state_path="celsia_crawl_state.json",
+                 output_path=None, checkpoint_path="celsia_scrape_checkpoint.json", resume=False):
+        """
+        Args:
+            delay (float): Pausa antes de cada solicitud
+            base_url (str): Raíz del sitio a recorrer
+            cache_dir (str): Carpeta de la caché HTTP condicional (None = sin caché)
+            offline (bool): Responder solo desde la caché, sin red
+            incremental (bool): Detenerse en artículos ya vistos y emitir solo el delta
+            state_path (str): Archivo con el estado persistente del crawl
+            output_path (str): JSONL donde se agregan los registros a medida que se extraen
+                (None = un único JSON al final, comportamiento histórico)
+            checkpoint_path (str): Archivo con el progreso del crawl en modo streaming
+            resume (bool): Continuar la ejecución guardada en checkpoint_path
+        """
+        self.base_url = base_url
+        self.news_url = urljoin(self.base_url, "/es/sala-de-prensa/")
+        self.offline = offline
+        self.delay = 0 if offline else delay
+        if offline and not cache_dir:
+            raise ValueError("El modo offline requiere cache_dir.")
+        self.session = CachedSession(cache_dir, offline=offline) if cache_dir else requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
@@ -27,6 +52,12 @@ class UnifiedCelsiaScraper:
             'Connection': 'keep-alive',
         })
         
+        # Contadores de descarga (mismas claves que AsyncFetcher.stats)
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0}
+
+        self.incremental = incremental
+        self.crawl_state = CrawlState(state_path) if incremental else None
+
         self.final_data = {
             'metadata': {
                 'extraction_timestamp': datetime.now().isoformat(),
@@ -34,6 +65,17 @@ class UnifiedCelsiaScraper:
             },
             'results': {}
         }
+        if incremental:
+            self.final_data['metadata']['mode'] = 'incremental'
+            self.final_data['metadata']['previous_crawl'] = self.crawl_state.last_crawl
+
+        if resume:
+            self.writer = JsonlScrapeWriter.resume(checkpoint_path)
+            print(f"[+] Reanudando desde {checkpoint_path}: {self.writer.progress['records']} registros ya guardados.")
+        elif output_path:
+            self.writer = JsonlScrapeWriter(output_path, checkpoint_path)
+        else:
+            self.writer = None
 
     def safe_request(self, url, max_retries=3, timeout=15):
         """
@@ -43,16 +85,25 @@ class UnifiedCelsiaScraper:
             try:
                 time.sleep(self.delay)
                 print(f"[*] Obteniendo: {url} (Intento {attempt + 1})")
+                self.stats['requests'] += 1
+                if attempt:
+                    self.stats['retries'] += 1
                 response = self.session.get(url, timeout=timeout)
                 response.raise_for_status()
+                self.stats['bytes'] += len(response.content)
                 print(f"[+] Éxito: {len(response.text)} caracteres recibidos.")
                 return response.text
+            except OfflineCacheMiss as e:
+                print(f"[X] {e}")
+                self.stats['errors'] += 1
+                return None
             except requests.RequestException as e:
                 print(f"[!] Error en intento {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)
                 else:
                     print(f"[X] Falló la solicitud para {url} después de {max_retries} intentos.")
+                    self.stats['errors'] += 1
                     return None
 
     def discover_sections(self):
@@ -64,9 +115,11 @@ class UnifiedCelsiaScraper:
         if not html:
             print("[X] No se pudo acceder a la página principal. Abortando.")
             return {}
+        return self.parse_sections(html)
 
-        soup = BeautifulSoup(html, 'lxml')
-        links = soup.find_all('a', href=True)
+    def parse_sections(self, html):
+        """Clasifica los enlaces de la página principal en las secciones de interés."""
+        hrefs = html_extract.link_hrefs(html)
         
         section_keywords = {
             'noticias': ['noticias', 'prensa', 'actualidad','sala-de-prensa'],
@@ -79,10 +132,10 @@ class UnifiedCelsiaScraper:
 
         found_sections = {key: [] for key in section_keywords}
         for section, keywords in section_keywords.items():
-            for link in links:
-                link_href = link.get('href', '').lower()
+            for href in hrefs:
+                link_href = href.lower()
                 if any(keyword in link_href for keyword in keywords):
-                    full_url = urljoin(self.base_url, link['href'])
+                    full_url = urljoin(self.base_url, href)
                     if full_url not in found_sections[section]:
                         found_sections[section].append(full_url)
         
@@ -92,24 +145,41 @@ class UnifiedCelsiaScraper:
 
     # --- MÉTODOS DE PROCESAMIENTO DETALLADO ---
 
-    def process_noticias(self, urls):
+    def news_listing_url(self, page_num):
+        """URL de una página del listado paginado de la sala de prensa."""
+        return f"{self.news_url}?current_paged={page_num}"
+
+    def parse_news_listing(self, html):
+        """Devuelve las URLs absolutas de los artículos de una página del listado."""
+        return [urljoin(self.news_url, href) for href in html_extract.news_listing_hrefs(html)]
+
+    def parse_news_article(self, url, html):
+        """Extrae título y contenido de una noticia."""
+        return html_extract.news_article(url, html)
+
+    def select_articles_to_fetch(self, article_links):
+        """En modo incremental descarta los artículos ya vistos en crawls anteriores."""
+        if not self.incremental:
+            return article_links
+        return [url for url in article_links if not self.crawl_state.is_known(url)]
+
+    def process_noticias(self, urls, sink=None):
         """
         Extrae todas las noticias de "sala de prensa" navegando a través de las páginas.
         """
-        data = []
+        data = sink if sink is not None else []
         processed_urls = set()
-        base_news_url = "https://www.celsia.com/es/sala-de-prensa/"
+        first_page = self.writer.progress['noticias_last_page'] + 1 if self.writer else 1
 
-        for page_num in range(1, 231): # Rango hasta 230
-            paginated_url = f"{base_news_url}?current_paged={page_num}"
+        for page_num in range(first_page, self.MAX_NEWS_PAGES + 1):
+            paginated_url = self.news_listing_url(page_num)
             print(f"\n--- Escaneando listado de noticias: {paginated_url} ---")
 
             list_html = self.safe_request(paginated_url)
             if not list_html:
                 continue
 
-            soup = BeautifulSoup(list_html, 'lxml')
-            article_links = [a['href'] for a in soup.select('div.content-type-default-body a.item-new') if a.has_attr('href')]
+            article_links = self.parse_news_listing(list_html)
             
             if not article_links:
                 print(f"[!] No se encontraron más artículos en la página {page_num}. Finalizando búsqueda de noticias.")
@@ -117,9 +187,13 @@ class UnifiedCelsiaScraper:
             
             print(f"[+] Se encontraron {len(article_links)} artículos en la página {page_num}.")
 
-            for link in article_links:
-                article_url = urljoin(base_news_url, link)
-                if article_url in processed_urls:
+            article_links = self.select_articles_to_fetch(article_links)
+            if not article_links:
+                print(f"[+] La página {page_num} solo contiene artículos conocidos. Fin del crawl incremental.")
+                break
+
+            for article_url in article_links:
+                if article_url in processed_urls or self.already_saved(data, article_url):
                     continue
                 processed_urls.add(article_url)
                 
@@ -129,39 +203,51 @@ class UnifiedCelsiaScraper:
                     data.append({'url': article_url, 'error': 'No se pudo acceder al artículo.'})
                     continue
                 
-                article_soup = BeautifulSoup(article_html, 'lxml')
-                title = article_soup.find('h1').get_text(strip=True) if article_soup.find('h1') else 'No título'
-                article_body = article_soup.find('div', class_='text-content')
-                content = ' '.join(p.get_text(strip=True) for p in article_body.find_all(['p', 'ul'])) if article_body else 'No contenido.'
-                
-                data.append({'url': article_url, 'title': title, 'content': content})
+                data.append(self.parse_news_article(article_url, article_html))
+
+            if self.writer:
+                self.writer.checkpoint(noticias_last_page=page_num)
         return data
 
-    def process_quienes_somos(self, urls):
+    def parse_corporate_page(self, url, html):
+        """Extrae título y resumen de una página corporativa."""
+        return html_extract.corporate_page(url, html)
+
+    def process_quienes_somos(self, urls, sink=None):
         """Extrae el texto principal de las páginas corporativas."""
-        data = []
+        data = sink if sink is not None else []
         for url in urls:
+            if self.already_saved(data, url):
+                continue
             html = self.safe_request(url)
             if not html:
                 data.append({'url': url, 'error': 'No se pudo acceder a la página.'})
                 continue
 
-            soup = BeautifulSoup(html, 'lxml')
-            title = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'Sin título'
-            main_content = soup.find('main') or soup
-            text = ' '.join(p.get_text(strip=True) for p in main_content.find_all('p', limit=15))
-            
-            data.append({'url': url, 'page_title': title, 'summary': text})
-            print(f"[*] Procesada página corporativa: {title}")
+            record = self.parse_corporate_page(url, html)
+            data.append(record)
+            print(f"[*] Procesada página corporativa: {record['page_title']}")
         return data
 
-    def process_atencion_cliente(self, urls):
+    def is_customer_portal(self, url):
+        """Los portales de autogestión se conservan como enlace, sin descargarlos."""
+        return any(portal in url for portal in ['digiturno', 'clientes.celsia.com', 'nube.celsia.com'])
+
+    def portal_record(self, url):
+        return {'url': url, 'type': 'portal', 'description': "Portal de autogestión de clientes."}
+
+    def parse_atencion_page(self, url, html):
+        """Extrae título, resumen y datos de contacto de una página de atención al cliente."""
+        return html_extract.atencion_page(url, html)
+
+    def process_atencion_cliente(self, urls, sink=None):
         """Conserva portales y extrae datos de contacto."""
-        data = []
+        data = sink if sink is not None else []
         for url in urls:
-            if any(portal in url for portal in ['digiturno', 'clientes.celsia.com', 'nube.celsia.com']):
-                purpose = "Portal de autogestión de clientes."
-                data.append({'url': url, 'type': 'portal', 'description': purpose})
+            if self.already_saved(data, url):
+                continue
+            if self.is_customer_portal(url):
+                data.append(self.portal_record(url))
                 print(f"[*] Enlace a portal conservado: {url}")
             else:
                 html = self.safe_request(url)
@@ -169,25 +255,17 @@ class UnifiedCelsiaScraper:
                     data.append({'url': url, 'error': 'No se pudo acceder a la página.'})
                     continue
 
-                soup = BeautifulSoup(html, 'lxml')
-                title = soup.find('h1').get_text(strip=True) if soup.find('h1') else 'Sin título'
-                text = ' '.join(p.get_text(strip=True) for p in soup.find('main').find_all('p')) if soup.find('main') else ''
-                
-                emails = list(set(re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', html)))
-                phones = list(set(re.findall(r'01\s?8000[\s\d]+|\(\d+\)[\s\d-]+', html)))
-
-                data.append({
-                    'url': url, 'type': 'informational', 'page_title': title,
-                    'summary': (text[:500] + '...') if len(text) > 500 else text,
-                    'extracted_emails': emails, 'extracted_phones': phones
-                })
-                print(f"[*] Procesada página de atención al cliente: {title}")
+                record = self.parse_atencion_page(url, html)
+                data.append(record)
+                print(f"[*] Procesada página de atención al cliente: {record['page_title']}")
         return data
 
-    def process_generic_link(self, urls):
+    def process_generic_link(self, urls, sink=None):
         """Función genérica para conservar enlaces importantes."""
-        data = []
+        data = sink if sink is not None else []
         for url in urls:
+            if self.already_saved(data, url):
+                continue
             description = "Enlace de interés general."
             if 'factura' in url or 'payment' in url:
                 description = "Portal de pago de facturas."
@@ -200,6 +278,66 @@ class UnifiedCelsiaScraper:
             print(f"[*] Enlace genérico conservado: {url}")
         return data
 
+    # --- SALIDA: EN MEMORIA O EN STREAMING (JSONL + CHECKPOINTS) ---
+
+    @staticmethod
+    def already_saved(data, url):
+        """True si la URL ya quedó en el JSONL de una ejecución que se está reanudando."""
+        return isinstance(data, SectionSink) and data.is_done(url)
+
+    def section_sink(self, section):
+        """Destino de los registros de una sección (filtra el delta en modo incremental)."""
+        return SectionSink(section, writer=self.writer, crawl_state=self.crawl_state)
+
+    def start_output(self, sections):
+        """
+        Prepara la salida y devuelve las secciones pendientes. Al reanudar se usan
+        las secciones guardadas en el checkpoint y se saltan las ya completadas.
+        """
+        if not self.writer:
+            return sections
+        if self.writer.progress['sections']:
+            sections = self.writer.progress['sections']
+        else:
+            self.writer.progress['sections'] = sections
+        self.writer.open(self.final_data['metadata'])
+        self.writer.checkpoint()
+        completed = set(self.writer.progress['completed_sections'])
+        for section in completed:
+            print(f"[+] Sección {section.upper()} ya completada en la ejecución anterior.")
+        return {section: urls for section, urls in sections.items() if section not in completed}
+
+    def finish_section(self, section, sink):
+        """Cierra una sección: la marca en el checkpoint o la guarda en memoria."""
+        if self.writer:
+            self.writer.complete_section(section)
+        else:
+            self.final_data['results'][section] = sink.records
+
+    def finish_output(self, finished=True):
+        """Guarda el resultado final (JSON histórico o cierre del JSONL) y el estado del crawl."""
+        if self.writer:
+            self.writer.close(finished=finished)
+            print(f"\n--- {'PROCESO COMPLETADO' if finished else 'PROCESO INTERRUMPIDO'} ---")
+            print(f"[+] Registros guardados en: {self.writer.output_path}")
+            if finished:
+                print(f"[+] Para el formato histórico: python scrape_output.py {self.writer.output_path}")
+            else:
+                print("[+] Continúa con --resume.")
+        elif finished:
+            self.save_data(self.output_prefix())
+        else:
+            self.save_data("celsia_unified_data_interrupted")
+        if finished and self.incremental:
+            self.crawl_state.save()
+        if finished:
+            print(f"[+] Estadísticas de descarga: {self.stats}")
+        if finished and isinstance(self.session, CachedSession):
+            print(f"[+] Estadísticas de caché: {self.session.cache.stats}")
+
+    def output_prefix(self):
+        return "celsia_unified_delta" if self.incremental else "celsia_unified_data"
+
     def save_data(self, prefix="celsia_unified_data"):
         """Guarda los datos extraídos en un archivo JSON."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -216,8 +354,12 @@ class UnifiedCelsiaScraper:
         Orquesta todo el proceso de scraping: descubrimiento, procesamiento y guardado.
         """
         try:
-            # 1. Descubrir secciones
-            sections = self.discover_sections()
+            # 1. Descubrir secciones (o retomarlas del checkpoint)
+            if self.writer and self.writer.progress['sections']:
+                sections = self.writer.progress['sections']
+            else:
+                sections = self.discover_sections()
+            sections = self.start_output(sections)
             
             # Mapeo de secciones a funciones de procesamiento
             processors = {
@@ -237,27 +379,48 @@ class UnifiedCelsiaScraper:
                 
                 print(f"\n--- Procesando sección: {section.upper()} ---")
                 processor_func = processors.get(section, self.process_generic_link)
-                section_data = processor_func(urls)
-                self.final_data['results'][section] = section_data
+                sink = self.section_sink(section)
+                processor_func(urls, sink)
+                self.finish_section(section, sink)
 
-            # 3. Guardar los datos
-            self.save_data()
+            # 3. Guardar los datos (y el estado del crawl, si es incremental)
+            self.finish_output()
 
         except KeyboardInterrupt:
             print("\n[!] Proceso interrumpido por el usuario.")
-            self.save_data("celsia_unified_data_interrupted")
+            self.finish_output(finished=False)
         except Exception as e:
             print(f"\n[X] Ocurrió un error inesperado: {e}")
             import traceback
             traceback.print_exc()
+            if self.writer:
+                self.writer.close(finished=False)
 
 def main():
     """Función principal para ejecutar el scraper unificado."""
+    parser = argparse.ArgumentParser(description="Scraper unificado de Celsia")
+    parser.add_argument("--cache-dir", default=None, help="Carpeta de la caché HTTP (revalidación con ETag/Last-Modified)")
+    parser.add_argument("--offline", action="store_true", help="Re-ejecutar los parsers solo con el HTML en caché")
+    parser.add_argument("--incremental", action="store_true", help="Detenerse en artículos ya vistos y guardar solo el delta")
+    parser.add_argument("--state-file", default="celsia_crawl_state.json", help="Estado persistente del crawl incremental")
+    parser.add_argument("--output", default=None, help="JSONL de salida (por defecto celsia_unified_data_<fecha>.jsonl)")
+    parser.add_argument("--checkpoint", default="celsia_scrape_checkpoint.json", help="Archivo de checkpoint del progreso")
+    parser.add_argument("--resume", action="store_true", help="Continuar desde el último checkpoint")
+    parser.add_argument("--legacy-json", action="store_true", help="Guardar un único JSON al final (sin streaming)")
+    args = parser.parse_args()
+    output_path = None
+    if not args.legacy_json and not args.resume:
+        output_path = args.output or f"celsia_unified_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
     print("="*70)
     print("SCRAPER UNIFICADO DE CELSIA")
     print("="*70)
     
-    scraper = UnifiedCelsiaScraper(delay=1.0)
+    scraper = UnifiedCelsiaScraper(
+        delay=1.0, cache_dir=args.cache_dir, offline=args.offline,
+        incremental=args.incremental, state_path=args.state_file,
+        output_path=output_path, checkpoint_path=args.checkpoint, resume=args.resume
+    )
     scraper.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+"""
+Estado persistente del crawl de Celsia: URLs vistas, hash de su contenido y
+fecha del último recorrido. Permite el modo incremental del scraper unificado,
+que se detiene al llegar a artículos ya conocidos y solo emite el delta.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+
+class CrawlState:
+    """Mapa url -> {hash, first_seen, last_seen} guardado como JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.last_crawl = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.pages = data.get('pages', {})
+            self.last_crawl = data.get('last_crawl')
+
+    def is_known(self, url):
+        return url in self.pages
+
+    @staticmethod
+    def content_hash(record):
+        """Hash estable del registro extraído (sin la URL ni campos de control)."""
+        payload = {k: v for k, v in record.items() if k not in ('url', 'crawl_status')}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def record(self, record):
+        """Registra un resultado y devuelve 'new', 'changed' o 'unchanged'."""
+        url = record['url']
+        digest = self.content_hash(record)
+        now = datetime.now().isoformat()
+        previous = self.pages.get(url)
+        if previous is None:
+            self.pages[url] = {'hash': digest, 'first_seen': now, 'last_seen': now}
+            return 'new'
+        previous['last_seen'] = now
+        if previous['hash'] != digest:
+            previous['hash'] = digest
+            return 'changed'
+        return 'unchanged'
+
+    def delta(self, records):
+        """
+        Filtra una lista de resultados dejando solo los nuevos o modificados.
+        Los errores no se registran, así que se reintentan en el siguiente crawl.
+        """
+        changed = []
+        for record in records:
+            if 'error' in record:
+                continue
+            status = self.record(record)
+            if status != 'unchanged':
+                changed.append(dict(record, crawl_status=status))
+        return changed
+
+    def save(self):
+        self.last_crawl = datetime.now().isoformat()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'last_crawl': self.last_crawl, 'pages': self.pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,114 @@
+"""
+Extracción de HTML para los scrapers de Celsia.
+
+Los parsers del scraper unificado solo usan unos pocos selectores (enlaces de la
+portada, `div.content-type-default-body a.item-new`, `h1`, `main`, `p`), así que
+en lugar de construir el árbol completo de BeautifulSoup se consulta el árbol C
+de lxml con expresiones XPath precompiladas y solo se recorre el texto de los
+nodos que interesan.
+
+Las funciones son de módulo y devuelven tipos simples para poder ejecutarse en
+un `ProcessPoolExecutor` (ver `AsyncUnifiedCelsiaScraper`). Reproducen el
+resultado de `get_text(strip=True)` de BeautifulSoup: cada fragmento de texto se
+recorta y se concatenan sin separador.
+"""
+
+import re
+
+import lxml.html
+from lxml import etree
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+LINK_HREFS = etree.XPath("//a[@href]/@href")
+NEWS_LISTING_HREFS = etree.XPath(
+    f"//div[{_has_class('content-type-default-body')}]//a[{_has_class('item-new')}][@href]/@href"
+)
+FIRST_H1 = etree.XPath("(//h1)[1]")
+FIRST_MAIN = etree.XPath("(//main)[1]")
+ARTICLE_BODY = etree.XPath(f"(//div[{_has_class('text-content')}])[1]")
+PARAGRAPHS_AND_LISTS = etree.XPath(".//*[self::p or self::ul]")
+PARAGRAPHS = etree.XPath(".//p")
+# BeautifulSoup keeps the text of <script>, <style> and <template> apart and
+# get_text() leaves it out; itertext() would include it
+VISIBLE_TEXT = etree.XPath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+PHONE_PATTERN = re.compile(r'01\s?8000[\s\d]+|\(\d+\)[\s\d-]+')
+
+
+def parse_document(html):
+    """Parsea el documento con lxml; devuelve None si está vacío."""
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Documentos con declaración XML de encoding: lxml exige bytes
+        return lxml.html.document_fromstring(html.encode('utf-8'))
+    except etree.ParserError:
+        return None
+
+
+def node_text(node):
+    """Equivalente a `Tag.get_text(strip=True)` de BeautifulSoup."""
+    return ''.join(part.strip() for part in VISIBLE_TEXT(node))
+
+
+def first_text(root, xpath, default):
+    nodes = xpath(root) if root is not None else []
+    return node_text(nodes[0]) if nodes else default
+
+
+def link_hrefs(html):
+    """`href` de todos los enlaces del documento, en orden."""
+    root = parse_document(html)
+    return [str(href) for href in LINK_HREFS(root)] if root is not None else []
+
+
+def news_listing_hrefs(html):
+    """`href` de los artículos en una página del listado de la sala de prensa."""
+    root = parse_document(html)
+    return [str(href) for href in NEWS_LISTING_HREFS(root)] if root is not None else []
+
+
+def news_article(url, html):
+    """Título y contenido de una noticia."""
+    root = parse_document(html)
+    title = first_text(root, FIRST_H1, 'No título')
+    bodies = ARTICLE_BODY(root) if root is not None else []
+    if bodies:
+        content = ' '.join(node_text(node) for node in PARAGRAPHS_AND_LISTS(bodies[0]))
+    else:
+        content = 'No contenido.'
+    return {'url': url, 'title': title, 'content': content}
+
+
+def corporate_page(url, html):
+    """Título y resumen (primeros 15 párrafos de `main`) de una página corporativa."""
+    root = parse_document(html)
+    title = first_text(root, FIRST_H1, 'Sin título')
+    text = ''
+    if root is not None:
+        mains = FIRST_MAIN(root)
+        container = mains[0] if mains else root
+        text = ' '.join(node_text(p) for p in PARAGRAPHS(container)[:15])
+    return {'url': url, 'page_title': title, 'summary': text}
+
+
+def atencion_page(url, html):
+    """Título, resumen y datos de contacto de una página de atención al cliente."""
+    root = parse_document(html)
+    title = first_text(root, FIRST_H1, 'Sin título')
+    mains = FIRST_MAIN(root) if root is not None else []
+    text = ' '.join(node_text(p) for p in PARAGRAPHS(mains[0])) if mains else ''
+
+    emails = sorted(set(EMAIL_PATTERN.findall(html)))
+    phones = sorted(set(PHONE_PATTERN.findall(html)))
+
+    return {
+        'url': url, 'type': 'informational', 'page_title': title,
+        'summary': (text[:500] + '...') if len(text) > 500 else text,
+        'extracted_emails': emails, 'extracted_phones': phones
+    }
@@ -0,0 +1,140 @@
+"""
+Caché HTTP en disco para los scrapers de Celsia.
+
+Guarda el cuerpo de cada respuesta (comprimido con gzip) junto con su ETag y
+Last-Modified. En la siguiente descarga se revalida con If-None-Match /
+If-Modified-Since, así que un re-crawl sin cambios cuesta casi solo respuestas 304.
+
+El modo offline sirve todo desde la caché sin tocar la red: permite volver a
+correr los parsers sobre el HTML ya descargado.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class ResponseCache:
+    """Almacén de respuestas en disco: <cache_dir>/<ab>/<sha256>.json + .html.gz"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.html.gz")
+
+    def load(self, url):
+        """Devuelve (entrada, cuerpo) o (None, None) si la URL no está en caché."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                body = f.read()
+            return entry, body
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, url, body, headers):
+        """Guarda el cuerpo y los validadores de una respuesta 200."""
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        entry = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_type': headers.get('Content-Type'),
+            'stored_at': time.time(),
+            'validated_at': time.time(),
+        }
+        # Escritura atómica: un crash nunca deja un cuerpo a medias
+        with gzip.open(body_path + '.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(body_path + '.tmp', body_path)
+        self._write_meta(meta_path, entry)
+        self.stats['stored'] += 1
+        return entry
+
+    def mark_validated(self, url, entry):
+        """Registra que el servidor confirmó (304) que la copia sigue vigente."""
+        meta_path, _ = self._paths(url)
+        entry['validated_at'] = time.time()
+        self._write_meta(meta_path, entry)
+        self.stats['revalidated'] += 1
+
+    @staticmethod
+    def _write_meta(meta_path, entry):
+        # Igual que el cuerpo: nunca queda un JSON truncado si el proceso muere
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+
+class OfflineCacheMiss(requests.ConnectionError):
+    """La URL no está en caché y el modo offline prohíbe ir a la red."""
+
+
+class CachedSession(requests.Session):
+    """
+    `requests.Session` con caché condicional: los GET se revalidan contra la copia
+    en disco y, en modo offline, se responden exclusivamente desde ella.
+    """
+
+    def __init__(self, cache_dir, offline=False):
+        super().__init__()
+        self.cache = ResponseCache(cache_dir)
+        self.offline = offline
+
+    def _cached_response(self, url, entry, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.headers = CaseInsensitiveDict({'Content-Type': entry.get('content_type') or 'text/html; charset=utf-8'})
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or 'utf-8'
+        response.from_cache = True
+        return response
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != 'GET':
+            return super().request(method, url, *args, **kwargs)
+
+        entry, body = self.cache.load(url)
+        if self.offline:
+            if entry is None:
+                raise OfflineCacheMiss(f"Modo offline: {url} no está en caché.")
+            self.cache.stats['hits'] += 1
+            return self._cached_response(url, entry, body)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
+        response = super().request(method, url, *args, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.mark_validated(url, entry)
+            self.cache.stats['hits'] += 1
+            return self._cached_response(url, entry, body)
+        if response.status_code == 200:
+            self.cache.store(url, response.content, response.headers)
+        self.cache.stats['misses'] += 1
+        response.from_cache = False
+        return response
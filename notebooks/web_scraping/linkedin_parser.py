@@ -0,0 +1,130 @@
+"""
+Parser offline de publicaciones de LinkedIn.
+
+`LinkedInScraper` solo toma una instantánea (`driver.page_source`) por cada paso
+de scroll; todas las publicaciones se extraen aquí con lxml, sin llamadas al
+WebDriver. Cada publicación se identifica por su URN (`data-urn`, p. ej.
+`urn:li:activity:7123...`), así que una publicación presente en varias
+instantáneas solo se extrae una vez.
+
+Como no depende de Selenium, también corre sobre instantáneas guardadas:
+
+    python linkedin_parser.py snapshots/*.html --output linkedin_posts.json
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import time
+
+import lxml.html
+from lxml import etree
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Publicaciones de primer nivel (un re-post contiene otra publicación anidada)
+POSTS = etree.XPath(
+    f"//*[{_has_class('feed-shared-update-v2')}][not(ancestor::*[{_has_class('feed-shared-update-v2')}])]"
+)
+OWN_OR_ANCESTOR_URN = etree.XPath("ancestor-or-self::*[@data-urn][1]/@data-urn")
+DESCENDANT_URN = etree.XPath(".//*[@data-urn][1]/@data-urn")
+
+FIELDS = {
+    'text': (etree.XPath(f".//*[{_has_class('feed-shared-update-v2__description')}]"), ""),
+    'date': (etree.XPath(f".//*[{_has_class('feed-shared-actor__sub-description')}]"), ""),
+    'reactions': (etree.XPath(f".//*[{_has_class('social-details-social-counts__reactions-count')}]"), "0"),
+    'comments': (etree.XPath(f".//*[{_has_class('social-details-social-counts__comments')}]"), "0"),
+}
+
+
+def node_text(node):
+    """Texto del nodo con los espacios colapsados (similar a `WebElement.text`)."""
+    return ' '.join(''.join(node.itertext()).split())
+
+
+def post_urn(post):
+    """URN de la publicación; si LinkedIn no lo expone, un hash estable del contenido."""
+    urns = OWN_OR_ANCESTOR_URN(post) or DESCENDANT_URN(post)
+    if urns:
+        return str(urns[0])
+    digest = hashlib.sha1(etree.tostring(post, method='text', encoding='unicode').encode('utf-8')).hexdigest()
+    return f"sha1:{digest}"
+
+
+def extract_post(post):
+    """Campos de una publicación a partir de su nodo lxml."""
+    post_data = {}
+    for field, (xpath, default) in FIELDS.items():
+        nodes = xpath(post)
+        post_data[field] = node_text(nodes[0]) if nodes else default
+    return post_data
+
+
+def parse_posts(html, seen_urns=None):
+    """
+    Devuelve las publicaciones de una instantánea que no estén en `seen_urns`
+    (y agrega sus URN al conjunto).
+    """
+    seen_urns = set() if seen_urns is None else seen_urns
+    try:
+        root = lxml.html.document_fromstring(html)
+    except etree.ParserError:
+        return []
+
+    posts = []
+    for post in POSTS(root):
+        urn = post_urn(post)
+        if urn in seen_urns:
+            continue
+        seen_urns.add(urn)
+        post_data = extract_post(post)
+        post_data['urn'] = urn
+        posts.append(post_data)
+    return posts
+
+
+def parse_snapshots(snapshots, max_posts=None):
+    """Parsea en bloque una secuencia de instantáneas HTML, deduplicando por URN."""
+    seen_urns = set()
+    posts = []
+    for html in snapshots:
+        posts.extend(parse_posts(html, seen_urns))
+        if max_posts and len(posts) >= max_posts:
+            break
+    posts = posts[:max_posts] if max_posts else posts
+    for i, post in enumerate(posts):
+        post['post_id'] = i + 1
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae publicaciones de instantáneas HTML de LinkedIn")
+    parser.add_argument("snapshots", nargs="+", help="Archivos HTML (se procesan en orden)")
+    parser.add_argument("--max-posts", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Guardar las publicaciones en este JSON")
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.snapshots for path in glob.glob(pattern))
+    snapshots = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshots.append(f.read())
+
+    start = time.perf_counter()
+    posts = parse_snapshots(snapshots, args.max_posts)
+    elapsed = time.perf_counter() - start
+    print(f"[+] {len(snapshots)} instantáneas, {len(posts)} publicaciones únicas en {elapsed:.3f}s "
+          f"({len(snapshots) / max(elapsed, 1e-9):.1f} instantáneas/s)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(posts, f, ensure_ascii=False, indent=2)
+        print(f"Datos guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
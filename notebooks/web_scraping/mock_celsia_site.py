@@ -0,0 +1,240 @@
+"""
+Réplica local del sitio de Celsia para probar y medir los scrapers sin tocar celsia.com.
+
+Genera (de forma determinista, a partir de una semilla) la estructura que esperan
+los scrapers:
+- portada con enlaces a sala de prensa, quiénes somos, atención al cliente,
+  portales de clientes y enlaces genéricos,
+- listado paginado `/es/sala-de-prensa/?current_paged=N` con `a.item-new`,
+- páginas de artículos (`h1` + `div.text-content`),
+- páginas corporativas y de atención al cliente (con correos y teléfonos).
+
+Se pueden configurar la latencia, la tasa de errores 503 y el número de páginas.
+Las respuestas llevan ETag, así que también sirve para medir la caché HTTP.
+
+Uso como servidor independiente:
+    python mock_celsia_site.py --port 8765 --news-pages 20 --latency-ms 50 --error-rate 0.05
+"""
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+WORDS = (
+    "energía solar celsia clientes servicio factura tarifa tolima valle red eléctrica "
+    "proyecto comunidad sostenibilidad movilidad eléctrica inversión planta eólica "
+    "hidroeléctrica transmisión distribución innovación territorio alumbrado público"
+).split()
+
+CORPORATE_PATHS = [
+    "/es/quienes-somos/", "/es/la-nueva-era-de-la-energia/", "/es/que-hacemos/",
+    "/es/sostenibilidad/", "/es/gobierno-corporativo/", "/es/fundacion/",
+]
+ATENCION_PATHS = [
+    "/es/atencion-al-cliente/", "/es/atencion-al-cliente/reporta-un-dano/",
+    "/es/servicio-al-cliente/", "/es/contacto/", "/es/ayuda/",
+]
+EXTERNAL_LINKS = [
+    "https://clientes.celsia.com/home-pqr", "https://digiturno.celsia.com/",
+    "https://www.celsia.com/components/payments/paga-tus-facturas",
+    "https://internet.celsia.com/", "https://inversionistas.celsia.com/",
+    "/es/puntos-de-atencion/",
+]
+
+
+class MockCelsiaSite:
+    """Contenido generado del sitio y contadores de lo servido."""
+
+    def __init__(self, news_pages=10, articles_per_page=9, paragraphs=8, latency_ms=0.0,
+                 latency_jitter_ms=0.0, error_rate=0.0, seed=42):
+        self.news_pages = news_pages
+        self.articles_per_page = articles_per_page
+        self.paragraphs = paragraphs
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors_injected': 0, 'not_found': 0, 'not_modified': 0, 'bytes': 0}
+
+    # --- Generación de páginas ---
+
+    def text(self, key, n_words):
+        rng = random.Random(f"{self.seed}:{key}")
+        return ' '.join(rng.choice(WORDS) for _ in range(n_words))
+
+    def layout(self, title, body):
+        nav = ''.join(f'<li><a href="{path}">{path.strip("/").split("/")[-1]}</a></li>' for path in CORPORATE_PATHS)
+        return (
+            f'<!DOCTYPE html><html lang="es"><head><meta charset="utf-8"><title>{title} | Celsia</title>'
+            f'<script>window.dataLayer=[];</script></head><body><header><nav><ul>{nav}</ul></nav></header>'
+            f'{body}<footer><p>Celsia, energía que quieres.</p></footer></body></html>'
+        )
+
+    def article_path(self, page_num, index):
+        return f"/es/sala-de-prensa/noticia-{page_num}-{index}/"
+
+    def home(self):
+        links = ['/es/sala-de-prensa/'] + CORPORATE_PATHS + ATENCION_PATHS + EXTERNAL_LINKS
+        body = '<main>' + ''.join(f'<a href="{href}">{href}</a>' for href in links) + '</main>'
+        return self.layout("Inicio", body)
+
+    def news_listing(self, page_num):
+        if page_num > self.news_pages:
+            return self.layout("Sala de prensa", '<div class="content-type-default-body"></div>')
+        items = ''.join(
+            f'<a class="item-new" href="{self.article_path(page_num, i)}"><h3>{self.text((page_num, i, "t"), 6)}</h3></a>'
+            for i in range(self.articles_per_page)
+        )
+        return self.layout("Sala de prensa", f'<div class="content-type-default-body">{items}</div>')
+
+    def article(self, path):
+        paragraphs = ''.join(f'<p>{self.text((path, k), 60)}</p>' for k in range(self.paragraphs))
+        # Scripts y estilos dentro del contenido: su texto no debe llegar a los registros
+        paragraphs += f'<p>{self.text((path, "js"), 5)}<script>dataLayer.push({{"event": "read"}});</script></p>'
+        paragraphs += '<style>.text-content p{margin:0}</style>'
+        body = (f'<main><h1>{self.text((path, "title"), 8)}</h1>'
+                f'<div class="text-content">{paragraphs}<ul><li>{self.text((path, "li"), 10)}</li></ul></div></main>')
+        return self.layout("Noticia", body)
+
+    def corporate(self, path):
+        paragraphs = ''.join(f'<p>{self.text((path, k), 40)}</p>' for k in range(self.paragraphs))
+        paragraphs += f'<p>{self.text((path, "js"), 5)}<script>trackView("{path}");</script></p>'
+        return self.layout("Corporativo", f'<main><h1>{self.text((path, "title"), 4)}</h1>{paragraphs}</main>')
+
+    def atencion(self, path):
+        paragraphs = ''.join(f'<p>{self.text((path, k), 30)}</p>' for k in range(3))
+        contact = '<p>Escríbenos a servicioalcliente@celsia.com o llama al 01 8000 112 115 o al (602) 486 9999.</p>'
+        return self.layout("Atención al cliente", f'<main><h1>{self.text((path, "title"), 4)}</h1>{paragraphs}{contact}</main>')
+
+    def page(self, raw_path):
+        """Devuelve el HTML de una ruta o None (404)."""
+        parts = urlsplit(raw_path)
+        path, query = parts.path, parse_qs(parts.query)
+        if path == '/':
+            return self.home()
+        if path == '/es/sala-de-prensa/':
+            return self.news_listing(int(query.get('current_paged', ['1'])[0]))
+        if path.startswith('/es/sala-de-prensa/noticia-'):
+            page_num, index = (int(n) for n in path.rstrip('/').rsplit('-', 2)[1:])
+            if page_num <= self.news_pages and index < self.articles_per_page:
+                return self.article(path)
+            return None
+        if path in CORPORATE_PATHS:
+            return self.corporate(path)
+        if path in ATENCION_PATHS or path == '/es/puntos-de-atencion/':
+            return self.atencion(path)
+        return None
+
+    # --- Comportamiento de red ---
+
+    def inject_latency(self):
+        if self.latency_ms or self.latency_jitter_ms:
+            with self.lock:
+                jitter = self.random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+            time.sleep(max(self.latency_ms + jitter, 0) / 1000)
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+
+def make_handler(site):
+    class MockCelsiaHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, status, body, etag=None):
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            if etag:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(payload)
+            site.count('bytes', len(payload))
+
+        def do_GET(self):
+            site.count('requests')
+            site.inject_latency()
+            if site.should_fail():
+                site.count('errors_injected')
+                self.send_body(503, 'Service Unavailable')
+                return
+            html = site.page(self.path)
+            if html is None:
+                site.count('not_found')
+                self.send_body(404, 'Not Found')
+                return
+            etag = '"' + hashlib.sha1(html.encode('utf-8')).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                site.count('not_modified')
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_body(200, html, etag)
+
+    return MockCelsiaHandler
+
+
+def start_mock_site(site, host='127.0.0.1', port=0):
+    """Levanta el servidor en un hilo y devuelve (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(site))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def add_site_arguments(parser):
+    parser.add_argument("--news-pages", type=int, default=10, help="Páginas del listado de la sala de prensa")
+    parser.add_argument("--articles-per-page", type=int, default=9)
+    parser.add_argument("--paragraphs", type=int, default=8, help="Párrafos por artículo")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia media por respuesta")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def site_from_args(args):
+    return MockCelsiaSite(
+        news_pages=args.news_pages, articles_per_page=args.articles_per_page, paragraphs=args.paragraphs,
+        latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate, seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita el sitio de Celsia")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    site = site_from_args(args)
+    server, base_url = start_mock_site(site, args.host, args.port)
+    print(f"[+] Sitio simulado en {base_url} ({args.news_pages} páginas de noticias). Ctrl+C para detener.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n[+] Servido: {site.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Salida en streaming del Scraper Unificado de Celsia.
+
+En lugar de un único `json.dump` al final, cada registro se agrega a un archivo
+JSONL apenas se extrae y el progreso del crawl se guarda periódicamente en un
+checkpoint. Un crash solo pierde lo que no alcanzó a escribirse y `--resume`
+continúa desde el último checkpoint.
+
+Formato del JSONL (una línea por objeto):
+    {"type": "metadata", "metadata": {...}}
+    {"type": "record", "section": "noticias", "data": {...}}
+
+`jsonl_to_unified_json` convierte el JSONL al formato histórico
+`celsia_unified_data_*.json` ({'metadata': ..., 'results': {sección: [...]}}).
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+
+def read_jsonl(path):
+    """Itera las líneas válidas de un JSONL (ignora una última línea truncada por un crash)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+class JsonlScrapeWriter:
+    """Escritor append-only de registros con checkpoints del progreso del crawl."""
+
+    def __init__(self, output_path, checkpoint_path, checkpoint_every=25):
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.progress = {
+            'output_path': output_path,
+            'started_at': datetime.now().isoformat(),
+            'sections': {},
+            'completed_sections': [],
+            'noticias_last_page': 0,
+            'records': 0,
+            'finished': False,
+        }
+        self.done_urls = {}
+        self.file = None
+        self.pending = 0
+        self.resumed = False
+
+    @classmethod
+    def resume(cls, checkpoint_path, checkpoint_every=25):
+        """Reabre una ejecución interrumpida a partir de su checkpoint."""
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+        writer = cls(progress['output_path'], checkpoint_path, checkpoint_every)
+        writer.progress = progress
+        writer.resumed = True
+        if os.path.exists(writer.output_path):
+            writer._truncate_partial_line()
+            for item in read_jsonl(writer.output_path):
+                if item.get('type') == 'record' and 'url' in item.get('data', {}):
+                    writer.done_urls.setdefault(item['section'], set()).add(item['data']['url'])
+        return writer
+
+    def _truncate_partial_line(self):
+        """Si el crash dejó una línea a medias, la descarta antes de seguir agregando."""
+        with open(self.output_path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def open(self, metadata):
+        """Abre el JSONL: una ejecución nueva lo reemplaza, una reanudada agrega al final."""
+        is_new = not (self.resumed and os.path.exists(self.output_path))
+        self.file = open(self.output_path, 'w' if is_new else 'a', encoding='utf-8')
+        if is_new:
+            self._write_line({'type': 'metadata', 'metadata': metadata})
+        return self
+
+    def _write_line(self, obj):
+        self.file.write(json.dumps(obj, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def is_done(self, section, url):
+        return url in self.done_urls.get(section, ())
+
+    def write(self, section, record):
+        self._write_line({'type': 'record', 'section': section, 'data': record})
+        if 'url' in record:
+            self.done_urls.setdefault(section, set()).add(record['url'])
+        self.progress['records'] += 1
+        self.pending += 1
+        if self.pending >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self, **updates):
+        """Guarda el progreso de forma atómica."""
+        self.progress.update(updates)
+        self.progress['updated_at'] = datetime.now().isoformat()
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.progress, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+        self.pending = 0
+
+    def complete_section(self, section):
+        if section not in self.progress['completed_sections']:
+            self.progress['completed_sections'].append(section)
+        self.checkpoint()
+
+    def close(self, finished=False):
+        if self.file:
+            self.file.close()
+            self.file = None
+        self.checkpoint(finished=finished)
+
+
+class SectionSink:
+    """
+    Destino de los registros de una sección. Sin escritor los acumula en memoria
+    (comportamiento histórico); con escritor los manda directo al JSONL. En modo
+    incremental filtra lo que no cambió antes de emitirlo.
+    """
+
+    def __init__(self, section, writer=None, crawl_state=None):
+        self.section = section
+        self.writer = writer
+        self.crawl_state = crawl_state
+        self.records = []
+
+    def append(self, record):
+        if self.crawl_state is not None:
+            delta = self.crawl_state.delta([record])
+            if not delta:
+                return
+            record = delta[0]
+        self.store(record)
+
+    def store(self, record):
+        if self.writer is not None:
+            self.writer.write(self.section, record)
+        else:
+            self.records.append(record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def is_done(self, url):
+        return self.writer is not None and self.writer.is_done(self.section, url)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+def jsonl_to_unified_json(jsonl_path, output_path=None):
+    """Convierte un JSONL del scraper al formato `celsia_unified_data_*.json`."""
+    final_data = {'metadata': {}, 'results': {}}
+    for item in read_jsonl(jsonl_path):
+        if item.get('type') == 'metadata':
+            final_data['metadata'] = item['metadata']
+        elif item.get('type') == 'record':
+            final_data['results'].setdefault(item['section'], []).append(item['data'])
+
+    if output_path is None:
+        base = os.path.splitext(jsonl_path)[0]
+        output_path = base + '.json'
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(final_data, f, ensure_ascii=False, indent=4)
+    print(f"[+] {sum(len(v) for v in final_data['results'].values())} registros convertidos a: {output_path}")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte la salida JSONL del scraper al formato JSON histórico.")
+    parser.add_argument("jsonl", help="Archivo celsia_unified_data_*.jsonl")
+    parser.add_argument("--output", default=None, help="Ruta del JSON (por defecto, el mismo nombre con .json)")
+    args = parser.parse_args()
+    jsonl_to_unified_json(args.jsonl, args.output)
+
+
+if __name__ == "__main__":
+    main()
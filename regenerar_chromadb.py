@@ -9,7 +9,8 @@ import os
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
 from langchain_ollama import OllamaEmbeddings
-import re
+
+from src.data.processing import limpiar_texto_para_rag, es_chunk_valido
 
 print("=" * 80)
 print("🔄 REGENERACIÓN DE BASE DE DATOS VECTORIAL")
@@ -30,40 +31,7 @@ print(f"✅ Se cargaron {len(df)} chunks totales")
 # ===== PASO 2: LIMPIAR DATOS =====
 print("\n🧹 Paso 2: Limpiando datos...")
 
-# Función de limpieza mejorada
-def limpiar_texto_para_rag(texto):
-    if pd.isna(texto) or not isinstance(texto, str):
-        return ""
-    
-    # a) Eliminar emojis
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F900-\U0001F9FF"
-        "\U00002702-\U000027B0"
-        "]+", flags=re.UNICODE)
-    texto = emoji_pattern.sub(r'', texto)
-    
-    # Eliminar caracteres especiales manteniendo puntuación básica
-    texto = re.sub(r'[^a-zA-Z0-9\sñáéíóúüÑÁÉÍÓÚÜ.,;:¿?¡!()-]', '', texto)
-    
-    # Eliminar patrones repetitivos
-    patron_frase_completa = r'\bEdición\s*\d+\s*Tolima\b\.?'
-    texto = re.sub(patron_frase_completa, '', texto, flags=re.IGNORECASE)
-    
-    # Eliminar palabras sueltas problemáticas
-    palabras_sueltas_a_eliminar = ['hashtag', 'undefined']
-    patron_palabras_sueltas = r'\b(' + '|'.join(palabras_sueltas_a_eliminar) + r')\b'
-    texto = re.sub(patron_palabras_sueltas, '', texto, flags=re.IGNORECASE)
-
-    # Limpieza final: eliminar espacios extra
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    
-    return texto
-
-# Aplicar limpieza
+# Aplicar limpieza (función compartida con el pipeline de ingestión en src/data/processing.py)
 df['chunk_limpio'] = df['chunk'].apply(limpiar_texto_para_rag)
 
 # ===== PASO 3: FILTRAR CHUNKS PROBLEMÁTICOS =====
@@ -81,16 +49,6 @@ df = df.drop_duplicates(subset=['chunk_limpio'])
 print(f"  - Eliminados {inicial - len(df)} chunks duplicados")
 
 # 3. Eliminar chunks que solo tienen palabras repetitivas o sin sentido
-def es_chunk_valido(texto):
-    # Verificar que tenga al menos 3 palabras diferentes
-    palabras = texto.split()
-    if len(set(palabras)) < 3:
-        return False
-    # Verificar que tenga al menos una palabra de más de 4 letras
-    if not any(len(p) > 4 for p in palabras):
-        return False
-    return True
-
 inicial = len(df)
 df = df[df['chunk_limpio'].apply(es_chunk_valido)]
 print(f"  - Eliminados {inicial - len(df)} chunks sin contenido significativo")
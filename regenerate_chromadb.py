@@ -1,67 +1,63 @@
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_chroma import Chroma
-# No longer importing JSONLoader from langchain_community
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
 
-# Import document loading utility
-from src.data.processing import load_documents_from_json
+# Import document loading utility (runs inside the worker processes)
+from src.data.processing import process_source_file
+from src.data.vectorstore import fingerprint_metadata
+from src.utils.config import CHROMA_PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME, EMBEDDING_MODEL
 
 # Load environment variables
 load_dotenv()
 
 # --- Configuration ---
-CHROMA_PERSIST_DIRECTORY = "./chromadb_storage"
-CHROMA_COLLECTION_NAME = "rag_collection"
 SOURCE_DATA_DIRECTORY = "./data/source"
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+EMBEDDING_BATCH_SIZE = 100
 
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in environment variables. Please set it in your .env file.")
 
 
+def print_ingestion_report(reports):
+    """Prints one line per source file with what the worker produced."""
+    print("\n--- Ingestion report ---")
+    print(f"{'file':<55} {'docs':>6} {'chunks':>7} {'KB':>9} {'parse s':>8}  error")
+    for r in sorted(reports, key=lambda r: r["file"]):
+        print(
+            f"{r['file']:<55} {r['documents']:>6} {r['chunks']:>7} "
+            f"{r['bytes'] / 1024:>9.1f} {r['parse_seconds']:>8.2f}  {r['error'] or '-'}"
+        )
+    failed = [r for r in reports if r["error"]]
+    print(
+        f"Total: {sum(r['documents'] for r in reports)} documents, "
+        f"{sum(r['chunks'] for r in reports)} chunks, {len(failed)} file(s) with errors."
+    )
+
 
-def regenerate_chromadb():
+def regenerate_chromadb(
+    source_directory: str = SOURCE_DATA_DIRECTORY,
+    workers: int = None,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200
+):
     print(f"Starting ChromaDB regeneration with GoogleGenerativeAIEmbeddings...")
 
-    # Initialize GoogleGenerativeAIEmbeddings
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-
-    # Load documents from source directory
-    documents = []
-    for filename in os.listdir(SOURCE_DATA_DIRECTORY):
-        if filename.endswith(".json"):
-            file_path = os.path.join(SOURCE_DATA_DIRECTORY, filename)
-            print(f"Loading documents from {file_path}...")
-            try:
-                loaded_docs = load_documents_from_json(file_path)
-                documents.extend(loaded_docs)
-                print(f"Loaded {len(loaded_docs)} documents from {filename}.")
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
-                continue
-    
-    if not documents:
+    source_files = sorted(
+        os.path.join(source_directory, filename)
+        for filename in os.listdir(source_directory)
+        if filename.endswith(".json")
+    )
+    if not source_files:
         print("No documents found to process. Exiting.")
         return
 
-    print(f"Total documents loaded: {len(documents)}")
-
-    # Split documents into chunks (optional, if documents are already chunked, this might be redundant)
-    # Based on the names (e.g., celsia_processed_..._chunks.json), they might already be chunked.
-    # If they are already chunks, you might skip this step or use a splitter that ensures proper formatting.
-    # For now, let's assume raw documents and apply a splitter.
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        length_function=len,
-        is_separator_regex=False,
-    )
-    texts = text_splitter.split_documents(documents)
-    print(f"Split into {len(texts)} text chunks.")
+    # Initialize GoogleGenerativeAIEmbeddings
+    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
 
     # Delete existing ChromaDB directory to ensure a clean slate
     if os.path.exists(CHROMA_PERSIST_DIRECTORY):
@@ -70,17 +66,50 @@ def regenerate_chromadb():
         shutil.rmtree(CHROMA_PERSIST_DIRECTORY)
         print("Existing ChromaDB deleted.")
 
-    # Create and persist the new ChromaDB vector store
     print(f"Creating new ChromaDB collection '{CHROMA_COLLECTION_NAME}'...")
-    db = Chroma.from_documents(
-        documents=texts,
-        embedding=embeddings,
+    db = Chroma(
         persist_directory=CHROMA_PERSIST_DIRECTORY,
-        collection_name=CHROMA_COLLECTION_NAME
+        embedding_function=embeddings,
+        collection_name=CHROMA_COLLECTION_NAME,
+        collection_metadata=fingerprint_metadata()
     )
+
+    # Files are loaded, cleaned and chunked in parallel; the embedding stage
+    # consumes each file's chunks as soon as its worker finishes.
+    workers = workers or os.cpu_count() or 1
+    print(f"Processing {len(source_files)} source file(s) with {workers} worker(s)...")
+    reports = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_source_file, path, chunk_size, chunk_overlap): path
+            for path in source_files
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            report, chunks = result["report"], result["chunks"]
+            reports.append(report)
+            if report["error"]:
+                print(f"Error loading {report['file']}: {report['error']}")
+                continue
+            print(f"Loaded {report['documents']} documents ({len(chunks)} chunks) from {report['file']}.")
+            for start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+                db.add_documents(chunks[start:start + EMBEDDING_BATCH_SIZE])
+
+    print_ingestion_report(reports)
     print("New ChromaDB generated and persisted successfully.")
     print(f"Number of items in the new collection: {db._collection.count()}")
 
-if __name__ == "__main__":
-    regenerate_chromadb()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate the ChromaDB collection from ./data/source.")
+    parser.add_argument("--source-dir", default=SOURCE_DATA_DIRECTORY, help="Directory with the source JSON files.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: number of CPUs).")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    args = parser.parse_args()
+    regenerate_chromadb(
+        source_directory=args.source_dir,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap
+    )
@@ -0,0 +1,233 @@
+"""
+Replay de tráfico capturado (QUERY_LOG_PATH) contra distintas configuraciones
+
+Vuelve a ejecutar un log de consultas (JSONL de /chat, incluidos los archivos
+rotados .1, .2, ...) contra una o varias configuraciones y compara latencias y
+aciertos de caché con la primera (línea base). Cada configuración se ejecuta en
+su propio proceso, con main.app en memoria y sus variables de entorno, p. ej.:
+
+    --config base:
+    --config prefetch:RAG_PREFETCH=true
+    --config context:RAG_TOOL_MODE=context,RETRIEVER_K=3
+    --config qwen8b:OLLAMA_RAG_MODEL=qwen3:8b
+
+Con --stub se usan los backends simulados (STUB_BACKENDS=true, ver load_test.py);
+sin él, Ollama, los embeddings y ChromaDB configurados.
+
+Uso:
+    python replay_queries.py logs/queries.jsonl --stub
+    python replay_queries.py logs/queries.jsonl --config base: --config prefetch:RAG_PREFETCH=true --timing original --speed 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Counters compared between configurations (cache / short-circuit behaviour)
+CACHE_COUNTERS = (
+    "rag_prefetch_started",
+    "rag_prefetch_hits",
+    "rag_prefetch_misses",
+    "rag_short_circuits",
+    "rag_low_relevance_skips",
+    "chat_degraded_answers{source=cache}",
+)
+
+
+def load_records(path, limit=None):
+    """Registros del log y de sus rotaciones, ordenados por llegada."""
+    records = []
+    rotated = [p for p in glob.glob(glob.escape(path) + ".*") if p[len(path) + 1:].isdigit()]
+    for file_path in rotated + [path]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r", encoding="utf-8") as f:
+            records += [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r["t"])
+    return records[:limit] if limit else records
+
+
+def summarize(latencies):
+    from load_test import percentile
+
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {f"p{p}_ms": round(percentile(latencies, p) * 1000, 1) for p in (50, 95, 99)}
+
+
+# --- Worker: one configuration, in its own process ---
+
+async def replay(records, timing, speed, concurrency):
+    import httpx
+    import main
+    from src.utils import metrics
+
+    await main.startup_event()
+    latencies, statuses, degraded = [], {}, 0
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+        async def send(record):
+            nonlocal degraded
+            payload = {"user_message": record["query"], "session_id": f"replay-{record['session']}"}
+            if record.get("overrides"):
+                payload["overrides"] = record["overrides"]
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200 and response.json().get("degraded"):
+                degraded += 1
+
+        started = time.perf_counter()
+        if timing == "original":
+            # Same inter-arrival gaps as the capture (divided by --speed)
+            first = records[0]["t"]
+            tasks = []
+            for record in records:
+                await asyncio.sleep(max(started + (record["t"] - first) / speed - time.perf_counter(), 0))
+                tasks.append(asyncio.create_task(send(record)))
+            await asyncio.gather(*tasks)
+        else:
+            # As fast as possible; turns of one session stay in order
+            sessions = {}
+            for record in records:
+                sessions.setdefault(record["session"], []).append(record)
+
+            async def run_session(turns):
+                for record in turns:
+                    async with semaphore:
+                        await send(record)
+
+            await asyncio.gather(*(run_session(turns) for turns in sessions.values()))
+        elapsed = time.perf_counter() - started
+
+    counters = metrics.snapshot()
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "errors": sum(count for code, count in statuses.items() if code != 200),
+        "degraded": degraded,
+        **summarize(latencies),
+        "counters": {name: counters.get(name, 0) for name in CACHE_COUNTERS},
+    }
+
+
+def run_worker(args):
+    if args.stub:
+        from load_test import seed_vectorstore
+
+        seed_vectorstore(args.max_chunks)
+    records = load_records(args.log, args.limit)
+    return asyncio.run(replay(records, args.timing, args.speed, args.concurrency))
+
+
+# --- Controller: one worker process per configuration, then the comparison ---
+
+def parse_config(value):
+    name, _, assignments = value.partition(":")
+    env = dict(item.split("=", 1) for item in assignments.split(",") if "=" in item)
+    return name or "config", env
+
+
+def run_config(args, name, env):
+    worker_env = {**os.environ, **env}
+    if args.stub:
+        worker_env.setdefault("STUB_BACKENDS", "true")
+        worker_env.setdefault("CHROMA_PERSIST_DIRECTORY", tempfile.mkdtemp(prefix="celsia-replay-"))
+    command = [
+        sys.executable, os.path.abspath(__file__), args.log, "--worker",
+        "--timing", args.timing, "--speed", str(args.speed), "--concurrency", str(args.concurrency),
+        "--max-chunks", str(args.max_chunks),
+    ]
+    if args.limit:
+        command += ["--limit", str(args.limit)]
+    if args.stub:
+        command.append("--stub")
+    print(f"▶️  {name}: {env or '(configuración actual)'}")
+    result = subprocess.run(command, env=worker_env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ {name} falló:\n{result.stderr[-2000:]}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def hit_rate(counters):
+    started = counters.get("rag_prefetch_started", 0)
+    return counters.get("rag_prefetch_hits", 0) / started if started else 0.0
+
+
+def print_comparison(captured, results):
+    print("\n" + "=" * 96)
+    print(f"{'configuración':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8} {'degrad.':>8} "
+          f"{'prefetch hit':>13} {'cortocircuitos':>15}")
+    print(f"{'(capturado)':<16} {captured['p50_ms']:>9.1f} {captured['p95_ms']:>9.1f} {captured['p99_ms']:>9.1f}")
+    for name, report in results.items():
+        counters = report["counters"]
+        print(f"{name:<16} {report['p50_ms']:>9.1f} {report['p95_ms']:>9.1f} {report['p99_ms']:>9.1f} "
+              f"{report['errors']:>8} {report['degraded']:>8} {hit_rate(counters):>13.0%} "
+              f"{counters['rag_short_circuits']:>15}")
+
+    if len(results) > 1:
+        (base_name, base), *others = results.items()
+        print(f"\nDiferencias contra '{base_name}':")
+        for name, report in others:
+            deltas = " | ".join(
+                f"{key} {report[key] - base[key]:+.1f} ms" for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+            cache = " | ".join(
+                f"{counter} {report['counters'][counter] - base['counters'][counter]:+d}"
+                for counter in CACHE_COUNTERS if report["counters"][counter] != base["counters"][counter]
+            )
+            print(f"  {name}: {deltas}" + (f"\n    cachés: {cache}" if cache else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de un log de consultas contra varias configuraciones")
+    parser.add_argument("log", help="Archivo JSONL capturado (QUERY_LOG_PATH)")
+    parser.add_argument("--config", action="append", default=[],
+                        help="nombre:VAR=valor,VAR=valor (repetible; la primera es la línea base)")
+    parser.add_argument("--timing", choices=["original", "max"], default="max",
+                        help="original: respeta los tiempos entre llegadas; max: lo más rápido posible")
+    parser.add_argument("--speed", type=float, default=1.0, help="Factor de aceleración con --timing original")
+    parser.add_argument("--concurrency", type=int, default=10, help="Peticiones simultáneas con --timing max")
+    parser.add_argument("--limit", type=int, default=None, help="Solo los primeros N registros")
+    parser.add_argument("--stub", action="store_true", help="Backends simulados (sin Ollama ni API de embeddings)")
+    parser.add_argument("--max-chunks", type=int, default=400, help="Chunks indexados con --stub")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # The API prints one line per request; only the JSON report goes to stdout
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            report = run_worker(args)
+        print(json.dumps(report))
+        return
+
+    records = load_records(args.log, args.limit)
+    if not records:
+        print(f"⚠️ No hay registros en {args.log}")
+        return
+    print(f"📼 {len(records)} consultas de {len({r['session'] for r in records})} sesiones")
+    captured = summarize([r["latency_ms"] / 1000 for r in records if "latency_ms" in r])
+
+    results = {}
+    for value in args.config or ["actual:"]:
+        name, env = parse_config(value)
+        report = run_config(args, name, env)
+        if report:
+            results[name] = report
+    if results:
+        print_comparison(captured, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional, Set
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.utils import metrics
+
+# --- Model cascade ---
+# The agent graph makes three kinds of LLM calls, each served by its own model:
+#   router     -> the user just spoke: pick tools or answer briefly (small model)
+#   rag        -> grounded answer over BuscadorDocumentosCelsia fragments (large model)
+#   summarizer -> phrase the answer from the other tools' outputs (small model)
+# Optionally, a router/summarizer answer that looks unreliable is escalated: the
+# same call is repeated once with the escalation (large) model.
+# When the only trailing tool results are short-circuited grounding results (the
+# RAG tool found nothing relevant and returned the fallback, see core.py), that
+# fallback is the answer and no model is called.
+
+ROLE_ROUTER = "router"
+ROLE_SUMMARIZER = "summarizer"
+ROLE_RAG = "rag"
+
+
+def _tool_names(kwargs) -> Set[str]:
+    return {t["function"]["name"] for t in kwargs.get("tools") or [] if "function" in t}
+
+
+def low_confidence(message: BaseMessage, tool_names: Set[str], min_avg_logprob: Optional[float] = None) -> bool:
+    """
+    Cheap signals that a small model got the step wrong: malformed or unknown tool
+    calls, an empty answer, or (when Ollama returned logprobs) a low mean token logprob.
+    """
+    if not isinstance(message, AIMessage):
+        return False
+    if message.invalid_tool_calls:
+        return True
+    if any(call["name"] not in tool_names for call in message.tool_calls):
+        return True
+    if not message.tool_calls and not str(message.content).strip():
+        return True
+    logprobs = message.response_metadata.get("logprobs") or []
+    if min_avg_logprob is not None and logprobs:
+        avg = sum(item.get("logprob", 0.0) for item in logprobs) / len(logprobs)
+        return avg < min_avg_logprob
+    return False
+
+
+class RoleRoutedChatModel(BaseChatModel):
+    """
+    Agent model that dispatches every call to the model of its role (see above),
+    with optional escalation. `models` maps role -> model; missing roles fall
+    back to the router model. `tool_models` overrides the summarizer per tool.
+    """
+
+    models: Dict[str, BaseChatModel]
+    # Summarizer model for specific tools (e.g. a longer generation profile)
+    tool_models: Dict[str, BaseChatModel] = {}
+    grounding_tools: List[str] = []
+    escalation_model: Optional[BaseChatModel] = None
+    min_avg_logprob: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "role-routed-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {role: model._identifying_params for role, model in self.models.items()}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted_tools = [convert_to_openai_tool(t) for t in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    @staticmethod
+    def _trailing_tools(messages: List[BaseMessage]) -> List[str]:
+        trailing_tools = []
+        for msg in reversed(messages):
+            if not isinstance(msg, ToolMessage):
+                break
+            trailing_tools.append(msg.name)
+        return trailing_tools
+
+    @staticmethod
+    def short_circuit_answer(messages: List[BaseMessage]) -> Optional[str]:
+        trailing = []
+        for msg in reversed(messages):
+            if not isinstance(msg, ToolMessage):
+                break
+            trailing.append(msg)
+        if trailing and all(isinstance(m.artifact, dict) and m.artifact.get("short_circuit") for m in trailing):
+            return trailing[-1].content
+        return None
+
+    def role_for(self, messages: List[BaseMessage]) -> str:
+        trailing_tools = self._trailing_tools(messages)
+        if not trailing_tools:
+            return ROLE_ROUTER
+        if any(name in self.grounding_tools for name in trailing_tools):
+            return ROLE_RAG
+        return ROLE_SUMMARIZER
+
+    def _plan(self, messages, kwargs):
+        role = self.role_for(messages)
+        metrics.increment("llm_role", role=role)
+        model = self.models.get(role) or self.models[ROLE_ROUTER]
+        if role == ROLE_SUMMARIZER:
+            for name in self._trailing_tools(messages):
+                model = self.tool_models.get(name, model)
+        can_escalate = self.escalation_model is not None and role != ROLE_RAG
+        if can_escalate and self.min_avg_logprob is not None:
+            kwargs = {**kwargs, "logprobs": True}
+        return model, can_escalate, kwargs
+
+    def _should_escalate(self, result: ChatResult, kwargs) -> bool:
+        if low_confidence(result.generations[0].message, _tool_names(kwargs), self.min_avg_logprob):
+            metrics.increment("llm_escalations")
+            return True
+        return False
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        answer = self.short_circuit_answer(messages)
+        if answer is not None:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+        model, can_escalate, call_kwargs = self._plan(messages, kwargs)
+        result = model._generate(messages, stop, run_manager, **call_kwargs)
+        if can_escalate and self._should_escalate(result, kwargs):
+            result = self.escalation_model._generate(messages, stop, run_manager, **kwargs)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        answer = self.short_circuit_answer(messages)
+        if answer is not None:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+        model, can_escalate, call_kwargs = self._plan(messages, kwargs)
+        result = await model._agenerate(messages, stop, run_manager, **call_kwargs)
+        if can_escalate and self._should_escalate(result, kwargs):
+            result = await self.escalation_model._agenerate(messages, stop, run_manager, **kwargs)
+        return result
@@ -4,36 +4,40 @@ from dotenv import load_dotenv
 
 # LangChain / LangGraph Imports
 from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, END
 from langchain_core.agents import AgentFinish, AgentAction # Keep these if needed by LangGraph's internal workings for error handling/etc.
-from typing import TypedDict, Annotated, List, Any
+from typing import TypedDict, Annotated, List, Any, Dict, Tuple
 import operator
 
-# Import tools from the new location
-from src.tools.celsia_tools import (
-    get_telefono_celsia,
-    get_direccion_celsia,
-    get_social_media_celsia,
-    get_pqr_celsia,
-    get_pago_de_factura_celsia,
-    generar_factura_simulada,
-    verificar_estado_servicio,
-    calcular_instalacion_solar,
-    reportar_dano_servicio,
-    consultar_estado_reporte
-)
-
 # Import AgentState from the state module
 from src.agent.state import AgentState
+from src.agent.factory import get_chat_model, get_retriever, get_tools
+from src.agent.tool_execution import create_tool_node
+from src.agent.profiles import ProfiledChatModel, load_profiles, tool_profiles, strip_reasoning
+from src.agent.cascade import RoleRoutedChatModel, ROLE_ROUTER, ROLE_SUMMARIZER, ROLE_RAG
+from src.agent.overrides import current_overrides
+from src.agent.prefetch import RetrievalPrefetcher, take_prefetched
+from src.agent.scheduler import ScheduledChatModel, DeadlineExceeded, PRIORITY_ROUTING, PRIORITY_RAG
+from src.utils import metrics, query_log
+from src.utils.config import (
+    DIRECT_RETURN_TOOLS,
+    RAG_TOOL_MODE,
+    RAG_CONTEXT_MAX_CHARS,
+    OLLAMA_ROUTER_MODEL,
+    OLLAMA_SUMMARIZER_MODEL,
+    OLLAMA_RAG_MODEL,
+    LLM_ESCALATION,
+    LLM_ESCALATION_MODEL,
+    LLM_ESCALATION_MIN_AVG_LOGPROB,
+)
 
 # Ignore warnings
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -44,44 +48,118 @@ load_dotenv()
 # Global instances for agent and memory (CHECKPOINTER managed here)
 CHECKPOINTER = InMemorySaver()
 
+RAG_FALLBACK_MESSAGE = (
+    "Lamento no poder ofrecer una respuesta precisa basada en la información disponible. "
+    "Por favor, consulta los canales oficiales de CELSIA o llama a la línea de servicio al cliente."
+)
+
+# Appended to the agent prompt when the RAG tool returns context instead of an answer:
+# the grounding rules of the RAG prompt now apply to the agent's single generation.
+GROUNDING_RULES = f"""
+    Reglas para respuestas con 'BuscadorDocumentosCelsia':
+    5. La herramienta devuelve fragmentos de documentos oficiales marcados como [S1], [S2], ...
+       Responde ÚNICAMENTE con la información de esos fragmentos; nunca uses conocimiento general
+       ni especules sobre fechas, tarifas o procesos que no aparezcan en ellos.
+    6. Indica al final de la respuesta los identificadores de las fuentes usadas, por ejemplo: (Fuentes: S1, S3).
+    7. Si los fragmentos no responden la pregunta con certeza, responde únicamente:
+       "{RAG_FALLBACK_MESSAGE}"
+    """
+
+
+def short_circuit() -> Tuple[str, Dict[str, Any]]:
+    """RAG tool result when retrieval found nothing relevant: the fallback, answered without generation."""
+    metrics.increment("rag_short_circuits")
+    return RAG_FALLBACK_MESSAGE, {"short_circuit": True}
+
+
+def compact_context(docs, max_chars: int = RAG_CONTEXT_MAX_CHARS) -> str:
+    """
+    Formats retrieved documents as a compact, source-labelled context block:
+    duplicate chunks are dropped, whitespace is collapsed and each chunk is
+    trimmed so the whole block fits in `max_chars`.
+    """
+    unique = []
+    seen = set()
+    for doc in docs:
+        text = " ".join(doc.page_content.split())
+        if text and text not in seen:
+            seen.add(text)
+            unique.append((text, doc.metadata or {}))
+    if not unique:
+        return ""
+
+    per_doc = max(max_chars // len(unique), 200)
+    blocks = []
+    for i, (text, metadata) in enumerate(unique, start=1):
+        if len(text) > per_doc:
+            text = text[:per_doc].rsplit(" ", 1)[0] + "..."
+        label = " | ".join(str(metadata[k]) for k in ("title", "source") if metadata.get(k))
+        blocks.append(f"[S{i}] {label}\n{text}" if label else f"[S{i}]\n{text}")
+    return "\n\n".join(blocks)
+
 # --- Agent Definition ---
 def load_agent_and_rag_components(
     temperature: float = 0.5,
     top_k: int = 40,
     top_p: float = 0.9,
-    retriever_k: int = 5
+    retriever_k: int = 5,
+    rag_tool_mode: str = RAG_TOOL_MODE,
+    checkpointer=None
 ):
     """
-    This function loads all components (VectorDB, LLM, RAG chain)
-    and constructs the final Agent.
+    This function assembles the final Agent (LLM wrappers, RAG chain, tools) on top
+    of the shared components of src/agent/factory.py; use factory.get_agent to
+    reuse the graph for the same parameters.
+    rag_tool_mode: "generate" (nested RAG chain) or "context" (see RAG_TOOL_MODE).
+    checkpointer: conversation memory, CHECKPOINTER by default.
     """
+    if rag_tool_mode not in ("generate", "context"):
+        raise ValueError(f"Unknown rag_tool_mode '{rag_tool_mode}'. Use 'generate' or 'context'.")
     
     # --- 1. LLM Configuration ---
-    llm = ChatOllama(
-        model=os.getenv("OLLAMA_LLM_MODEL", "qwen3:14b"),
-        base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
-        temperature=temperature,
-        top_k=top_k,
-        top_p=top_p
-    )
+    # One model per role (see src/agent/cascade.py). Each is a single ChatOllama, or a
+    # load-balanced pool when OLLAMA_BASE_URLS lists several instances, shared by
+    # every role and agent that uses the same model name.
+    model_for = get_chat_model
 
-    # --- 2. Embeddings and Vectorstore (Retriever) ---
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    
-    vectorstore = Chroma(
-        persist_directory="./chromadb_storage",
-        embedding_function=embeddings,
-        collection_name="rag_collection"
-    )
-    
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",
-        search_kwargs={
-            "k": retriever_k,
-            "fetch_k": retriever_k * 4,
-            "lambda_mult": 0.5
-        }
+    # Each call applies the generation profile of its kind (output cap, context size,
+    # reasoning off) and async calls go through the shared scheduler: the agent's
+    # short routing turns are served before the long RAG generations.
+    profiles = load_profiles()
+    base_options = {"temperature": temperature, "top_k": top_k, "top_p": top_p}
+
+    def role_model(name: str, profile: str, priority: int):
+        profiled = ProfiledChatModel(inner=model_for(name), profile=profiles[profile], base_options=base_options)
+        return ScheduledChatModel(inner=profiled, priority=priority)
+
+    # ChatOllama only accepts logprobs from langchain-ollama 1.1.0 on; older clients
+    # would reject the kwarg, so the gate is turned off there instead.
+    min_avg_logprob = LLM_ESCALATION_MIN_AVG_LOGPROB
+    if min_avg_logprob is not None and "logprobs" not in ChatOllama.model_fields:
+        print("⚠️ LLM_ESCALATION_MIN_AVG_LOGPROB requires langchain-ollama>=1.1.0; logprob gate disabled")
+        min_avg_logprob = None
+
+    rag_llm = role_model(OLLAMA_RAG_MODEL, "rag", PRIORITY_RAG)
+    agent_llm = RoleRoutedChatModel(
+        models={
+            ROLE_ROUTER: role_model(OLLAMA_ROUTER_MODEL, "router", PRIORITY_ROUTING),
+            ROLE_SUMMARIZER: role_model(OLLAMA_SUMMARIZER_MODEL, "summarizer", PRIORITY_ROUTING),
+            # In context mode the agent itself writes the grounded answer
+            ROLE_RAG: role_model(OLLAMA_RAG_MODEL, "rag", PRIORITY_RAG),
+        },
+        tool_models={
+            tool_name: role_model(OLLAMA_SUMMARIZER_MODEL, profile.name, PRIORITY_ROUTING)
+            for tool_name, profile in tool_profiles(profiles).items()
+        },
+        grounding_tools=["BuscadorDocumentosCelsia"] if rag_tool_mode == "context" else [],
+        escalation_model=(
+            role_model(LLM_ESCALATION_MODEL, "router", PRIORITY_ROUTING) if LLM_ESCALATION else None
+        ),
+        min_avg_logprob=min_avg_logprob,
     )
+
+    # --- 2. Retriever (embeddings and Chroma client are shared) ---
+    retriever = get_retriever(retriever_k)
     
     # --- 3. RAG Chain Definition ---
     prompt_rag = PromptTemplate(
@@ -123,42 +201,80 @@ Respuesta:""",
     # --- 4. Conectar el Prompt con el LLM (RAG Chain) ---
     # Definimos funciones auxiliares para formatear documentos
     def formato_docs(docs):
-        return "\n\n".join([doc.page_content for doc in docs])
-
-    # Creamos la cadena lógica: Retriever -> Prompt -> LLM -> Texto
-    rag_chain = (
-        {"context": retriever | formato_docs, "question": RunnablePassthrough()}
-        | prompt_rag
-        | llm
-        | StrOutputParser()
-    )
+        with metrics.span("context_format"):
+            return "\n\n".join([doc.page_content for doc in docs])
+
+    # Creamos la cadena lógica: (documentos recuperados) -> Prompt -> LLM -> Texto
+    answer_chain = prompt_rag | rag_llm | StrOutputParser()
 
-    # --- 5. Convertir la Cadena RAG en una Herramienta (@tool) ---
-    @tool
-    def BuscadorDocumentosCelsia(pregunta: str) -> str:
-        """
-        Herramienta RAG oficial. Úsala para responder preguntas generales sobre Celsia,
-        tarifas, reglamentos, o información institucional.
-        """
+    def request_retriever():
+        # retriever_k of this request (ChatRequest.overrides); retrievers are cached per k
+        k = current_overrides().get("retriever_k")
+        return get_retriever(k) if k and k != retriever_k else retriever
+
+    # --- 5. Convertir la Cadena RAG en una Herramienta ---
+    # Sync and async versions: the API runs the graph with ainvoke so that a
+    # cancelled request also cancels the RAG generation in progress.
+    # Tools return (content, artifact). An empty retrieval (nothing above
+    # RAG_MIN_RELEVANCE) returns the fallback marked as `short_circuit`, and the
+    # agent model relays it as the answer without any LLM call (see cascade.py).
+    def buscar_documentos(pregunta: str) -> Tuple[str, Dict[str, Any]]:
         try:
-            return rag_chain.invoke(pregunta)
+            docs = request_retriever().invoke(pregunta)
+            query_log.note_retrieved(docs)
+            if not docs:
+                return short_circuit()
+            if rag_tool_mode == "context":
+                # The agent answers from these fragments in its own (single) generation
+                with metrics.span("context_format"):
+                    context = compact_context(docs)
+                return context, {"documents": len(docs)}
+            answer = answer_chain.invoke({"context": formato_docs(docs), "question": pregunta})
+            return answer, {"documents": len(docs)}
         except Exception as e:
-            return f"Error consultando documentos: {str(e)}"
+            return f"Error consultando documentos: {str(e)}", {"error": True}
+
+    async def abuscar_documentos(pregunta: str) -> Tuple[str, Dict[str, Any]]:
+        try:
+            # Documents prefetched by /chat while the agent was routing (RAG_PREFETCH)
+            docs = await take_prefetched(pregunta)
+            if docs is None:
+                docs = await request_retriever().ainvoke(pregunta)
+            query_log.note_retrieved(docs)
+            if not docs:
+                return short_circuit()
+            if rag_tool_mode == "context":
+                with metrics.span("context_format"):
+                    context = compact_context(docs)
+                return context, {"documents": len(docs)}
+            answer = await answer_chain.ainvoke({"context": formato_docs(docs), "question": pregunta})
+            return answer, {"documents": len(docs)}
+        except Exception as e:
+            # Deadlines and cancellations must reach the API, not become tool output
+            if isinstance(e, DeadlineExceeded):
+                raise
+            return f"Error consultando documentos: {str(e)}", {"error": True}
+
+    BuscadorDocumentosCelsia = StructuredTool.from_function(
+        func=buscar_documentos,
+        coroutine=abuscar_documentos,
+        name="BuscadorDocumentosCelsia",
+        response_format="content_and_artifact",
+        description=(
+            "Herramienta RAG oficial. Úsala para responder preguntas generales sobre Celsia,\n"
+            "tarifas, reglamentos, o información institucional."
+        ),
+    )
 
     # --- 6. Lista Completa de Herramientas ---
     # Aquí juntamos las herramientas importadas + la nueva herramienta RAG
+    tools = get_tools() + [BuscadorDocumentosCelsia]
+
+    # Tools that already produce the final Markdown end the turn directly
+    # (the graph skips the LLM call that would only re-echo their output).
     tools = [
-        get_telefono_celsia,
-        get_direccion_celsia,
-        get_social_media_celsia,
-        get_pqr_celsia,
-        get_pago_de_factura_celsia,
-        generar_factura_simulada,
-        verificar_estado_servicio,
-        calcular_instalacion_solar,
-        reportar_dano_servicio,
-        consultar_estado_reporte,
-        BuscadorDocumentosCelsia # <--- Agregamos la tool que acabamos de crear
+        t.model_copy(update={"return_direct": True}) if t.name in DIRECT_RETURN_TOOLS else t
+        for t in tools
     ]
 
     # --- 7. Mensaje del Sistema ---
@@ -169,15 +285,50 @@ Respuesta:""",
     1. Si el usuario pide un dato específico (ej. teléfono), usa la herramienta específica.
     2. Si es una pregunta general, usa 'BuscadorDocumentosCelsia'.
     3. Responde siempre en español y con amabilidad.
+    4. Si el usuario pide varios datos independientes, llama a todas las herramientas necesarias en el mismo paso.
     """
 
+    if rag_tool_mode == "context":
+        system_message += GROUNDING_RULES
+
     # --- 8. Creación del Agente y Retorno (LO QUE TÚ PEDISTE) ---
     agent_graph = create_react_agent(
-        model=llm,
-        tools=tools,
+        model=agent_llm,
+        tools=create_tool_node(tools),  # concurrent tool calls with per-tool timeouts
         prompt=system_message,
-        checkpointer=CHECKPOINTER
+        checkpointer=checkpointer if checkpointer is not None else CHECKPOINTER
     )
+    # Used by /chat to start retrieval speculatively (RAG_PREFETCH)
+    agent_graph.rag_prefetcher = RetrievalPrefetcher(retriever)
     
     print("✅ Agente y componentes cargados exitosamente.")
-    return agent_graph
\ No newline at end of file
+    return agent_graph
+
+
+def extract_final_response(messages) -> str:
+    """
+    Returns the text of the agent's final answer for this turn. When the turn
+    ended on direct-return tools, their successful outputs are the answer and
+    one LLM call was saved; otherwise it is the last AIMessage with content of
+    this turn.
+    """
+    trailing_tools = []
+    for msg in reversed(messages):
+        if not isinstance(msg, ToolMessage):
+            break
+        trailing_tools.insert(0, msg)
+    direct_outputs = [
+        msg for msg in trailing_tools if msg.name in DIRECT_RETURN_TOOLS and msg.status != "error"
+    ]
+    if direct_outputs:
+        metrics.increment("llm_calls_saved_direct_return")
+        for msg in direct_outputs:
+            metrics.increment("direct_return", tool=msg.name)
+        return "\n\n".join(str(msg.content) for msg in direct_outputs)
+
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break  # earlier answers belong to previous turns
+        if isinstance(msg, AIMessage) and msg.content:
+            return strip_reasoning(msg.content)
+    return "Lo siento, no pude generar una respuesta clara. Por favor, intenta de nuevo."
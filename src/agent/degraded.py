@@ -0,0 +1,235 @@
+import re
+import time
+import statistics
+import unicodedata
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+from src.agent.core import RAG_FALLBACK_MESSAGE
+from src.tools.celsia_tools import (
+    get_telefono_celsia,
+    get_direccion_celsia,
+    get_social_media_celsia,
+    get_pqr_celsia,
+    get_pago_de_factura_celsia,
+)
+from src.utils import metrics
+from src.utils.config import (
+    DEGRADED_MAX_QUEUE,
+    CHAT_LATENCY_SLO_SECONDS,
+    DEGRADED_LATENCY_WINDOW,
+    DEGRADED_FAILURE_THRESHOLD,
+    DEGRADED_RECOVERY_SECONDS,
+    DEGRADED_ANSWER_CACHE_SIZE,
+)
+
+# --- Degraded mode ---
+# When Ollama is saturated or down, /chat stops waiting for it and answers
+# without any LLM call, in this order:
+#   1. intent fast path: keyword match to a fixed-answer tool (phone, address...)
+#   2. a recent answer to the same question (cached from normal turns)
+#   3. the sentences of the top retrieved chunk that best match the question
+# The switch works like the Ollama pool's circuit breaker: it opens on a latency
+# SLO breach or repeated failures and, after a cool-down, one trial turn decides
+# whether the LLM is back. A deep LLM queue degrades requests while it lasts.
+
+DEGRADED_NOTICE = (
+    "⚠️ El asistente está operando en modo reducido; esta respuesta se generó "
+    "sin el modelo de lenguaje y puede ser menos completa."
+)
+
+# Accent-free words or phrases (matched whole) -> tool with a fixed answer.
+# Generic words such as "numero", "linea" or "pago" only count inside a phrase:
+# alone they also appear in "numero de cuenta" or "por que subio mi pago".
+FAST_PATH_INTENTS: List[Tuple[Tuple[str, ...], object]] = [
+    (("telefono", "telefonos", "linea de atencion", "linea gratuita", "numero de contacto"), get_telefono_celsia),
+    (("direccion", "sede", "sedes", "oficina", "oficinas", "ubicacion"), get_direccion_celsia),
+    (("redes sociales", "facebook", "instagram", "twitter", "tiktok"), get_social_media_celsia),
+    (("pqr", "pqrs", "queja", "reclamo", "peticion"), get_pqr_celsia),
+    (("pagar la factura", "pagar mi factura", "medios de pago", "puntos de pago", "donde pago", "como pago"),
+     get_pago_de_factura_celsia),
+]
+
+
+def _words(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(_words(text))
+
+
+class DegradedMode:
+    """Decides per /chat request whether to serve from the LLM or extractively."""
+
+    def __init__(
+        self,
+        max_queue: int = DEGRADED_MAX_QUEUE,
+        latency_slo: float = CHAT_LATENCY_SLO_SECONDS,
+        window: int = DEGRADED_LATENCY_WINDOW,
+        failure_threshold: int = DEGRADED_FAILURE_THRESHOLD,
+        recovery_seconds: float = DEGRADED_RECOVERY_SECONDS,
+    ):
+        self.max_queue = max_queue
+        self.latency_slo = latency_slo
+        self.latencies = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.reason: Optional[str] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.recovery_seconds:
+            return "half-open"
+        return "open"
+
+    def check(self, queue_depth: int = 0) -> Tuple[Optional[str], bool]:
+        """
+        (reason, trial): `reason` is why this request must be served degraded
+        (None to use the LLM); `trial` marks the half-open request whose outcome
+        must be reported back with `record`.
+        """
+        state = self.state
+        if state == "open" or (state == "half-open" and self.trial_in_flight):
+            return self.reason, False
+        if state == "half-open":
+            self.trial_in_flight = True
+            return None, True
+        if self.max_queue and queue_depth >= self.max_queue:
+            return "queue", False
+        return None, False
+
+    def _open(self, reason: str) -> None:
+        if self.opened_at is None:
+            print(f"⚠️ Modo degradado activado ({reason})")
+        metrics.increment("degraded_mode_opened", reason=reason)
+        self.opened_at = time.monotonic()
+        self.reason = reason
+        self.latencies.clear()
+
+    def record(self, latency: Optional[float] = None, error: Optional[BaseException] = None, trial: bool = False) -> None:
+        """Outcome of an LLM-served turn (an error or its latency in seconds)."""
+        if trial:
+            self.trial_in_flight = False
+        if error is not None:
+            self.consecutive_failures += 1
+            if trial or self.consecutive_failures >= self.failure_threshold:
+                self._open("backend")
+            return
+        self.consecutive_failures = 0
+        if trial:
+            if self.latency_slo and latency > self.latency_slo:
+                self._open("latency")
+                return
+            print("✅ LLM recuperado, se sale del modo degradado")
+            metrics.increment("degraded_mode_recovered")
+            self.opened_at = None
+            self.reason = None
+            return
+        self.latencies.append(latency)
+        if (
+            self.latency_slo
+            and len(self.latencies) == self.latencies.maxlen
+            and statistics.median(self.latencies) > self.latency_slo
+        ):
+            self._open("latency")
+
+    def cancel_trial(self) -> None:
+        """The trial turn ended without an outcome (client gone); the next request retries."""
+        self.trial_in_flight = False
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "reason": self.reason,
+            "consecutive_failures": self.consecutive_failures,
+            "recent_median_latency": round(statistics.median(self.latencies), 3) if self.latencies else None,
+        }
+
+
+class AnswerCache:
+    """Recent answers to standalone questions (normalized text -> answer), LRU-bounded."""
+
+    def __init__(self, max_size: int = DEGRADED_ANSWER_CACHE_SIZE):
+        self.max_size = max_size
+        self._answers: "OrderedDict[str, str]" = OrderedDict()
+
+    def put(self, question: str, answer: str) -> None:
+        key = normalize_query(question)
+        if not key or not self.max_size:
+            return
+        self._answers[key] = answer
+        self._answers.move_to_end(key)
+        while len(self._answers) > self.max_size:
+            self._answers.popitem(last=False)
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_query(question)
+        if key in self._answers:
+            self._answers.move_to_end(key)
+            return self._answers[key]
+        return None
+
+
+# Only answers grounded on the documents are reused for other users; the other
+# tools answer per user or per moment (invoices, outage reports, service status)
+CACHEABLE_TOOLS = {"BuscadorDocumentosCelsia"}
+
+
+def cacheable_answer(messages, answer: str) -> bool:
+    """A session's first answer, built only from successful CACHEABLE_TOOLS calls."""
+    if sum(isinstance(m, HumanMessage) for m in messages) != 1:
+        return False
+    if not answer or answer == RAG_FALLBACK_MESSAGE:
+        return False
+    tool_messages = [m for m in messages if isinstance(m, ToolMessage)]
+    return bool(tool_messages) and all(m.name in CACHEABLE_TOOLS and m.status != "error" for m in tool_messages)
+
+
+def fast_path_answer(question: str) -> Optional[str]:
+    padded = f" {normalize_query(question)} "
+    for phrases, fixed_tool in FAST_PATH_INTENTS:
+        if any(f" {phrase} " in padded for phrase in phrases):
+            return fixed_tool.invoke({})
+    return None
+
+
+def best_sentences(text: str, question: str, max_sentences: int = 3) -> str:
+    """Sentences of `text` sharing the most content words with `question`, in their original order."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", " ".join(text.split())) if s.strip()]
+    terms = {w for w in _words(question) if len(w) > 3}
+    scored = [(len(terms.intersection(_words(s))), i) for i, s in enumerate(sentences)]
+    chosen = sorted(i for score, i in sorted(scored, key=lambda x: -x[0])[:max_sentences] if score > 0)
+    return " ".join(sentences[i] for i in chosen)
+
+
+async def extractive_answer(question: str, retriever, cache: Optional[AnswerCache] = None) -> Tuple[str, str]:
+    """(answer, source) without any LLM call; source is "fast_path", "cache", "retrieval" or "fallback"."""
+    answer = fast_path_answer(question)
+    if answer:
+        return answer, "fast_path"
+    answer = cache.get(question) if cache else None
+    if answer:
+        return answer, "cache"
+    try:
+        docs = await retriever.ainvoke(question)
+    except Exception as e:
+        print(f"⚠️ Recuperación en modo degradado falló: {e}")
+        docs = []
+    if docs:
+        extract = best_sentences(docs[0].page_content, question)
+        if extract:
+            source = docs[0].metadata.get("source")
+            # Unlike fast-path and cached answers, an extract may be partial
+            answer = f"{DEGRADED_NOTICE}\n\n{extract}" + (f"\n\n(Fuente: {source})" if source else "")
+            return answer, "retrieval"
+    return RAG_FALLBACK_MESSAGE, "fallback"
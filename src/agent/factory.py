@@ -0,0 +1,120 @@
+from functools import lru_cache
+
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_chroma import Chroma
+
+from src.agent.llm_pool import create_chat_model
+from src.agent.relevance import ScoredMMRRetriever
+from src.agent.stubs import HashEmbeddings, ScriptedChatModel
+from src.tools.celsia_tools import (
+    get_telefono_celsia,
+    get_direccion_celsia,
+    get_social_media_celsia,
+    get_pqr_celsia,
+    get_pago_de_factura_celsia,
+    generar_factura_simulada,
+    verificar_estado_servicio,
+    calcular_instalacion_solar,
+    reportar_dano_servicio,
+    consultar_estado_reporte
+)
+from src.utils.config import (
+    CHROMA_PERSIST_DIRECTORY,
+    CHROMA_COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    RAG_TOOL_MODE,
+    RAG_MIN_RELEVANCE,
+    STUB_BACKENDS,
+)
+
+# --- Component factory ---
+# Shared by the API (main.py), the Streamlit UI (app.py) and the scripts.
+# Heavy, parameter-independent components (embeddings client, Chroma client,
+# Ollama clients and pools, tool list) are built once per process. The LLM
+# sampling parameters only live in the cheap per-call wrappers (see
+# src/agent/profiles.py), so an agent for new slider values is assembled in
+# milliseconds and cached per parameter set.
+
+CELSIA_TOOLS = (
+    get_telefono_celsia,
+    get_direccion_celsia,
+    get_social_media_celsia,
+    get_pqr_celsia,
+    get_pago_de_factura_celsia,
+    generar_factura_simulada,
+    verificar_estado_servicio,
+    calcular_instalacion_solar,
+    reportar_dano_servicio,
+    consultar_estado_reporte,
+)
+
+
+@lru_cache(maxsize=None)
+def get_embeddings():
+    if STUB_BACKENDS:
+        return HashEmbeddings()
+    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+
+
+@lru_cache(maxsize=None)
+def get_vectorstore():
+    return Chroma(
+        persist_directory=CHROMA_PERSIST_DIRECTORY,
+        embedding_function=get_embeddings(),
+        collection_name=CHROMA_COLLECTION_NAME
+    )
+
+
+@lru_cache(maxsize=None)
+def get_retriever(k: int = 5):
+    """MMR retriever with the low-relevance gate (see src/agent/relevance.py)."""
+    return ScoredMMRRetriever(
+        vectorstore=get_vectorstore(),
+        k=k,
+        fetch_k=k * 4,
+        lambda_mult=0.5,
+        min_relevance=RAG_MIN_RELEVANCE,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model: str):
+    """Ollama client (or pool) for `model`; sampling parameters are sent per call."""
+    if STUB_BACKENDS:
+        return ScriptedChatModel(model=model)
+    return create_chat_model(model=model)
+
+
+def get_tools():
+    return list(CELSIA_TOOLS)
+
+
+@lru_cache(maxsize=32)
+def get_agent(
+    temperature: float = 0.5,
+    top_k: int = 40,
+    top_p: float = 0.9,
+    retriever_k: int = 5,
+    rag_tool_mode: str = RAG_TOOL_MODE,
+):
+    """
+    Agent graph for this parameter set, with the shared CHECKPOINTER. Graphs with
+    their own checkpointer (app.py sessions) are not cached here: they would
+    outlive the session.
+    """
+    # Imported here: core builds on the getters above
+    from src.agent.core import load_agent_and_rag_components
+
+    return load_agent_and_rag_components(
+        temperature=temperature,
+        top_k=top_k,
+        top_p=top_p,
+        retriever_k=retriever_k,
+        rag_tool_mode=rag_tool_mode,
+    )
+
+
+def clear_cache():
+    """Drops every cached component (e.g. after regenerating the vector store)."""
+    for getter in (get_embeddings, get_vectorstore, get_retriever, get_chat_model, get_agent):
+        getter.cache_clear()
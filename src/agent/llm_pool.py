@@ -0,0 +1,406 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_ollama import ChatOllama
+from pydantic import ConfigDict
+
+from src.utils import metrics
+
+# --- Multi-backend Ollama pool ---
+# One ChatOllama client per base URL. Each request goes to the healthy backend
+# with the fewest outstanding requests; a backend that keeps failing is ejected
+# by a circuit breaker and retried (half-open) after a cool-down. Optionally a
+# request still running after the pool's observed p95 latency is hedged to a
+# second backend and the first answer wins.
+# Only transient errors (connection, timeout, 5xx) fail over and count toward
+# ejection; a bad request or an unknown model fails the same on every backend,
+# so it is raised straight away.
+
+
+class NoHealthyBackendError(RuntimeError):
+    """Raised when every backend in the pool is ejected or has already failed."""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Connection and timeout errors, 5xx answers and errors reported inside the response stream."""
+    if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    # ollama.ResponseError: the HTTP status, or -1 when the error came in the stream body
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status >= 500 or status == -1)
+
+
+class Backend:
+    """A single Ollama instance: its client, load and circuit-breaker state."""
+
+    def __init__(self, base_url: str, model: ChatOllama, failure_threshold: int, reset_timeout: float):
+        self.base_url = base_url
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        # Half-open: exactly one trial request decides whether the backend is back
+        return state == "closed" or (state == "half-open" and not self.trial_in_flight)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class OllamaPool:
+    """Routing, health and latency bookkeeping shared by every PooledChatOllama."""
+
+    def __init__(
+        self,
+        base_urls: Sequence[str],
+        model_factory: Callable[[str], ChatOllama],
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        latency_window: int = 200,
+    ):
+        if not base_urls:
+            raise ValueError("OllamaPool needs at least one base URL.")
+        self.backends = [Backend(url, model_factory(url), failure_threshold, reset_timeout) for url in base_urls]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = deque(maxlen=latency_window)
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.backends)), thread_name_prefix="ollama-pool")
+
+    def acquire(self, exclude: Sequence[Backend] = ()) -> Backend:
+        """Reserves the available backend with the fewest outstanding requests."""
+        with self.lock:
+            candidates = [b for b in self.backends if b not in exclude and b.available()]
+            if not candidates:
+                raise NoHealthyBackendError(
+                    "No healthy Ollama backend available: "
+                    + ", ".join(f"{b.base_url} ({b.state})" for b in self.backends)
+                )
+            backend = min(candidates, key=lambda b: b.outstanding)
+            if backend.state == "half-open":
+                backend.trial_in_flight = True
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend, latency: Optional[float] = None, error: Optional[BaseException] = None):
+        with self.lock:
+            backend.outstanding -= 1
+            backend.trial_in_flight = False
+            # A non-transient error is still an answer: it says nothing about the backend's health
+            if error is None or not is_transient_error(error):
+                backend.consecutive_failures = 0
+                backend.opened_at = None
+                if latency is not None:
+                    self.latencies.append(latency)
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.opened_at is not None or backend.consecutive_failures >= backend.failure_threshold:
+                if backend.opened_at is None:
+                    print(f"⚠️ Ollama backend {backend.base_url} ejected after {backend.consecutive_failures} failures: {error}")
+                    metrics.increment("llm_pool_ejections")
+                backend.opened_at = time.monotonic()
+
+    def abandon(self, backend: Backend):
+        """Frees the slot of a cancelled request; a cancelled half-open trial re-opens the breaker."""
+        with self.lock:
+            backend.outstanding -= 1
+            if backend.trial_in_flight:
+                backend.trial_in_flight = False
+                backend.opened_at = time.monotonic()
+
+    def hedge_delay(self) -> Optional[float]:
+        """Latency percentile after which a request is hedged (None until enough samples)."""
+        with self.lock:
+            if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(int(round(self.hedge_percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [b.as_dict() for b in self.backends]
+
+    # --- Calls ---
+
+    def call(self, fn: Callable[[ChatOllama], Any], exclude: Sequence[Backend] = ()):
+        """Runs `fn(model)` on one backend, failing over to the others on error."""
+        tried = list(exclude)
+        last_error = None
+        while True:
+            try:
+                backend = self.acquire(tried)
+            except NoHealthyBackendError:
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.append(backend)
+            start = time.perf_counter()
+            try:
+                result = fn(backend.model)
+            except Exception as e:
+                self.release(backend, error=e)
+                if not is_transient_error(e):
+                    raise
+                metrics.increment("llm_pool_failovers")
+                last_error = e
+                continue
+            self.release(backend, latency=time.perf_counter() - start)
+            return result
+
+    def call_hedged(self, fn: Callable[[ChatOllama], Any]):
+        """Like `call`, but a second backend races the first once the p95 deadline passes."""
+        delay = self.hedge_delay()
+        if delay is None or len(self.backends) < 2:
+            return self.call(fn)
+
+        primary = self.acquire()
+        futures = {self.executor.submit(self._timed, primary, fn): primary}
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            try:
+                secondary = self.acquire(exclude=[primary])
+            except NoHealthyBackendError:
+                secondary = None
+            if secondary is not None:
+                metrics.increment("llm_pool_hedged_requests")
+                futures[self.executor.submit(self._timed, secondary, fn)] = secondary
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    # The loser keeps running in the background and releases its backend when done
+                    if futures[future] is not primary:
+                        metrics.increment("llm_pool_hedge_wins")
+                    return future.result()
+                if not is_transient_error(error):
+                    raise error
+                last_error = error
+        # Every racer failed: fall back to plain failover over the remaining backends
+        try:
+            return self.call(fn, exclude=list(futures.values()))
+        except NoHealthyBackendError:
+            raise last_error
+
+    def _timed(self, backend: Backend, fn: Callable[[ChatOllama], Any]):
+        start = time.perf_counter()
+        try:
+            result = fn(backend.model)
+        except Exception as e:
+            self.release(backend, error=e)
+            raise
+        self.release(backend, latency=time.perf_counter() - start)
+        return result
+
+    async def acall(self, fn: Callable[[ChatOllama], Any], exclude: Sequence[Backend] = ()):
+        """Async failover: `fn(model)` returns an awaitable."""
+        tried = list(exclude)
+        last_error = None
+        while True:
+            try:
+                backend = self.acquire(tried)
+            except NoHealthyBackendError:
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.append(backend)
+            try:
+                return await self._atimed(backend, fn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                metrics.increment("llm_pool_failovers")
+                last_error = e
+
+    async def acall_hedged(self, fn: Callable[[ChatOllama], Any]):
+        delay = self.hedge_delay()
+        if delay is None or len(self.backends) < 2:
+            return await self.acall(fn)
+
+        primary = self.acquire()
+        tasks = {asyncio.ensure_future(self._atimed(primary, fn)): primary}
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            try:
+                secondary = self.acquire(exclude=[primary])
+            except NoHealthyBackendError:
+                secondary = None
+            if secondary is not None:
+                metrics.increment("llm_pool_hedged_requests")
+                tasks[asyncio.ensure_future(self._atimed(secondary, fn))] = secondary
+
+        pending = set(tasks)
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] is not primary:
+                            metrics.increment("llm_pool_hedge_wins")
+                        return task.result()
+                    last_error = task.exception()
+                    if not is_transient_error(last_error):
+                        raise last_error
+        finally:
+            # The slower racer is cancelled, which releases its backend
+            for task in pending:
+                task.cancel()
+        try:
+            return await self.acall(fn, exclude=list(tasks.values()))
+        except NoHealthyBackendError:
+            raise last_error
+
+    async def _atimed(self, backend: Backend, fn: Callable[[ChatOllama], Any]):
+        start = time.perf_counter()
+        try:
+            result = await fn(backend.model)
+        except asyncio.CancelledError:
+            # Neither a success nor a failure: the breaker state is left as it was
+            self.abandon(backend)
+            raise
+        except Exception as e:
+            self.release(backend, error=e)
+            raise
+        self.release(backend, latency=time.perf_counter() - start)
+        return result
+
+
+class PooledChatOllama(BaseChatModel):
+    """
+    Chat model that spreads generations over an OllamaPool. It behaves like
+    ChatOllama for the agent (same tool binding and kwargs), so it can be passed
+    to create_react_agent directly.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    pool: OllamaPool
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pool"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"backends": [b.base_url for b in self.pool.backends], "model": self.pool.backends[0].model.model}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        # Same contract as ChatOllama.bind_tools (tool_choice is not supported by Ollama)
+        formatted_tools = [convert_to_openai_tool(t) for t in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.pool.call_hedged(lambda model: model._generate(messages, stop, None, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self.pool.acall_hedged(lambda model: model._agenerate(messages, stop, None, **kwargs))
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # Streams are not hedged or retried once the first token has been sent
+        backend = self.pool.acquire()
+        start = time.perf_counter()
+        finished = False
+        try:
+            for chunk in backend.model._stream(messages, stop, None, **kwargs):
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            finished = True
+        except Exception as e:
+            finished = True
+            self.pool.release(backend, error=e)
+            raise
+        finally:
+            # The consumer stopped early (GeneratorExit): handled like a cancellation
+            if not finished:
+                self.pool.abandon(backend)
+        self.pool.release(backend, latency=time.perf_counter() - start)
+
+
+def parse_base_urls(value: Optional[str]) -> List[str]:
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+
+def create_chat_model(**params: Any) -> BaseChatModel:
+    """
+    ChatOllama for a single OLLAMA_BASE_URL; PooledChatOllama when OLLAMA_BASE_URLS
+    lists several instances. `params` are the ChatOllama arguments (model, temperature...).
+    """
+    base_urls = parse_base_urls(os.getenv("OLLAMA_BASE_URLS"))
+    if len(base_urls) <= 1:
+        base_url = base_urls[0] if base_urls else os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        return ChatOllama(base_url=base_url, **params)
+
+    pool = OllamaPool(
+        base_urls,
+        model_factory=lambda url: ChatOllama(base_url=url, **params),
+        failure_threshold=int(os.getenv("OLLAMA_POOL_FAILURE_THRESHOLD", 3)),
+        reset_timeout=float(os.getenv("OLLAMA_POOL_RESET_TIMEOUT", 30)),
+        hedge=os.getenv("OLLAMA_POOL_HEDGE", "false").lower() == "true",
+        hedge_percentile=float(os.getenv("OLLAMA_POOL_HEDGE_PERCENTILE", 95)),
+    )
+    print(f"✅ Ollama pool with {len(base_urls)} backends: {', '.join(base_urls)}")
+    return PooledChatOllama(pool=pool)
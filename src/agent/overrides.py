@@ -0,0 +1,19 @@
+from typing import Any, Dict
+
+from langchain_core.runnables import ensure_config
+
+# --- Per-request overrides ---
+# /chat puts validated overrides in config["configurable"]["overrides"]. LangGraph
+# hands that config to every node, tool and nested chain, so the LLM wrappers and
+# the RAG tool read it from the current runnable config at call time.
+
+SAMPLING_KEYS = ("temperature", "top_k", "top_p")
+
+
+def current_overrides() -> Dict[str, Any]:
+    return ensure_config().get("configurable", {}).get("overrides") or {}
+
+
+def sampling_overrides() -> Dict[str, Any]:
+    overrides = current_overrides()
+    return {key: overrides[key] for key in SAMPLING_KEYS if overrides.get(key) is not None}
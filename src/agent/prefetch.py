@@ -0,0 +1,109 @@
+import re
+import time
+import asyncio
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from src.utils import metrics
+from src.utils.config import RAG_PREFETCH_MIN_OVERLAP
+
+# --- Speculative retrieval ---
+# Without prefetch, embedding + vector search only start after the first agent
+# LLM call decides to use BuscadorDocumentosCelsia. With prefetch, /chat starts
+# retrieval for the raw user message at the same time as that first call; if the
+# tool is then invoked with a similar query it consumes the prefetched documents,
+# otherwise they are discarded.
+
+_pending: ContextVar[Optional["Prefetch"]] = ContextVar("rag_prefetch", default=None)
+
+
+def _terms(text: str) -> set:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return {w for w in re.findall(r"\w+", text) if len(w) > 3}
+
+
+def query_overlap(a: str, b: str) -> float:
+    """Share of the shorter query's content words that also appear in the other one."""
+    ta, tb = _terms(a), _terms(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / min(len(ta), len(tb))
+
+
+class Prefetch:
+    """Retrieval started for one /chat request, consumed at most once."""
+
+    def __init__(self, query: str, retriever):
+        self.query = query
+        self.started = time.perf_counter()
+        self.retrieval_seconds: Optional[float] = None
+        self.consumed = False
+        self.task = asyncio.create_task(self._retrieve(retriever))
+
+    async def _retrieve(self, retriever) -> List[Document]:
+        docs = await retriever.ainvoke(self.query)
+        self.retrieval_seconds = time.perf_counter() - self.started
+        return docs
+
+    async def take(self, query: str) -> Optional[List[Document]]:
+        """Prefetched documents if `query` is similar enough to the prefetched one."""
+        if self.consumed or query_overlap(self.query, query) < RAG_PREFETCH_MIN_OVERLAP:
+            metrics.increment("rag_prefetch_misses")
+            return None
+        self.consumed = True
+        requested = time.perf_counter()
+        try:
+            docs = await self.task
+        except Exception as e:
+            print(f"⚠️ Prefetch de recuperación falló, se consulta de nuevo: {e}")
+            metrics.increment("rag_prefetch_errors")
+            return None
+        waited = time.perf_counter() - requested
+        # Without prefetch the tool would have spent the whole retrieval time from here on
+        metrics.increment("rag_prefetch_hits")
+        metrics.increment("rag_prefetch_saved_ms", int(max(self.retrieval_seconds - waited, 0) * 1000))
+        return docs
+
+    def close(self):
+        if not self.consumed:
+            metrics.increment("rag_prefetch_unused")
+            self.task.cancel()
+
+
+class RetrievalPrefetcher:
+    """Starts speculative retrievals with the same retriever the RAG tool uses."""
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+
+    @contextmanager
+    def scope(self, query: str, retriever=None):
+        """Prefetches `query` for the agent turn run inside this context (`retriever` overrides the default)."""
+        prefetch = Prefetch(query, retriever or self.retriever)
+        metrics.increment("rag_prefetch_started")
+        token = _pending.set(prefetch)
+        try:
+            yield prefetch
+        finally:
+            _pending.reset(token)
+            prefetch.close()
+
+
+async def take_prefetched(query: str) -> Optional[List[Document]]:
+    """Called by the RAG tool: prefetched documents for `query`, or None to retrieve normally."""
+    prefetch = _pending.get()
+    return await prefetch.take(query) if prefetch else None
+
+
+def prefetch_stats() -> Dict[str, float]:
+    started = metrics.get("rag_prefetch_started")
+    hits = metrics.get("rag_prefetch_hits")
+    return {
+        "hit_rate": round(hits / started, 3) if started else 0.0,
+        "avg_saved_ms": round(metrics.get("rag_prefetch_saved_ms") / hits, 1) if hits else 0.0,
+    }
@@ -0,0 +1,161 @@
+import re
+import json
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.agent.overrides import sampling_overrides
+from src.utils import metrics
+from src.utils.config import GENERATION_PROFILES_JSON, TOOL_PROFILES
+
+# --- Generation profiles ---
+# qwen3 reasons at length before answering unless told otherwise, and nothing
+# capped the output, so a phone number could take as long as an essay. Each kind
+# of call gets a profile (output cap, context size, reasoning on/off, stop
+# sequences) applied per request through Ollama options.
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    name: str
+    num_predict: Optional[int] = None
+    num_ctx: Optional[int] = None
+    reasoning: Optional[bool] = False
+    stop: Optional[List[str]] = None
+
+    def call_kwargs(self, base_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Per-call ChatOllama kwargs. `options` replaces the model's own, so the base sampling params are merged in."""
+        options = {**base_options}
+        for key in ("num_predict", "num_ctx", "stop"):
+            if getattr(self, key) is not None:
+                options[key] = getattr(self, key)
+        return {"options": options, "reasoning": self.reasoning}
+
+
+DEFAULT_PROFILES = {
+    # Tool selection or a one-line answer
+    "router": GenerationProfile("router", num_predict=384, num_ctx=8192),
+    # Phrasing a tool's output for the user
+    "summarizer": GenerationProfile("summarizer", num_predict=512, num_ctx=8192),
+    # Longer tool outputs (e.g. the solar installation estimate)
+    "detailed": GenerationProfile("detailed", num_predict=1024, num_ctx=8192),
+    # Grounded answers over retrieved documents (up to RAG_CONTEXT_MAX_CHARS of context)
+    "rag": GenerationProfile("rag", num_predict=1024, num_ctx=8192),
+}
+
+
+def load_profiles() -> Dict[str, GenerationProfile]:
+    """DEFAULT_PROFILES with GENERATION_PROFILES overrides, e.g. '{"rag": {"num_predict": 1536}}'."""
+    profiles = dict(DEFAULT_PROFILES)
+    for name, fields in (json.loads(GENERATION_PROFILES_JSON) if GENERATION_PROFILES_JSON else {}).items():
+        base = profiles.get(name, GenerationProfile(name))
+        profiles[name] = replace(base, **fields)
+    return profiles
+
+
+def tool_profiles(profiles: Dict[str, GenerationProfile]) -> Dict[str, GenerationProfile]:
+    """Profile used to answer from each tool's output, when it differs from "summarizer"."""
+    return {tool: profiles[name] for tool, name in TOOL_PROFILES.items() if name in profiles}
+
+
+_THINK_BLOCK = re.compile(r"<think>.*?(</think>|$)", re.DOTALL)
+
+
+def strip_reasoning(text: str) -> str:
+    """Removes <think> blocks, including one left open by the output cap."""
+    if "<think>" not in text:
+        return text
+    return _THINK_BLOCK.sub("", text).strip()
+
+
+def record_profile_usage(profile: GenerationProfile, message: BaseMessage, seconds: float) -> None:
+    metrics.increment("profile_calls", profile=profile.name)
+    metrics.increment("profile_ms", int(seconds * 1000), profile=profile.name)
+    usage = getattr(message, "usage_metadata", None) or {}
+    metrics.increment("profile_input_tokens", usage.get("input_tokens", 0), profile=profile.name)
+    metrics.increment("profile_output_tokens", usage.get("output_tokens", 0), profile=profile.name)
+    if message.response_metadata.get("done_reason") == "length":
+        metrics.increment("profile_truncated", profile=profile.name)
+    # Ollama reports its own timings (ns): model load + prompt evaluation is the
+    # time to the first token, eval_count / eval_duration the decode speed
+    meta = message.response_metadata
+    if meta.get("prompt_eval_duration") is not None:
+        ttft = (meta.get("load_duration") or 0) + meta["prompt_eval_duration"]
+        metrics.observe("llm_time_to_first_token_seconds", ttft / 1e9, profile=profile.name)
+    if meta.get("eval_count") and meta.get("eval_duration"):
+        metrics.observe(
+            "llm_tokens_per_second",
+            meta["eval_count"] / (meta["eval_duration"] / 1e9),
+            buckets=metrics.RATE_BUCKETS,
+            profile=profile.name,
+        )
+
+
+class ProfiledChatModel(BaseChatModel):
+    """
+    Applies a generation profile to every call of the inner model, strips
+    reasoning from the answer and records per-profile latency and tokens.
+    """
+
+    inner: BaseChatModel
+    profile: GenerationProfile
+    base_options: Dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"profile": self.profile.name, **self.inner._identifying_params}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted_tools = [convert_to_openai_tool(t) for t in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _call_kwargs(self, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Sampling params of this request (ChatRequest.overrides) win over the agent's
+        call = self.profile.call_kwargs({**self.base_options, **sampling_overrides()})
+        if stop:
+            call["options"]["stop"] = stop  # Ollama ignores `stop` when options are given
+        return {**call, **kwargs}
+
+    def _finish(self, result: ChatResult, started: float) -> ChatResult:
+        message = result.generations[0].message
+        if isinstance(message, AIMessage) and isinstance(message.content, str):
+            message.content = strip_reasoning(message.content)
+            result.generations[0].text = message.content
+        record_profile_usage(self.profile, message, time.perf_counter() - started)
+        return result
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        kwargs = self._call_kwargs(stop, kwargs)
+        with metrics.in_flight("llm_in_flight"), metrics.span("llm", profile=self.profile.name):
+            result = self.inner._generate(messages, stop, run_manager, **kwargs)
+        return self._finish(result, started)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        kwargs = self._call_kwargs(stop, kwargs)
+        with metrics.in_flight("llm_in_flight"), metrics.span("llm", profile=self.profile.name):
+            result = await self.inner._agenerate(messages, stop, run_manager, **kwargs)
+        return self._finish(result, started)
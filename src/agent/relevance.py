@@ -0,0 +1,51 @@
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.utils import metrics
+
+# --- Relevance gate ---
+# The RAG prompt already answers a fixed fallback phrase when the context does not
+# cover the question, but producing that sentence costs a full generation. The
+# retriever scores the best match first; below RAG_MIN_RELEVANCE (calibrated with
+# calibrate_relevance.py) it returns no documents and the RAG tool answers the
+# fallback without calling the LLM.
+
+
+def best_relevance(vectorstore, embedding: List[float]) -> float:
+    """Relevance (higher is better, same scale as similarity_search_with_relevance_scores) of the closest chunk."""
+    results = vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k=1)
+    if not results:
+        return 0.0
+    return vectorstore._select_relevance_score_fn()(results[0][1])
+
+
+class ScoredMMRRetriever(BaseRetriever):
+    """
+    MMR retriever (same k / fetch_k / lambda_mult as before) that embeds the query
+    once, checks the best match's relevance and skips MMR when it is too low.
+    """
+
+    vectorstore: Any
+    k: int = 5
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    min_relevance: Optional[float] = None
+
+    def score(self, query: str) -> float:
+        return best_relevance(self.vectorstore, self.vectorstore.embeddings.embed_query(query))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        with metrics.span("embedding"):
+            embedding = self.vectorstore.embeddings.embed_query(query)
+        with metrics.span("vector_search"):
+            if self.min_relevance:
+                relevance = best_relevance(self.vectorstore, embedding)
+                if relevance < self.min_relevance:
+                    metrics.increment("rag_low_relevance_skips")
+                    return []
+            return self.vectorstore.max_marginal_relevance_search_by_vector(
+                embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
@@ -0,0 +1,190 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.utils import metrics
+from src.utils.config import LLM_MAX_CONCURRENCY
+
+# --- LLM request scheduler ---
+# Sits between the agent graph and Ollama. At most `max_concurrency` generations
+# run at once; the rest wait in a priority queue (lower value first, then the
+# earliest deadline). A request whose deadline passes while waiting or while
+# generating is abandoned, and cancelling the caller's task (client disconnect)
+# cancels the in-flight generation, which closes the HTTP stream to Ollama.
+
+PRIORITY_ROUTING = 0   # agent turns: tool selection and short answers
+PRIORITY_RAG = 1       # long RAG generations inside BuscadorDocumentosCelsia
+PRIORITY_BACKGROUND = 2
+
+# Absolute deadline (time.monotonic) of the request being served in this context
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before its LLM generation finished."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Sets the deadline for every LLM call made inside this context (None = no deadline)."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class LLMScheduler:
+    """Bounded pool of generation slots handed out by priority."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self._waiters: List[Any] = []
+        self._seq = itertools.count()
+
+    def _grant_next(self):
+        while self._waiters and self.active < self.max_concurrency:
+            _, _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.active += 1
+                future.set_result(True)
+
+    def release(self):
+        self.active -= 1
+        self._grant_next()
+
+    async def acquire(self, priority: int = PRIORITY_ROUTING, deadline: Optional[float] = None):
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        sort_deadline = deadline if deadline is not None else float("inf")
+        heapq.heappush(self._waiters, (priority, sort_deadline, next(self._seq), future))
+        metrics.increment("llm_scheduler_queued")
+        try:
+            timeout = remaining_seconds(deadline)
+            if timeout is not None and timeout <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted right as we gave up: hand it to the next waiter
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                metrics.increment("llm_scheduler_deadline_exceeded")
+                raise DeadlineExceeded("Deadline exceeded while waiting for an LLM slot.") from None
+            raise
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_ROUTING, deadline: Optional[float] = None):
+        await self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def status(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": sum(1 for *_, future in self._waiters if not future.done()),
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+SCHEDULER = LLMScheduler(LLM_MAX_CONCURRENCY)
+
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Wraps a chat model so its async generations go through the scheduler with a
+    fixed priority and the current request deadline. Sync calls (scripts,
+    benchmarks) bypass the scheduler and go straight to the inner model.
+    """
+
+    inner: BaseChatModel
+    priority: int = PRIORITY_ROUTING
+    scheduler: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"priority": self.priority, **self.inner._identifying_params}
+
+    def _scheduler(self) -> LLMScheduler:
+        return self.scheduler or SCHEDULER
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        # Same contract as ChatOllama.bind_tools: tools are forwarded to the inner model
+        formatted_tools = [convert_to_openai_tool(t) for t in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.inner._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        deadline = current_deadline()
+        queued = time.perf_counter()
+        async with self._scheduler().slot(self.priority, deadline):
+            metrics.observe("llm_queue_wait_seconds", time.perf_counter() - queued, priority=self.priority)
+            generation = self.inner._agenerate(messages, stop, run_manager, **kwargs)
+            try:
+                return await asyncio.wait_for(generation, remaining_seconds(deadline))
+            except asyncio.TimeoutError:
+                metrics.increment("llm_scheduler_deadline_exceeded")
+                raise DeadlineExceeded("Deadline exceeded during LLM generation.") from None
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        yield from self.inner._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with self._scheduler().slot(self.priority, current_deadline()):
+            async for chunk in self.inner._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
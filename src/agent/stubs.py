@@ -0,0 +1,130 @@
+import re
+import math
+import time
+import asyncio
+import hashlib
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.utils.config import STUB_TOKEN_LATENCY_SECONDS, STUB_OUTPUT_TOKENS
+
+# --- Offline stub backends (STUB_BACKENDS=true) ---
+# Deterministic stand-ins for Ollama and the embeddings API, so the API layer,
+# the agent graph and the checkpointer can be load-tested on any machine
+# (load_test.py). The chat model follows a fixed script: keyword -> tool call,
+# otherwise the RAG tool, then an answer built from the tool output, taking
+# STUB_TOKEN_LATENCY_SECONDS per output token.
+
+# Accent-free keyword -> (tool, arguments)
+TOOL_SCRIPT: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("telefono", "get_telefono_celsia", {}),
+    ("direccion", "get_direccion_celsia", {}),
+    ("redes", "get_social_media_celsia", {}),
+    ("factura", "generar_factura_simulada", {"numero_cuenta": "123456", "mes": "enero"}),
+    ("servicio", "verificar_estado_servicio", {"ciudad": "Cali"}),
+    ("solar", "calcular_instalacion_solar", {"consumo_mensual_kwh": 300, "ciudad": "Cali"}),
+]
+RAG_TOOL = "BuscadorDocumentosCelsia"
+
+
+def _words(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"\w+", text)
+
+
+class HashEmbeddings(Embeddings):
+    """Bag-of-words vectors (hashed words, L2-normalized): texts sharing words are close."""
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for word in _words(text):
+            vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.size] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that plays TOOL_SCRIPT instead of calling Ollama (per-call kwargs are ignored)."""
+
+    model: str = "stub"
+    token_latency: float = STUB_TOKEN_LATENCY_SECONDS
+    output_tokens: int = STUB_OUTPUT_TOKENS
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-stub"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted_tools = [convert_to_openai_tool(t) for t in tools]
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[list]) -> AIMessage:
+        available = {t["function"]["name"] for t in tools or [] if "function" in t}
+        last = messages[-1]
+        if isinstance(last, HumanMessage) and available:
+            words = set(_words(str(last.content)))
+            for keyword, tool_name, args in TOOL_SCRIPT:
+                if keyword in words and tool_name in available:
+                    return AIMessage(content="", tool_calls=[{"name": tool_name, "args": args, "id": f"call_{tool_name}"}])
+            if RAG_TOOL in available:
+                return AIMessage(content="", tool_calls=[{"name": RAG_TOOL, "args": {"pregunta": str(last.content)}, "id": "call_rag"}])
+        # Answer: the tool output (or the prompt's last message), cut to the output size
+        source = str(last.content)
+        words = source.split()[: self.output_tokens] or ["Respuesta", "simulada."]
+        return AIMessage(content=" ".join(words))
+
+    def _result(self, message: AIMessage, seconds: float) -> ChatResult:
+        tokens = max(len(str(message.content).split()), 1)
+        message.response_metadata = {
+            "model": self.model,
+            "done_reason": "stop",
+            "prompt_eval_duration": 0,
+            "eval_count": tokens,
+            "eval_duration": int(seconds * 1e9),
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._reply(messages, kwargs.get("tools"))
+        seconds = self.token_latency * max(len(str(message.content).split()), 1)
+        time.sleep(seconds)
+        return self._result(message, seconds)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._reply(messages, kwargs.get("tools"))
+        seconds = self.token_latency * max(len(str(message.content).split()), 1)
+        await asyncio.sleep(seconds)
+        return self._result(message, seconds)
@@ -0,0 +1,104 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import BaseTool
+from langgraph.prebuilt import ToolNode
+from langgraph.types import Command
+
+from src.utils import metrics
+from src.utils.config import TOOL_TIMEOUT_SECONDS, TOOL_TIMEOUTS
+
+# --- Parallel tool execution ---
+# When the model emits several tool calls in one step ("teléfono, dirección y
+# cortes en Ibagué"), the graph runs them concurrently: each call is its own task
+# in the same superstep, so async tools overlap on the event loop and sync tools
+# run on worker threads. Results are merged into the state in tool-call order.
+# This module adds a per-tool timeout on top and keeps return_direct correct
+# when direct and non-direct tools are mixed in the same step.
+
+# Sync runs need their own threads so a hung tool can be abandoned at its timeout
+_SYNC_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
+
+
+def tool_timeout(name: str) -> float:
+    return TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT_SECONDS)
+
+
+def _timeout_message(call, timeout: float) -> ToolMessage:
+    metrics.increment("tool_timeouts", tool=call["name"])
+    return ToolMessage(
+        content=(
+            f"La herramienta {call['name']} no respondió a tiempo ({timeout:.0f}s). "
+            "Informa al usuario que ese dato no está disponible en este momento."
+        ),
+        name=call["name"],
+        tool_call_id=call["id"],
+        status="error",
+    )
+
+
+def _sibling_calls(request) -> List[dict]:
+    """Tool calls emitted in the same model step as `request`."""
+    state = request.state
+    messages = state.get("messages", []) if isinstance(state, dict) else state
+    for msg in reversed(messages or []):
+        if isinstance(msg, AIMessage):
+            return msg.tool_calls
+    return []
+
+
+def _finish_step(request, direct_tools, result):
+    """
+    The agent graph ends the turn as soon as any tool of the step is return_direct.
+    In a mixed step, the non-direct results still need an LLM answer, so their
+    message is sent with an explicit jump back to the agent. So does a failed
+    direct tool (e.g. missing arguments): the agent gets to correct the call
+    instead of the error becoming the answer.
+    """
+    if not isinstance(result, ToolMessage):
+        return result
+    if request.tool_call["name"] in direct_tools:
+        if result.status == "error":
+            return Command(update={"messages": [result]}, goto="agent")
+        return result
+    if any(call["name"] in direct_tools for call in _sibling_calls(request)):
+        return Command(update={"messages": [result]}, goto="agent")
+    return result
+
+
+def create_tool_node(tools: List[BaseTool]) -> ToolNode:
+    """ToolNode with per-tool timeouts, for create_react_agent(tools=...)."""
+    direct_tools = {t.name for t in tools if t.return_direct}
+
+    def wrap_tool_call(request, execute):
+        name = request.tool_call["name"]
+        timeout = tool_timeout(name)
+        context = contextvars.copy_context()
+        with metrics.in_flight("tools_in_flight"), metrics.span("tool", tool=name):
+            future = _SYNC_POOL.submit(context.run, execute, request)
+            try:
+                result = future.result(timeout=timeout)
+            except FutureTimeoutError:
+                if future.done():
+                    raise  # the tool itself raised TimeoutError
+                # The worker thread cannot be killed; its late result is discarded
+                result = _timeout_message(request.tool_call, timeout)
+        return _finish_step(request, direct_tools, result)
+
+    async def awrap_tool_call(request, execute):
+        name = request.tool_call["name"]
+        timeout = tool_timeout(name)
+        with metrics.in_flight("tools_in_flight"), metrics.span("tool", tool=name):
+            task = asyncio.ensure_future(execute(request))
+            try:
+                result = await asyncio.wait_for(task, timeout)
+            except asyncio.TimeoutError:
+                if not task.cancelled():
+                    raise  # raised by the tool, e.g. the request deadline, which must reach the API
+                result = _timeout_message(request.tool_call, timeout)
+        return _finish_step(request, direct_tools, result)
+
+    return ToolNode(tools, wrap_tool_call=wrap_tool_call, awrap_tool_call=awrap_tool_call)
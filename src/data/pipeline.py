@@ -0,0 +1,269 @@
+import time
+import queue
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+from src.data.processing import limpiar_texto_para_rag, es_chunk_valido
+
+# --- Streaming ingestion pipeline ---
+# crawl -> clean -> chunk -> dedupe -> embed -> upsert
+# Every stage is a thread reading from a bounded queue and writing to the next
+# one, so a slow stage (usually embed) applies backpressure to the crawler
+# instead of buffering the whole dataset in memory. Records flow through as
+# soon as they are scraped: a new article is searchable once its batch is upserted.
+
+_DONE = object()
+
+# Scraper record fields holding the text of each kind of page, in priority order.
+TEXT_FIELDS = ("content", "summary", "description")
+TITLE_FIELDS = ("title", "page_title")
+
+
+class StageStats:
+    """Per-stage throughput counters."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.perf_counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        wall = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            "stage": self.name,
+            "in": self.items_in,
+            "out": self.items_out,
+            "busy_seconds": self.busy_seconds,
+            "out_per_second": self.items_out / wall,
+            "utilization": self.busy_seconds / wall,
+        }
+
+
+class Stage(threading.Thread):
+    """
+    Runs `fn` over items from `inbox` and puts its results in `outbox`.
+    With batch_size > 1 items are grouped until the batch is full or the inbox
+    stays empty for `max_wait` seconds, whichever comes first.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], Iterable[Any]], inbox: queue.Queue,
+                 outbox: Optional[queue.Queue], batch_size: int = 1, max_wait: float = 1.0):
+        super().__init__(name=f"pipeline-{name}", daemon=True)
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stats = StageStats(name)
+        self.error: Optional[BaseException] = None
+
+    def _next_batch(self):
+        batch = [self.inbox.get()]
+        if batch[0] is _DONE:
+            return [], True
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self.inbox.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def run(self):
+        done = False
+        try:
+            while not done:
+                batch, done = self._next_batch()
+                if not batch:
+                    continue
+                self.stats.items_in += len(batch)
+                start = time.perf_counter()
+                results = list(self.fn(batch))
+                self.stats.busy_seconds += time.perf_counter() - start
+                self.stats.items_out += len(results)
+                if self.outbox is not None:
+                    for result in results:
+                        self.outbox.put(result)
+        except BaseException as e:
+            self.error = e
+            # Keep draining so upstream stages never block on a full queue
+            # (unless this batch already ended with the sentinel)
+            while not done and self.inbox.get() is not _DONE:
+                pass
+        finally:
+            # Downstream stages finish even when this one failed
+            if self.outbox is not None:
+                self.outbox.put(_DONE)
+
+
+def chunk_id(chunk: Document) -> str:
+    """Content-addressed id: the same cleaned text from the same source is stored once."""
+    key = f"{chunk.metadata.get('source', '')}\n{chunk.page_content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def record_to_document(section: str, record: Dict[str, Any]) -> Optional[Document]:
+    """Maps a scraper record to a Document with the metadata keys used by the chunk files."""
+    if "error" in record:
+        return None
+    text = next((record[f] for f in TEXT_FIELDS if record.get(f)), None)
+    if not text:
+        return None
+    title = next((record[f] for f in TITLE_FIELDS if record.get(f)), None)
+    metadata = {
+        "source": record.get("url"),
+        "title": title,
+        "category": section,
+        "source_type": "web",
+    }
+    metadata = {k: v for k, v in metadata.items() if v is not None}
+    if title and not text.startswith(title):
+        text = f"{title}. {text}"
+    return Document(page_content=text, metadata=metadata)
+
+
+class IngestionPipeline:
+    """
+    Wires the stages together. `produce(emit)` is the crawl stage: it calls
+    `emit(section, record)` for every scraped record and returns when done.
+    """
+
+    def __init__(self, collection, embeddings, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 queue_size: int = 200, batch_size: int = 100, max_wait: float = 1.0):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        self.collection = collection
+        self.embeddings = embeddings
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            is_separator_regex=False,
+        )
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.seen_ids = set()
+        self.replaced_sources = set()
+        self.crawl_stats = StageStats("crawl")
+        self.stages: List[Stage] = []
+
+    # --- Stage functions ---
+
+    def clean(self, batch):
+        for section, record in batch:
+            document = record_to_document(section, record)
+            if document is not None:
+                yield document, record.get("crawl_status") == "changed"
+
+    def chunk(self, batch):
+        for document, changed in batch:
+            for chunk in self.splitter.split_documents([document]):
+                chunk.page_content = limpiar_texto_para_rag(chunk.page_content)
+                if es_chunk_valido(chunk.page_content):
+                    yield chunk, changed
+
+    def dedupe(self, batch):
+        # A changed page replaces all of its previous chunks
+        for chunk, changed in batch:
+            source = chunk.metadata.get("source")
+            if changed and source and source not in self.replaced_sources:
+                self.replaced_sources.add(source)
+                self.collection.delete(where={"source": source})
+
+        candidates = {}
+        for chunk, _ in batch:
+            cid = chunk_id(chunk)
+            if cid not in self.seen_ids and cid not in candidates:
+                candidates[cid] = chunk
+        if not candidates:
+            return
+        existing = set(self.collection.get(ids=list(candidates), include=[])["ids"])
+        for cid, chunk in candidates.items():
+            self.seen_ids.add(cid)
+            if cid not in existing:
+                yield cid, chunk
+
+    def embed(self, batch):
+        vectors = self.embeddings.embed_documents([chunk.page_content for _, chunk in batch])
+        for (cid, chunk), vector in zip(batch, vectors):
+            yield cid, chunk, vector
+
+    def upsert(self, batch):
+        self.collection.upsert(
+            ids=[cid for cid, _, _ in batch],
+            embeddings=[vector for _, _, vector in batch],
+            documents=[chunk.page_content for _, chunk, _ in batch],
+            metadatas=[chunk.metadata for _, chunk, _ in batch],
+        )
+        return batch
+
+    # --- Orchestration ---
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [self.crawl_stats.as_dict()] + [stage.stats.as_dict() for stage in self.stages]
+
+    def print_stats(self):
+        print(f"{'stage':<8} {'in':>7} {'out':>7} {'out/s':>8} {'busy s':>8} {'util':>6}")
+        for s in self.stats():
+            print(f"{s['stage']:<8} {s['in']:>7} {s['out']:>7} {s['out_per_second']:>8.1f} "
+                  f"{s['busy_seconds']:>8.2f} {s['utilization']:>6.0%}")
+
+    def run(self, produce: Callable[[Callable[[str, Dict[str, Any]], None]], None],
+            report_every: float = 0) -> List[Dict[str, Any]]:
+        """Runs one pass of the pipeline and returns the final per-stage counters."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(5)]
+        specs = [
+            ("clean", self.clean, 1),
+            ("chunk", self.chunk, 1),
+            ("dedupe", self.dedupe, self.batch_size),
+            ("embed", self.embed, self.batch_size),
+            ("upsert", self.upsert, self.batch_size),
+        ]
+        # Dedupe state is per pass: with --watch a page can change again, and its
+        # chunks are deleted and must be re-inserted even if an earlier pass saw them
+        self.seen_ids = set()
+        self.replaced_sources = set()
+        self.crawl_stats = StageStats("crawl")
+        self.stages = [
+            Stage(name, fn, queues[i], queues[i + 1] if i + 1 < len(queues) else None,
+                  batch_size=batch_size, max_wait=self.max_wait)
+            for i, (name, fn, batch_size) in enumerate(specs)
+        ]
+        for stage in self.stages:
+            stage.start()
+
+        reporter_stop = threading.Event()
+        if report_every:
+            def report():
+                while not reporter_stop.wait(report_every):
+                    self.print_stats()
+            threading.Thread(target=report, daemon=True).start()
+
+        def emit(section, record):
+            self.crawl_stats.items_out += 1
+            queues[0].put((section, record))
+
+        start = time.perf_counter()
+        try:
+            produce(emit)
+        finally:
+            self.crawl_stats.items_in = self.crawl_stats.items_out
+            self.crawl_stats.busy_seconds = time.perf_counter() - start
+            queues[0].put(_DONE)
+            for stage in self.stages:
+                stage.join()
+            reporter_stop.set()
+
+        for stage in self.stages:
+            if stage.error is not None:
+                raise RuntimeError(f"Pipeline stage '{stage.stats.name}' failed: {stage.error}") from stage.error
+        return self.stats()
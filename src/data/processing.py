@@ -1,7 +1,55 @@
 import os
+import re
 import json
+import time
 from langchain_core.documents import Document
-from typing import List, Any # Assuming List is needed for type hinting
+from typing import List, Any, Dict # Assuming List is needed for type hinting
+
+def documents_from_data(data: Any, file_path: str) -> List[Document]:
+    """Builds documents from already-parsed JSON data, manually extracting content and metadata."""
+    documents = []
+
+    # Case 1: JSON structure is a top-level object with a 'chunks' key
+    if isinstance(data, dict) and 'chunks' in data and isinstance(data['chunks'], list):
+        for record in data['chunks']:
+            content = record.get("content")
+            if content:
+                metadata = {
+                    "source": record.get("source_url", os.path.basename(file_path)),
+                    "title": record.get("title"),
+                    "date": record.get("date"),
+                    "region": record.get("region"),
+                    "category": record.get("category"),
+                    "source_type": record.get("source_type")
+                }
+                metadata = {k: v for k, v in metadata.items() if v is not None}
+                documents.append(Document(page_content=content, metadata=metadata))
+
+    # Case 2: JSON structure is a top-level list of objects
+    elif isinstance(data, list):
+        for record in data:
+            content = record.get("post") # Assuming 'post' contains the main text content
+            if content:
+                metadata = {
+                    "source": record.get("URL imagen/video", os.path.basename(file_path)),
+                    "user": record.get("user"),
+                    "tiempo": record.get("tiempo"),
+                    "reacciones": record.get("Reacciones"),
+                    "interacciones": record.get("Interacciones")
+                }
+                metadata = {k: v for k, v in metadata.items() if v is not None}
+                documents.append(Document(page_content=content, metadata=metadata))
+
+    # Case 3: Other dictionary structure, trying direct content extraction
+    elif isinstance(data, dict):
+        content = data.get("text") or data.get("content") or data.get("post")
+        if content:
+            metadata = {"source": os.path.basename(file_path)}
+            documents.append(Document(page_content=content, metadata=metadata))
+    else:
+        print(f"Warning: Unexpected top-level JSON structure in '{file_path}'. No documents extracted directly.")
+
+    return documents
 
 def load_documents_from_json(file_path: str) -> List[Document]:
     """Loads documents from a JSON file, manually extracting content and metadata."""
@@ -9,50 +57,105 @@ def load_documents_from_json(file_path: str) -> List[Document]:
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        
-        # Case 1: JSON structure is a top-level object with a 'chunks' key
-        if isinstance(data, dict) and 'chunks' in data and isinstance(data['chunks'], list):
-            for record in data['chunks']:
-                content = record.get("content")
-                if content:
-                    metadata = {
-                        "source": record.get("source_url", os.path.basename(file_path)),
-                        "title": record.get("title"),
-                        "date": record.get("date"),
-                        "region": record.get("region"),
-                        "category": record.get("category"),
-                        "source_type": record.get("source_type")
-                    }
-                    metadata = {k: v for k, v in metadata.items() if v is not None}
-                    documents.append(Document(page_content=content, metadata=metadata))
-        
-        # Case 2: JSON structure is a top-level list of objects
-        elif isinstance(data, list):
-            for record in data:
-                content = record.get("post") # Assuming 'post' contains the main text content
-                if content:
-                    metadata = {
-                        "source": record.get("URL imagen/video", os.path.basename(file_path)),
-                        "user": record.get("user"),
-                        "tiempo": record.get("tiempo"),
-                        "reacciones": record.get("Reacciones"),
-                        "interacciones": record.get("Interacciones")
-                    }
-                    metadata = {k: v for k, v in metadata.items() if v is not None}
-                    documents.append(Document(page_content=content, metadata=metadata))
-
-        # Case 3: Other dictionary structure, trying direct content extraction
-        elif isinstance(data, dict):
-            content = data.get("text") or data.get("content") or data.get("post")
-            if content:
-                metadata = {"source": os.path.basename(file_path)}
-                documents.append(Document(page_content=content, metadata=metadata))
-        else:
-            print(f"Warning: Unexpected top-level JSON structure in '{file_path}'. No documents extracted directly.")
+        documents = documents_from_data(data, file_path)
 
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON from {file_path}: {e}")
     except Exception as e:
         print(f"An unexpected error occurred while loading {file_path}: {e}")
-    
-    return documents
\ No newline at end of file
+
+    return documents
+
+# --- Text cleaning (shared with regenerar_chromadb.py) ---
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"
+    "\U0001F300-\U0001F5FF"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F900-\U0001F9FF"
+    "\U00002702-\U000027B0"
+    "]+", flags=re.UNICODE)
+
+def limpiar_texto_para_rag(texto: Any) -> str:
+    """Removes emojis, special characters and repetitive patterns from a chunk."""
+    if not isinstance(texto, str):
+        return ""
+
+    # a) Eliminar emojis
+    texto = EMOJI_PATTERN.sub(r'', texto)
+
+    # Eliminar caracteres especiales manteniendo puntuación básica
+    texto = re.sub(r'[^a-zA-Z0-9\sñáéíóúüÑÁÉÍÓÚÜ.,;:¿?¡!()-]', '', texto)
+
+    # Eliminar patrones repetitivos
+    patron_frase_completa = r'\bEdición\s*\d+\s*Tolima\b\.?'
+    texto = re.sub(patron_frase_completa, '', texto, flags=re.IGNORECASE)
+
+    # Eliminar palabras sueltas problemáticas
+    palabras_sueltas_a_eliminar = ['hashtag', 'undefined']
+    patron_palabras_sueltas = r'\b(' + '|'.join(palabras_sueltas_a_eliminar) + r')\b'
+    texto = re.sub(patron_palabras_sueltas, '', texto, flags=re.IGNORECASE)
+
+    # Limpieza final: eliminar espacios extra
+    texto = re.sub(r'\s+', ' ', texto).strip()
+
+    return texto
+
+def es_chunk_valido(texto: str, min_length: int = 30) -> bool:
+    """A chunk is kept if it is long enough and has some meaningful vocabulary."""
+    if len(texto) < min_length:
+        return False
+    palabras = texto.split()
+    # Verificar que tenga al menos 3 palabras diferentes
+    if len(set(palabras)) < 3:
+        return False
+    # Verificar que tenga al menos una palabra de más de 4 letras
+    if not any(len(p) > 4 for p in palabras):
+        return False
+    return True
+
+def process_source_file(file_path: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> Dict[str, Any]:
+    """
+    Loads, cleans and chunks a single source file. Designed to run inside a
+    process pool worker, so it never raises: errors are reported in the result.
+    """
+    start = time.perf_counter()
+    report = {
+        "file": os.path.basename(file_path),
+        "bytes": 0,
+        "documents": 0,
+        "chunks": 0,
+        "discarded_chunks": 0,
+        "parse_seconds": 0.0,
+        "error": None,
+    }
+    chunks: List[Document] = []
+    try:
+        report["bytes"] = os.path.getsize(file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        documents = documents_from_data(data, file_path)
+        report["documents"] = len(documents)
+
+        # Imported here so pool workers only pay for it when they actually chunk
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            is_separator_regex=False,
+        )
+        for chunk in text_splitter.split_documents(documents):
+            chunk.page_content = limpiar_texto_para_rag(chunk.page_content)
+            if es_chunk_valido(chunk.page_content):
+                chunks.append(chunk)
+            else:
+                report["discarded_chunks"] += 1
+        report["chunks"] = len(chunks)
+    except json.JSONDecodeError as e:
+        report["error"] = f"JSONDecodeError: {e}"
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+
+    report["parse_seconds"] = time.perf_counter() - start
+    return {"chunks": chunks, "report": report}
@@ -0,0 +1,204 @@
+import os
+import io
+import json
+import gzip
+import time
+import base64
+import hashlib
+import tarfile
+from array import array
+from typing import Any, Dict, Optional
+
+import chromadb
+
+from src.utils.config import (
+    CHROMA_PERSIST_DIRECTORY,
+    CHROMA_COLLECTION_NAME,
+    embedding_fingerprint,
+)
+
+# --- Prebuilt index snapshots ---
+# A snapshot is a single tar artifact holding:
+#   manifest.json      -> format version, embedding fingerprint, counts, sha256 of the records
+#   records.jsonl.gz   -> one line per item: id, document, metadata and the float32 vector (base64)
+# Importing it rebuilds the Chroma collection without a single embedding call.
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+RECORDS_NAME = "records.jsonl.gz"
+PAGE_SIZE = 500
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is corrupt, incompatible or cannot be imported."""
+
+
+def collection_fingerprint(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """Reads the embedding fingerprint stamped on a collection at build time."""
+    if metadata and metadata.get("embedding_model"):
+        return {
+            "provider": metadata.get("embedding_provider"),
+            "model": metadata.get("embedding_model"),
+        }
+    return None
+
+
+def fingerprint_metadata() -> Dict[str, str]:
+    """Collection metadata that records which embedding model built the vectors."""
+    fingerprint = embedding_fingerprint()
+    return {"embedding_provider": fingerprint["provider"], "embedding_model": fingerprint["model"]}
+
+
+def _encode_vector(vector) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _decode_vector(encoded: str):
+    values = array("f")
+    values.frombytes(base64.b64decode(encoded))
+    return values.tolist()
+
+
+def export_snapshot(
+    output_path: str,
+    persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+    collection_name: str = CHROMA_COLLECTION_NAME
+) -> Dict[str, Any]:
+    """Packages a persisted Chroma collection into a single versioned, checksummed artifact."""
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(collection_name)
+
+    fingerprint = collection_fingerprint(collection.metadata)
+    if fingerprint is None:
+        # Collections built before the fingerprint was stamped: assume the configured model
+        fingerprint = embedding_fingerprint()
+        print(f"⚠️ Collection '{collection_name}' has no embedding fingerprint, assuming {fingerprint}.")
+
+    records_buffer = io.BytesIO()
+    count, dimension = 0, None
+    with gzip.GzipFile(fileobj=records_buffer, mode="wb", mtime=0) as gz:
+        offset = 0
+        while True:
+            page = collection.get(
+                limit=PAGE_SIZE,
+                offset=offset,
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not page["ids"]:
+                break
+            for item_id, vector, document, metadata in zip(
+                page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+            ):
+                dimension = dimension or len(vector)
+                line = {
+                    "id": item_id,
+                    "document": document,
+                    "metadata": metadata,
+                    "vector": _encode_vector(vector),
+                }
+                gz.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+                count += 1
+            offset += len(page["ids"])
+    records_bytes = records_buffer.getvalue()
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "collection_name": collection_name,
+        "collection_metadata": collection.metadata or {},
+        "embedding_fingerprint": dict(fingerprint, dimension=dimension),
+        "count": count,
+        "records_sha256": hashlib.sha256(records_bytes).hexdigest(),
+    }
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with tarfile.open(output_path, "w") as tar:
+        for name, payload in ((MANIFEST_NAME, manifest_bytes), (RECORDS_NAME, records_bytes)):
+            info = tarfile.TarInfo(name)
+            info.size = len(payload)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(payload))
+
+    print(f"✅ Snapshot with {count} items written to {output_path}")
+    return manifest
+
+
+def read_snapshot_manifest(snapshot_path: str) -> Dict[str, Any]:
+    """Returns the manifest of a snapshot without reading its records."""
+    try:
+        with tarfile.open(snapshot_path, "r") as tar:
+            return json.load(tar.extractfile(MANIFEST_NAME))
+    except (tarfile.TarError, KeyError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Invalid snapshot '{snapshot_path}': {e}") from e
+
+
+def import_snapshot(
+    snapshot_path: str,
+    persist_directory: str = CHROMA_PERSIST_DIRECTORY,
+    collection_name: Optional[str] = None,
+    expected_fingerprint: Optional[Dict[str, str]] = None,
+    overwrite: bool = False
+) -> Dict[str, Any]:
+    """
+    Restores a snapshot into a Chroma persist directory. The artifact is rejected
+    if its version is unknown, its checksum does not match or it was built with an
+    embedding model different from the one this process queries with.
+    """
+    try:
+        with tarfile.open(snapshot_path, "r") as tar:
+            manifest = json.load(tar.extractfile(MANIFEST_NAME))
+            records_bytes = tar.extractfile(RECORDS_NAME).read()
+    except (tarfile.TarError, KeyError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Invalid snapshot '{snapshot_path}': {e}") from e
+
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise SnapshotError(
+            f"Unsupported snapshot format {manifest.get('format_version')} (expected {SNAPSHOT_FORMAT_VERSION})."
+        )
+    if hashlib.sha256(records_bytes).hexdigest() != manifest.get("records_sha256"):
+        raise SnapshotError("Snapshot checksum mismatch: the artifact is corrupt or incomplete.")
+
+    expected = expected_fingerprint or embedding_fingerprint()
+    found = manifest.get("embedding_fingerprint", {})
+    if (found.get("provider"), found.get("model")) != (expected.get("provider"), expected.get("model")):
+        raise SnapshotError(
+            f"Embedding fingerprint mismatch: snapshot was built with {found.get('provider')}/{found.get('model')}, "
+            f"this host queries with {expected.get('provider')}/{expected.get('model')}."
+        )
+
+    collection_name = collection_name or manifest["collection_name"]
+    client = chromadb.PersistentClient(path=persist_directory)
+    existing = [c.name for c in client.list_collections()]
+    if collection_name in existing:
+        if not overwrite:
+            raise SnapshotError(f"Collection '{collection_name}' already exists in {persist_directory} (use overwrite).")
+        client.delete_collection(collection_name)
+
+    metadata = dict(manifest.get("collection_metadata") or {})
+    metadata.update({"embedding_provider": found["provider"], "embedding_model": found["model"]})
+    collection = client.create_collection(collection_name, metadata=metadata)
+
+    batch = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+
+    def flush():
+        if batch["ids"]:
+            collection.add(**batch)
+            for values in batch.values():
+                values.clear()
+
+    with gzip.GzipFile(fileobj=io.BytesIO(records_bytes), mode="rb") as gz:
+        for raw_line in gz:
+            record = json.loads(raw_line)
+            batch["ids"].append(record["id"])
+            batch["embeddings"].append(_decode_vector(record["vector"]))
+            batch["documents"].append(record["document"])
+            batch["metadatas"].append(record["metadata"] or None)
+            if len(batch["ids"]) >= PAGE_SIZE:
+                flush()
+    flush()
+
+    if collection.count() != manifest["count"]:
+        raise SnapshotError(f"Imported {collection.count()} items, manifest declares {manifest['count']}.")
+    print(f"✅ Snapshot restored: {manifest['count']} items in '{collection_name}' ({persist_directory})")
+    return manifest
+
@@ -0,0 +1,150 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables (main.py loads them too, this keeps scripts self-contained)
+load_dotenv()
+
+# --- Vector store ---
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chromadb_storage")
+CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "rag_collection")
+
+# --- Offline stubs ---
+# STUB_BACKENDS=true replaces Ollama and the embeddings API with deterministic
+# stand-ins (src/agent/stubs.py) for load tests and replays without any service.
+STUB_BACKENDS = os.getenv("STUB_BACKENDS", "false").lower() == "true"
+STUB_TOKEN_LATENCY_SECONDS = float(os.getenv("STUB_TOKEN_LATENCY_SECONDS", 0.005))
+STUB_OUTPUT_TOKENS = int(os.getenv("STUB_OUTPUT_TOKENS", 40))
+
+# --- Embeddings ---
+# The provider/model pair is the embedding fingerprint: vectors produced by a
+# different pair live in an incompatible space and must not be mixed.
+EMBEDDING_PROVIDER = "stub-hash" if STUB_BACKENDS else "google-genai"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+
+
+def embedding_fingerprint() -> dict:
+    """Identifies the embedding space the running process queries with."""
+    return {"provider": EMBEDDING_PROVIDER, "model": EMBEDDING_MODEL}
+
+
+# --- Agent ---
+# Tools whose formatted output is already the final answer: the agent turn ends
+# right after they run instead of spending another LLM call re-echoing them.
+DIRECT_RETURN_TOOLS = [
+    name.strip()
+    for name in os.getenv(
+        "DIRECT_RETURN_TOOLS",
+        "get_telefono_celsia,get_direccion_celsia,get_social_media_celsia,get_pqr_celsia,"
+        "get_pago_de_factura_celsia,generar_factura_simulada,verificar_estado_servicio,reportar_dano_servicio",
+    ).split(",")
+    if name.strip()
+]
+
+# How BuscadorDocumentosCelsia answers:
+#   "generate" -> runs the full RAG chain (its own prompt + LLM generation)
+#   "context"  -> returns the compacted retrieved context with source ids and the
+#                 agent answers once under the grounding rules (one LLM call less)
+RAG_TOOL_MODE = os.getenv("RAG_TOOL_MODE", "generate")
+RAG_CONTEXT_MAX_CHARS = int(os.getenv("RAG_CONTEXT_MAX_CHARS", 6000))
+
+# --- LLM scheduling ---
+# Concurrent generations allowed against Ollama (the rest queue by priority) and
+# the end-to-end budget of one /chat request; 0 disables the deadline.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 2))
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", 120))
+
+# --- Tool execution ---
+# Independent tool calls of one agent step run concurrently; each is abandoned
+# after its timeout. TOOL_TIMEOUTS overrides the default per tool, e.g.
+# "BuscadorDocumentosCelsia=60,verificar_estado_servicio=5".
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", 20))
+TOOL_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=", 1) for item in os.getenv("TOOL_TIMEOUTS", "BuscadorDocumentosCelsia=90").split(",") if "=" in item
+    )
+}
+
+# --- Speculative retrieval ---
+# Opt-in: /chat starts retrieval for the raw user message in parallel with the
+# agent's first LLM call. The RAG tool reuses it when its query shares at least
+# this fraction of content words with the user message.
+RAG_PREFETCH = os.getenv("RAG_PREFETCH", "false").lower() in ("1", "true", "yes")
+RAG_PREFETCH_MIN_OVERLAP = float(os.getenv("RAG_PREFETCH_MIN_OVERLAP", 0.5))
+
+# --- Models per role ---
+# Router: tool selection / short answers; summarizer: answers from non-RAG tool
+# output; RAG: grounded generation over retrieved documents. All default to
+# OLLAMA_LLM_MODEL; e.g. OLLAMA_ROUTER_MODEL=qwen3:4b keeps the 14b model for RAG.
+OLLAMA_LLM_MODEL = os.getenv("OLLAMA_LLM_MODEL", "qwen3:14b")
+OLLAMA_ROUTER_MODEL = os.getenv("OLLAMA_ROUTER_MODEL", OLLAMA_LLM_MODEL)
+OLLAMA_SUMMARIZER_MODEL = os.getenv("OLLAMA_SUMMARIZER_MODEL", OLLAMA_ROUTER_MODEL)
+OLLAMA_RAG_MODEL = os.getenv("OLLAMA_RAG_MODEL", OLLAMA_LLM_MODEL)
+
+# Escalation: a router/summarizer answer with a malformed or unknown tool call, an
+# empty answer, or a mean token logprob below the threshold (optional) is redone
+# once with LLM_ESCALATION_MODEL. The logprob threshold needs langchain-ollama>=1.1.0
+# (older clients cannot request logprobs) and is ignored otherwise.
+LLM_ESCALATION = os.getenv("LLM_ESCALATION", "false").lower() in ("1", "true", "yes")
+LLM_ESCALATION_MODEL = os.getenv("LLM_ESCALATION_MODEL", OLLAMA_RAG_MODEL)
+LLM_ESCALATION_MIN_AVG_LOGPROB = (
+    float(os.environ["LLM_ESCALATION_MIN_AVG_LOGPROB"]) if os.getenv("LLM_ESCALATION_MIN_AVG_LOGPROB") else None
+)
+
+# --- Generation profiles ---
+# Field overrides for the profiles in src/agent/profiles.py, as JSON, e.g.
+# '{"rag": {"num_predict": 1536, "reasoning": true}}', and the profile used to
+# answer from each tool's output when it is not "summarizer".
+GENERATION_PROFILES_JSON = os.getenv("GENERATION_PROFILES", "")
+TOOL_PROFILES = {
+    tool.strip(): profile.strip()
+    for tool, profile in (
+        item.split("=", 1) for item in os.getenv("TOOL_PROFILES", "calcular_instalacion_solar=detailed").split(",") if "=" in item
+    )
+}
+
+# --- Per-request overrides ---
+# Whitelisted ranges for the optional ChatRequest.overrides (same as the Streamlit
+# sliders). Values travel in the graph's runnable config; nothing is rebuilt.
+OVERRIDE_RANGES = {
+    "temperature": (0.0, 1.0),
+    "top_k": (1, 100),
+    "top_p": (0.0, 1.0),
+    "retriever_k": (1, 10),
+}
+
+# --- Relevance gate ---
+# Minimum relevance of the best retrieved chunk for the RAG tool to generate an
+# answer; below it the fallback message is returned without an LLM call. 0 disables
+# the gate. Pick the value with: python calibrate_relevance.py --labels <file>
+RAG_MIN_RELEVANCE = float(os.getenv("RAG_MIN_RELEVANCE", 0))
+
+# --- Degraded mode ---
+# Opt-in (DEGRADED_MODE=true), since it changes the API contract: errors and
+# deadlines become HTTP 200 answers flagged degraded instead of 500/504.
+# When the LLM is saturated or failing, /chat answers extractively (fast-path
+# tools, recent answers, sentences of the top retrieved chunk) and flags the
+# response as degraded. Triggers: LLM queue depth, the median latency of the last
+# DEGRADED_LATENCY_WINDOW turns above CHAT_LATENCY_SLO_SECONDS, or consecutive
+# failed turns. After DEGRADED_RECOVERY_SECONDS one trial turn goes to the LLM
+# again and, if it succeeds within the SLO, normal serving resumes.
+DEGRADED_MODE = os.getenv("DEGRADED_MODE", "false").lower() == "true"
+DEGRADED_MAX_QUEUE = int(os.getenv("DEGRADED_MAX_QUEUE", 8))
+CHAT_LATENCY_SLO_SECONDS = float(os.getenv("CHAT_LATENCY_SLO_SECONDS", 30))
+DEGRADED_LATENCY_WINDOW = int(os.getenv("DEGRADED_LATENCY_WINDOW", 10))
+DEGRADED_FAILURE_THRESHOLD = int(os.getenv("DEGRADED_FAILURE_THRESHOLD", 3))
+DEGRADED_RECOVERY_SECONDS = float(os.getenv("DEGRADED_RECOVERY_SECONDS", 30))
+DEGRADED_ANSWER_CACHE_SIZE = int(os.getenv("DEGRADED_ANSWER_CACHE_SIZE", 256))
+
+# --- Query log ---
+# Sampled, anonymized /chat records (query, session hash, route, retrieved ids,
+# stage timings) appended as JSONL to QUERY_LOG_PATH, rotated by size. Empty path
+# disables it. Replay a capture with: python replay_queries.py <log>
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "")
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", 0.1))
+QUERY_LOG_MAX_BYTES = int(os.getenv("QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024))
+QUERY_LOG_BACKUPS = int(os.getenv("QUERY_LOG_BACKUPS", 5))
+# Salt of the session hash, so hashes cannot be matched to session ids. Without
+# it a random salt is drawn per process: hashes only group the turns of a session
+# until the next restart.
+QUERY_LOG_SALT = os.getenv("QUERY_LOG_SALT", "")
@@ -0,0 +1,199 @@
+import re
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# --- In-process counters ---
+# Shared by the API and the agent graph. Kept deliberately simple: monotonically
+# increasing integer counters keyed by name and labels, safe to bump from worker
+# threads. Names are fixed; variable parts (tool, profile, reason...) go in
+# labels, so each name is a single metric family in /metrics.
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], int] = defaultdict(int)
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def increment(name: str, amount: int = 1, **labels) -> None:
+    """Adds `amount` to the counter `name` with these labels (created at zero on first use)."""
+    with _lock:
+        _counters[(name, _labels(labels))] += amount
+
+
+def get(name: str, **labels) -> int:
+    with _lock:
+        return _counters.get((name, _labels(labels)), 0)
+
+
+def by_label(name: str, label: str) -> Dict[str, int]:
+    """Counter `name` summed per value of `label`, e.g. by_label("chat_degraded", "reason")."""
+    totals: Dict[str, int] = defaultdict(int)
+    with _lock:
+        for (counter, labels), value in _counters.items():
+            if counter == name:
+                totals[dict(labels).get(label, "")] += value
+    return dict(sorted(totals.items()))
+
+
+def series_name(name: str, labels: Labels = ()) -> str:
+    """Readable key of one series, e.g. 'direct_return{tool=get_pqr_celsia}'."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+
+
+def snapshot() -> Dict[str, int]:
+    """Copy of every counter (keyed by series_name), for /health and benchmark reports."""
+    with _lock:
+        return {series_name(name, labels): value for (name, labels), value in sorted(_counters.items())}
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _gauges.clear()
+
+
+# --- Histograms, gauges and timing spans ---
+# A span times one stage of a request (LLM call, embedding, vector search, tool...)
+# into the `stage_seconds` histogram, counts it in `stage_errors` when it raises,
+# and is also collected per request inside `request_timings()`. Everything is
+# exported in Prometheus text format by `prometheus_text()` (GET /metrics).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+_gauges: Dict[Tuple[str, Labels], float] = defaultdict(float)
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> None:
+    """Records `value` in the histogram `name` (buckets are fixed on first use)."""
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def gauge_add(name: str, amount: float, **labels) -> None:
+    with _lock:
+        _gauges[(name, _labels(labels))] += amount
+
+
+@contextmanager
+def in_flight(name: str, **labels):
+    """Counts the enclosed work in the gauge `name` while it runs."""
+    gauge_add(name, 1, **labels)
+    try:
+        yield
+    finally:
+        gauge_add(name, -1, **labels)
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """Times one stage of the current request (works in sync and async code)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        increment("stage_errors", stage=stage, exception=type(e).__name__)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        observe("stage_seconds", seconds, stage=stage, **labels)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, seconds))
+
+
+@contextmanager
+def request_timings():
+    """Collects the spans of the enclosed request; yields {stage: total seconds}, filled on exit."""
+    spans: List[Tuple[str, float]] = []
+    totals: Dict[str, float] = {}
+    token = _request_spans.set(spans)
+    try:
+        yield totals
+    finally:
+        _request_spans.reset(token)
+        for stage, seconds in spans:
+            totals[stage] = round(totals.get(stage, 0.0) + seconds, 4)
+
+
+def _metric_name(name: str) -> str:
+    return "celsia_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    escaped = (key + '="' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for key, value in items)
+    return "{" + ",".join(escaped) + "}"
+
+
+def prometheus_text(gauges: Optional[Dict[str, float]] = None) -> str:
+    """Counters, gauges (plus `gauges` sampled by the caller) and histograms in Prometheus text format."""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        gauge_items = sorted(_gauges.items())
+        histograms = sorted(
+            ((key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in _histograms.items()),
+            key=lambda item: item[0],
+        )
+    typed = set()
+    for (name, labels), value in counters:
+        metric = _metric_name(name) + "_total"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), value in gauge_items + [((name, ()), value) for name, value in sorted((gauges or {}).items())]:
+        metric = _metric_name(name)
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        metric = _metric_name(name)
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{metric}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+        lines.append(f"{metric}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,101 @@
+import re
+import json
+import random
+import hashlib
+import secrets
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from src.utils.config import (
+    QUERY_LOG_PATH,
+    QUERY_LOG_SAMPLE_RATE,
+    QUERY_LOG_MAX_BYTES,
+    QUERY_LOG_BACKUPS,
+    QUERY_LOG_SALT,
+)
+
+# --- Query log ---
+# One JSON line per sampled /chat request, for tuning caches and retrievers
+# against real traffic (replay_queries.py). Fields are collected while the
+# request runs: /chat opens a `capture()` and the agent code adds to it with
+# `note()` (route, retrieved document ids). Queries are anonymized before writing:
+# e-mails, phone numbers and account / ID numbers are masked and session ids are
+# replaced by a salted hash.
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("query_log_record", default=None)
+
+# Never hash session ids unsalted: guessable ids would be reversible
+_SALT = QUERY_LOG_SALT or secrets.token_hex(16)
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Phone and ID shapes only, so dates ("2024-01-15") and amounts ("150.000") stay:
+#   - 6+ digits, optionally grouped by single spaces or hyphens, with an optional
+#     +country code or (area code): "3001234567", "+57 300 123 4567", "(602) 555-1234"
+#   - 8+ digits grouped by dots, not after "$": "52.123.456", "1.020.304.050"
+_DATE = r"\d{4}-\d{1,2}-\d{1,2}(?!\d)|\d{1,2}-\d{1,2}-\d{2,4}(?!\d)"
+_NUMBER = re.compile(
+    r"(?<![\w.,$/-])(?!" + _DATE + r")(?:\+\d{1,3}[ -]?)?(?:\(\d{1,4}\)[ -]?)?\d(?:[ -]?\d){5,}(?![\w.,/-]?\d)"
+    r"|(?<![\w.,$])(?:\d{2,3}\.\d{3}\.\d{3}|\d{1,3}(?:\.\d{3}){3,})(?![\w.,]?\d)"
+)
+
+
+def anonymize(text: str) -> str:
+    return _NUMBER.sub("<numero>", _EMAIL.sub("<email>", text))
+
+
+def session_hash(session_id: str) -> str:
+    return hashlib.sha256(f"{_SALT}{session_id}".encode()).hexdigest()[:16]
+
+
+@contextmanager
+def capture():
+    """Collects the `note()` fields of the enclosed request; yields the record."""
+    record: Dict[str, Any] = {}
+    token = _current.set(record)
+    try:
+        yield record
+    finally:
+        _current.reset(token)
+
+
+def note(**fields: Any) -> None:
+    """Adds fields to the record of the current request (no-op outside `capture()`)."""
+    record = _current.get()
+    if record is not None:
+        record.update(fields)
+
+
+def note_retrieved(docs) -> None:
+    note(retrieved=[doc.id or doc.metadata.get("source") for doc in docs])
+
+
+class QueryLog:
+    """Rotating JSONL writer; disabled when `path` is empty."""
+
+    def __init__(self, path: str, sample_rate: float, max_bytes: int, backups: int):
+        self.sample_rate = sample_rate
+        self.logger = None
+        if path:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger = logging.getLogger(f"celsia.query_log.{path}")
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+            self.logger.addHandler(handler)
+            if not QUERY_LOG_SALT:
+                print("⚠️ QUERY_LOG_SALT is not set: session hashes use a random per-process salt.")
+
+    @property
+    def enabled(self) -> bool:
+        return self.logger is not None and self.sample_rate > 0
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Writes `record` (already anonymized) if this request falls in the sample."""
+        if self.enabled and random.random() < self.sample_rate:
+            self.logger.info(json.dumps(record, ensure_ascii=False))
+
+
+QUERY_LOG = QueryLog(QUERY_LOG_PATH, QUERY_LOG_SAMPLE_RATE, QUERY_LOG_MAX_BYTES, QUERY_LOG_BACKUPS)
@@ -0,0 +1,89 @@
+import asyncio
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agent.core import RAG_FALLBACK_MESSAGE
+from src.agent.degraded import AnswerCache, DegradedMode, cacheable_answer, extractive_answer, fast_path_answer
+
+
+class StaticRetriever:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def ainvoke(self, query):
+        return self.docs
+
+
+def test_opens_on_failures_and_recovers_after_trial():
+    mode = DegradedMode(failure_threshold=2, recovery_seconds=0.05, latency_slo=1.0, window=3)
+    assert mode.check() == (None, False)
+
+    mode.record(error=RuntimeError("down"))
+    mode.record(error=RuntimeError("down"))
+    assert mode.check() == ("backend", False)
+
+    asyncio.run(asyncio.sleep(0.06))
+    # Only one trial request goes to the LLM while half-open
+    assert mode.check() == (None, True)
+    assert mode.check() == ("backend", False)
+
+    mode.record(latency=0.2, trial=True)
+    assert mode.state == "closed"
+    assert mode.check() == (None, False)
+
+
+def test_latency_slo_and_queue_triggers():
+    mode = DegradedMode(latency_slo=1.0, window=3, max_queue=4)
+    assert mode.check(queue_depth=4) == ("queue", False)
+    for latency in (2.0, 3.0, 0.5):
+        mode.record(latency=latency)
+    assert mode.check() == ("latency", False)
+
+
+def test_extractive_answer_sources():
+    cache = AnswerCache()
+    cache.put("¿Qué es Celsia?", "Celsia es una empresa de energía.")
+    retriever = StaticRetriever([Document(
+        page_content="Celsia opera en Colombia. Los paneles solares reducen la factura. El clima es variado.",
+        metadata={"source": "solar.txt"},
+    )])
+
+    answer, source = asyncio.run(extractive_answer("¿Cuál es el teléfono?", retriever, cache))
+    assert source == "fast_path" and "01 8000" in answer
+
+    answer, source = asyncio.run(extractive_answer("que es celsia", retriever, cache))
+    assert (answer, source) == ("Celsia es una empresa de energía.", "cache")
+
+    answer, source = asyncio.run(extractive_answer("¿Los paneles solares sirven?", retriever, cache))
+    assert source == "retrieval"
+    assert "Los paneles solares reducen la factura." in answer and "El clima" not in answer
+
+    answer, source = asyncio.run(extractive_answer("¿Los paneles solares sirven?", StaticRetriever([]), cache))
+    assert source == "fallback"
+
+
+def test_only_grounded_first_answers_are_cached():
+    question = HumanMessage("¿Qué es Celsia?")
+
+    def turn(*tool_messages):
+        return [question, AIMessage("", tool_calls=[]), *tool_messages, AIMessage("respuesta")]
+
+    rag = ToolMessage("Celsia es una empresa de energía.", name="BuscadorDocumentosCelsia", tool_call_id="1")
+    invoice = ToolMessage("Factura de la cuenta 123", name="generar_factura_simulada", tool_call_id="2")
+    failed = ToolMessage("Error", name="BuscadorDocumentosCelsia", tool_call_id="3", status="error")
+
+    assert cacheable_answer(turn(rag), "respuesta")
+    assert not cacheable_answer(turn(rag, invoice), "respuesta")
+    assert not cacheable_answer(turn(failed), "respuesta")
+    assert not cacheable_answer(turn(), "respuesta")
+    assert not cacheable_answer(turn(rag), RAG_FALLBACK_MESSAGE)
+    assert not cacheable_answer([HumanMessage("hola"), AIMessage("hola")] + turn(rag), "respuesta")
+
+
+def test_fast_path_needs_a_whole_phrase():
+    assert "01 8000" in fast_path_answer("¿Cuál es la línea de atención?")
+    assert fast_path_answer("¿Dónde pago la factura?") is not None
+    for question in ("¿Cuál es mi número de cuenta?", "¿Tienen línea de crédito?", "¿Por qué subió mi pago?",
+                     "¿Qué es la telefonía?"):
+        assert fast_path_answer(question) is None
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "notebooks", "web_scraping"))
+
+from linkedin_parser import parse_posts, parse_snapshots
+
+
+def post_html(urn, text, reactions="12", comments=None, reshared=None):
+    comments_html = f'<li class="social-details-social-counts__comments"><span>{comments} comentarios</span></li>' if comments else ""
+    nested = f'<div class="feed-shared-update-v2" data-urn="{reshared}"><p>original</p></div>' if reshared else ""
+    return f"""
+    <div class="feed-shared-update-v2 artdeco-card" data-urn="{urn}">
+      <span class="feed-shared-actor__sub-description">2 sem •</span>
+      <div class="feed-shared-update-v2__description"><span>{text}</span>
+        <a href="#">#energía</a></div>
+      {nested}
+      <span class="social-details-social-counts__reactions-count">{reactions}</span>
+      {comments_html}
+    </div>"""
+
+
+def snapshot(*posts):
+    return f"<html><body><main class='scaffold-layout__main'>{''.join(posts)}</main></body></html>"
+
+
+SNAPSHOT_1 = snapshot(
+    post_html("urn:li:activity:1", "Celsia  inaugura\n granja solar", comments="3"),
+    post_html("urn:li:activity:2", "Nueva tarifa", reshared="urn:li:activity:99"),
+)
+SNAPSHOT_2 = snapshot(
+    post_html("urn:li:activity:1", "Celsia inaugura granja solar", comments="3"),
+    post_html("urn:li:activity:2", "Nueva tarifa"),
+    post_html("urn:li:activity:3", "Movilidad eléctrica", reactions="1.024"),
+)
+
+
+def test_parse_posts_extracts_fields():
+    posts = parse_posts(SNAPSHOT_1)
+    assert [p["urn"] for p in posts] == ["urn:li:activity:1", "urn:li:activity:2"]
+    assert posts[0] == {
+        "text": "Celsia inaugura granja solar #energía",
+        "date": "2 sem •",
+        "reactions": "12",
+        "comments": "3 comentarios",
+        "urn": "urn:li:activity:1",
+    }
+    assert posts[1]["comments"] == "0"
+
+
+def test_parse_posts_skips_seen_urns():
+    seen = set()
+    assert len(parse_posts(SNAPSHOT_1, seen)) == 2
+    new_posts = parse_posts(SNAPSHOT_2, seen)
+    assert [p["urn"] for p in new_posts] == ["urn:li:activity:3"]
+    assert new_posts[0]["reactions"] == "1.024"
+
+
+def test_parse_snapshots_dedups_and_limits():
+    posts = parse_snapshots([SNAPSHOT_1, SNAPSHOT_2])
+    assert [p["post_id"] for p in posts] == [1, 2, 3]
+    assert parse_snapshots([SNAPSHOT_1, SNAPSHOT_2], max_posts=2)[-1]["urn"] == "urn:li:activity:2"
+
+
+def test_posts_without_urn_get_stable_ids():
+    html = snapshot('<div class="feed-shared-update-v2"><div class="feed-shared-update-v2__description">Hola</div></div>')
+    first, second = parse_posts(html), parse_posts(html)
+    assert first[0]["urn"].startswith("sha1:")
+    assert first[0]["urn"] == second[0]["urn"]
+
+
+def test_empty_snapshot():
+    assert parse_posts("") == []
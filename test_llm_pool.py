@@ -0,0 +1,202 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+from langchain_ollama import ChatOllama
+
+from src.agent.llm_pool import NoHealthyBackendError, OllamaPool, PooledChatOllama
+from src.utils import metrics
+
+
+class StubOllama:
+    """Minimal stand-in for an Ollama server: streams /api/chat as NDJSON."""
+
+    def __init__(self, name, delay=0.0, fail=False, tool_call=None, status=500):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.status = status
+        self.tool_call = tool_call
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if stub.fail:
+                    payload = json.dumps({"error": "model crashed"}).encode()
+                    self.send_response(stub.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                message = {"role": "assistant", "content": f"respuesta de {stub.name}"}
+                if stub.tool_call:
+                    message = {"role": "assistant", "content": "", "tool_calls": [{"function": stub.tool_call}]}
+                lines = [
+                    {"model": body["model"], "created_at": "2025-01-01T00:00:00Z", "message": message, "done": False},
+                    {"model": body["model"], "created_at": "2025-01-01T00:00:00Z",
+                     "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                     "total_duration": 1, "prompt_eval_count": 5, "eval_count": 3},
+                ]
+                payload = "".join(json.dumps(line) + "\n" for line in lines).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    created = []
+
+    def make(*args, **kwargs):
+        stub = StubOllama(*args, **kwargs)
+        created.append(stub)
+        return stub
+
+    yield make
+    for stub in created:
+        stub.close()
+
+
+def pooled(*stubs_, **pool_kwargs):
+    pool = OllamaPool(
+        [s.url for s in stubs_],
+        model_factory=lambda url: ChatOllama(model="qwen3:14b", base_url=url),
+        **pool_kwargs,
+    )
+    return PooledChatOllama(pool=pool)
+
+
+def test_routes_to_least_outstanding_backend(stubs):
+    a, b = stubs("a", delay=0.3), stubs("b", delay=0.3)
+    llm = pooled(a, b)
+    threads = [threading.Thread(target=llm.invoke, args=([HumanMessage("hola")],)) for _ in range(4)]
+    for t in threads:
+        t.start()
+        time.sleep(0.02)
+    for t in threads:
+        t.join()
+    assert (a.requests, b.requests) == (2, 2)
+
+
+def test_circuit_breaker_ejects_failing_backend(stubs):
+    bad, good = stubs("bad", fail=True), stubs("good")
+    llm = pooled(bad, good, failure_threshold=2, reset_timeout=0.5)
+
+    for _ in range(6):
+        assert llm.invoke([HumanMessage("hola")]).content == "respuesta de good"
+    # Ejected after two consecutive failures, then never tried while open
+    assert bad.requests == 2
+    assert llm.pool.status()[0]["state"] == "open"
+
+    # After the cool-down a single half-open trial goes to the bad backend again
+    time.sleep(0.6)
+    bad.fail = False
+    assert llm.invoke([HumanMessage("hola")]).content == "respuesta de bad"
+    assert bad.requests == 3
+    assert llm.pool.status()[0]["state"] == "closed"
+
+
+def test_all_backends_down_raises(stubs):
+    llm = pooled(stubs("x", fail=True), stubs("y", fail=True), failure_threshold=1, reset_timeout=60)
+    with pytest.raises(Exception):
+        llm.invoke([HumanMessage("hola")])
+    with pytest.raises(NoHealthyBackendError):
+        llm.invoke([HumanMessage("hola")])
+
+
+def test_hedges_slow_request_to_second_backend(stubs):
+    slow, fast = stubs("slow", delay=1.5), stubs("fast", delay=0.0)
+    llm = pooled(slow, fast, hedge=True, hedge_min_samples=5)
+    llm.pool.latencies.extend([0.1] * 5)
+    before = metrics.get("llm_pool_hedge_wins")
+
+    start = time.perf_counter()
+    result = llm.invoke([HumanMessage("hola")])
+    assert result.content == "respuesta de fast"
+    assert time.perf_counter() - start < 1.0
+    assert metrics.get("llm_pool_hedge_wins") == before + 1
+
+
+def test_async_hedge_cancels_loser(stubs):
+    slow, fast = stubs("slow", delay=1.0), stubs("fast")
+    llm = pooled(slow, fast, hedge=True, hedge_min_samples=5)
+    llm.pool.latencies.extend([0.05] * 5)
+    result = asyncio.run(llm.ainvoke([HumanMessage("hola")]))
+    assert result.content == "respuesta de fast"
+    assert all(b["outstanding"] == 0 for b in llm.pool.status())
+
+
+def test_bind_tools_returns_tool_calls(stubs):
+    @tool
+    def get_telefono_celsia() -> str:
+        """Teléfonos de Celsia."""
+        return "01 8000 112 115"
+
+    stub = stubs("tools", tool_call={"name": "get_telefono_celsia", "arguments": {}})
+    llm = pooled(stub, stubs("other", tool_call={"name": "get_telefono_celsia", "arguments": {}}))
+    message = llm.bind_tools([get_telefono_celsia]).invoke([HumanMessage("¿teléfono?")])
+    assert message.tool_calls[0]["name"] == "get_telefono_celsia"
+
+
+def test_cancelled_half_open_trial_keeps_the_breaker_open(stubs):
+    stub = stubs("slow", delay=1.0)
+    llm = pooled(stub, failure_threshold=2, reset_timeout=30)
+    backend = llm.pool.backends[0]
+    backend.consecutive_failures = 2
+    backend.opened_at = time.monotonic() - 31
+    assert backend.state == "half-open"
+
+    async def cancelled_trial():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(llm.ainvoke([HumanMessage("hola")]), 0.2)
+
+    asyncio.run(cancelled_trial())
+    assert llm.pool.status()[0]["state"] == "open"
+    assert llm.pool.status()[0]["outstanding"] == 0
+    assert backend.consecutive_failures == 2
+
+
+def test_stream_stopped_early_frees_the_backend(stubs):
+    llm = pooled(stubs("a"), stubs("b"))
+    stream = llm.stream([HumanMessage("hola")])
+    next(stream)
+    stream.close()
+    assert all(b["outstanding"] == 0 for b in llm.pool.status())
+
+
+def test_bad_request_is_raised_without_failover(stubs):
+    missing, other = stubs("missing", fail=True, status=404), stubs("other", fail=True, status=404)
+    llm = pooled(missing, other, failure_threshold=1)
+    for _ in range(3):
+        with pytest.raises(Exception) as error:
+            llm.invoke([HumanMessage("hola")])
+        assert getattr(error.value, "status_code", None) == 404
+    # Every call failed on one backend only and nobody was ejected
+    assert missing.requests + other.requests == 3
+    assert all(b["state"] == "closed" for b in llm.pool.status())
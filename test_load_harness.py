@@ -0,0 +1,27 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_load_harness_runs_offline(tmp_path):
+    # Own process: STUB_BACKENDS and the rest of the config are read at import time
+    result = subprocess.run(
+        [
+            sys.executable, "load_test.py", "--json",
+            "--sessions", "6", "--turns", "2", "--concurrency", "3",
+            "--token-latency", "0", "--max-chunks", "50", "--no-degraded",
+            "--persist-dir", str(tmp_path / "chroma"),
+        ],
+        cwd=ROOT, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["requests"] == 12
+    assert report["errors"] == 0
+    assert report["degraded"] == 0
+    assert report["checkpointed_sessions"] == 6
+    assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
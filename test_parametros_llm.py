@@ -3,33 +3,20 @@ Script para Probar el Efecto de los Parámetros del LLM
 Verifica que temperatura, top_k y top_p realmente afecten las respuestas
 """
 
-from langchain_ollama import ChatOllama
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 
+from src.agent.factory import get_chat_model, get_retriever
+
 print("=" * 80)
 print("🧪 PRUEBA DE PARÁMETROS DEL LLM")
 print("=" * 80)
 
-# Configurar embeddings y retriever
-embeddings = OllamaEmbeddings(
-    model="nomic-embed-text",
-    base_url="http://localhost:11434"
-)
-
-vectorstore = Chroma(
-    persist_directory="./chromadb_storage",
-    embedding_function=embeddings,
-    collection_name="rag_collection"
-)
-
-retriever = vectorstore.as_retriever(
-    search_type="mmr",
-    search_kwargs={"k": 5, "fetch_k": 20, "lambda_mult": 0.5}
-)
+# Retriever y cliente de Ollama compartidos (se crean una sola vez); solo los
+# parámetros de muestreo cambian entre pruebas y viajan en cada llamada.
+retriever = get_retriever(5)
+llm = get_chat_model("qwen3:4b")
 
 # Prompt simple
 prompt = PromptTemplate(
@@ -46,6 +33,15 @@ Respuesta:""",
 def formato_docs(docs):
     return "\n\n".join([doc.page_content for doc in docs])
 
+def cadena_rag(temperature, top_k, top_p):
+    """Cadena RAG con los parámetros indicados sobre el mismo retriever y cliente LLM."""
+    return (
+        {"context": retriever | formato_docs, "question": RunnablePassthrough()}
+        | prompt
+        | llm.bind(options={"temperature": temperature, "top_k": top_k, "top_p": top_p})
+        | StrOutputParser()
+    )
+
 # Pregunta de prueba
 pregunta = "¿Qué es Celsia y qué servicios ofrece?"
 
@@ -65,20 +61,7 @@ for temp in temperaturas:
     print(f"🔥 Temperatura: {temp}")
     print(f"{'─' * 80}")
     
-    llm = ChatOllama(
-        model="qwen3:4b",
-        base_url="http://localhost:11434",
-        temperature=temp,
-        top_k=40,
-        top_p=0.9
-    )
-    
-    rag_chain = (
-        {"context": retriever | formato_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    rag_chain = cadena_rag(temperature=temp, top_k=40, top_p=0.9)
     
     # Hacer 3 invocaciones para ver variabilidad
     print("\nRespuestas (3 intentos):")
@@ -100,20 +83,7 @@ for top_k in top_ks:
     print(f"🎯 Top-K: {top_k}")
     print(f"{'─' * 80}")
     
-    llm = ChatOllama(
-        model="qwen3:4b",
-        base_url="http://localhost:11434",
-        temperature=0.7,  # Temperatura media para ver efecto
-        top_k=top_k,
-        top_p=0.9
-    )
-    
-    rag_chain = (
-        {"context": retriever | formato_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    rag_chain = cadena_rag(temperature=0.7, top_k=top_k, top_p=0.9)
     
     print("\nRespuestas (2 intentos):")
     for i in range(2):
@@ -134,20 +104,7 @@ for top_p in top_ps:
     print(f"🎲 Top-P: {top_p}")
     print(f"{'─' * 80}")
     
-    llm = ChatOllama(
-        model="qwen3:4b",
-        base_url="http://localhost:11434",
-        temperature=0.7,
-        top_k=40,
-        top_p=top_p
-    )
-    
-    rag_chain = (
-        {"context": retriever | formato_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    rag_chain = cadena_rag(temperature=0.7, top_k=40, top_p=top_p)
     
     print("\nRespuestas (2 intentos):")
     for i in range(2):
@@ -0,0 +1,72 @@
+import threading
+
+from src.data.pipeline import IngestionPipeline
+
+URL = "https://www.celsia.com/es/noticias/tarifas"
+INTRO = "Celsia actualiza las tarifas de energía para hogares del Valle"
+DETAILS = [
+    "Las nuevas tarifas empiezan a regir desde el primer día de enero",
+    "El ajuste aplica solamente para clientes del mercado regulado",
+    "Los clientes pueden consultar su consumo en la aplicación móvil",
+]
+
+
+class FakeCollection:
+    """The subset of the Chroma collection API used by the pipeline."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def delete(self, where):
+        self.docs = {cid: d for cid, d in self.docs.items() if d["metadata"].get("source") != where["source"]}
+
+    def get(self, ids, include):
+        return {"ids": [cid for cid in ids if cid in self.docs]}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        for cid, document, metadata in zip(ids, documents, metadatas):
+            self.docs[cid] = {"document": document, "metadata": metadata}
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+
+def crawl(details, status):
+    def produce(emit):
+        emit("noticias", {"url": URL, "content": f"{INTRO}\n\n{details}", "crawl_status": status})
+    return produce
+
+
+def test_watch_passes_replace_changed_pages():
+    collection = FakeCollection()
+    pipeline = IngestionPipeline(collection, FakeEmbeddings(), chunk_size=80, chunk_overlap=0, max_wait=0.05)
+
+    for details, status in zip(DETAILS, ["new", "changed", "changed"]):
+        pipeline.run(crawl(details, status))
+        stored = sorted(d["document"] for d in collection.docs.values())
+        # The unchanged paragraph survives every pass; only the latest details are kept
+        assert stored == sorted([INTRO, details])
+
+
+class FailingEmbeddings:
+    def embed_documents(self, texts):
+        raise ValueError("embeddings API caída")
+
+
+def test_failing_stage_stops_the_pipeline():
+    pipeline = IngestionPipeline(FakeCollection(), FailingEmbeddings(), chunk_size=80, chunk_overlap=0, max_wait=0.05)
+    errors = []
+
+    def run():
+        try:
+            pipeline.run(crawl(DETAILS[0], "new"))
+        except RuntimeError as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert "embed" in str(errors[0]) and isinstance(errors[0].__cause__, ValueError)
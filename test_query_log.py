@@ -0,0 +1,22 @@
+from src.utils.query_log import anonymize
+
+
+def test_masks_phones_and_ids_but_keeps_dates_and_amounts():
+    masked = [
+        "mi cuenta 123456 no llega",
+        "llámame al +57 300 123 4567",
+        "el fijo es (602) 555-1234",
+        "cédula 1.020.304.050",
+    ]
+    for text in masked:
+        assert "<numero>" in anonymize(text)
+        assert not any(c.isdigit() for c in anonymize(text))
+
+    kept = [
+        "¿Por qué el 2024-01-15 me cobraron 150.000?",
+        "La factura del 15-01-2024 fue de $1.500.000",
+        "consumo de 300 kWh en 2024",
+    ]
+    for text in kept:
+        assert anonymize(text) == text
+    assert anonymize("escribe a ana.perez@correo.com") == "escribe a <email>"
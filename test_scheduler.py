@@ -0,0 +1,79 @@
+import asyncio
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agent.scheduler import (
+    PRIORITY_RAG,
+    PRIORITY_ROUTING,
+    DeadlineExceeded,
+    LLMScheduler,
+    ScheduledChatModel,
+    deadline_scope,
+)
+
+
+class SlowChat(BaseChatModel):
+    """Async-only chat model that records the order in which generations start."""
+
+    delay: float = 0.1
+    started: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.started.append(messages[-1].content)
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+
+def scheduled(scheduler, priority, **kwargs):
+    inner = SlowChat(started=[], **kwargs)
+    return inner, ScheduledChatModel(inner=inner, priority=priority, scheduler=scheduler)
+
+
+def test_routing_calls_jump_ahead_of_queued_rag():
+    async def scenario():
+        scheduler = LLMScheduler(1)
+        inner, rag = scheduled(scheduler, PRIORITY_RAG)
+        route = ScheduledChatModel(inner=inner, priority=PRIORITY_ROUTING, scheduler=scheduler)
+        first = asyncio.create_task(rag.ainvoke("rag-1"))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(first, rag.ainvoke("rag-2"), route.ainvoke("routing"))
+        return inner.started
+
+    assert asyncio.run(scenario()) == ["rag-1", "routing", "rag-2"]
+
+
+def test_deadline_applies_while_queued_and_while_generating():
+    async def scenario():
+        scheduler = LLMScheduler(1)
+        _, llm = scheduled(scheduler, PRIORITY_RAG, delay=1.0)
+        with deadline_scope(0.05):
+            results = await asyncio.gather(llm.ainvoke("running"), llm.ainvoke("queued"), return_exceptions=True)
+        return results, scheduler.status()
+
+    results, status = asyncio.run(scenario())
+    assert all(isinstance(r, DeadlineExceeded) for r in results)
+    assert status["active"] == 0 and status["waiting"] == 0
+
+
+def test_cancelling_caller_frees_the_slot():
+    async def scenario():
+        scheduler = LLMScheduler(1)
+        _, llm = scheduled(scheduler, PRIORITY_ROUTING, delay=1.0)
+        running = asyncio.create_task(llm.ainvoke("running"))
+        queued = asyncio.create_task(llm.ainvoke("queued"))
+        await asyncio.sleep(0.02)
+        running.cancel()
+        queued.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        return scheduler.status()
+
+    assert asyncio.run(scenario()) == {"active": 0, "waiting": 0, "max_concurrency": 1}
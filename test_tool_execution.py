@@ -0,0 +1,163 @@
+import time
+import asyncio
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.prebuilt import create_react_agent
+
+from src.agent import tool_execution
+from src.agent.scheduler import DeadlineExceeded
+
+
+class ScriptedChat(BaseChatModel):
+    """Emits all `tool_names` as one parallel step, then summarizes the tool results."""
+
+    tool_names: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if isinstance(messages[-1], HumanMessage):
+            calls = [{"name": name, "args": {}, "id": f"call-{i}"} for i, name in enumerate(self.tool_names)]
+            message = AIMessage(content="", tool_calls=calls)
+        else:
+            message = AIMessage(content=" | ".join(m.content for m in messages if m.type == "tool"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+@tool
+def telefono() -> str:
+    """Teléfono."""
+    time.sleep(0.3)
+    return "tel"
+
+
+@tool
+def direccion() -> str:
+    """Dirección."""
+    time.sleep(0.3)
+    return "dir"
+
+
+@tool
+def cortes() -> str:
+    """Cortes programados."""
+    time.sleep(2)
+    return "cortes"
+
+
+@tool(return_direct=True)
+def pqr() -> str:
+    """PQR."""
+    return "pqr"
+
+
+def run(tool_names):
+    graph = create_react_agent(
+        ScriptedChat(tool_names=tool_names),
+        tool_execution.create_tool_node([telefono, direccion, cortes, pqr]),
+    )
+    start = time.perf_counter()
+    messages = graph.invoke({"messages": [HumanMessage("hola")]})["messages"]
+    return messages, time.perf_counter() - start
+
+
+def test_tool_calls_overlap_time_out_and_keep_order(monkeypatch):
+    monkeypatch.setitem(tool_execution.TOOL_TIMEOUTS, "cortes", 0.5)
+    messages, elapsed = run(["telefono", "cortes", "direccion"])
+    assert elapsed < 1.0
+    tool_messages = [m for m in messages if m.type == "tool"]
+    assert [m.name for m in tool_messages] == ["telefono", "cortes", "direccion"]
+    assert tool_messages[1].status == "error"
+    assert messages[-1].content.startswith("tel | La herramienta cortes no respondió")
+
+
+def test_mixed_direct_step_still_gets_an_answer():
+    messages, _ = run(["pqr", "telefono"])
+    assert isinstance(messages[-1], AIMessage)
+    assert messages[-1].content == "pqr | tel"
+    # A step with only direct-return tools still ends on the tool output
+    messages, _ = run(["pqr"])
+    assert messages[-1].content == "pqr"
+
+
+@tool(return_direct=True)
+def estado_servicio(ciudad: str) -> str:
+    """Estado del servicio en una ciudad."""
+    return f"{ciudad}: sin interrupciones"
+
+
+class RetryingChat(BaseChatModel):
+    """Calls estado_servicio without arguments first, then fixes the call after the error."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "retrying-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        last = messages[-1]
+        if isinstance(last, HumanMessage):
+            message = AIMessage(content="", tool_calls=[{"name": "estado_servicio", "args": {}, "id": "call-0"}])
+        elif last.type == "tool" and last.status == "error":
+            message = AIMessage(content="", tool_calls=[{"name": "estado_servicio", "args": {"ciudad": "Cali"}, "id": "call-1"}])
+        else:
+            message = AIMessage(content="no debería llegar aquí")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_failed_direct_tool_goes_back_to_the_agent(monkeypatch):
+    from src.agent import core
+    from src.utils import metrics
+
+    graph = create_react_agent(RetryingChat(), tool_execution.create_tool_node([estado_servicio]))
+    messages = graph.invoke({"messages": [HumanMessage("¿Hay cortes?")]})["messages"]
+    tool_messages = [m for m in messages if m.type == "tool"]
+    assert [m.status for m in tool_messages] == ["error", "success"]
+
+    monkeypatch.setattr(core, "DIRECT_RETURN_TOOLS", ["estado_servicio"])
+    metrics.reset()
+    assert core.extract_final_response(messages) == "Cali: sin interrupciones"
+    assert metrics.get("direct_return", tool="estado_servicio") == 1
+    # The error alone (no retry) is never returned as the answer nor counted
+    metrics.reset()
+    assert core.extract_final_response(messages[:3]) != tool_messages[0].content
+    assert metrics.get("llm_calls_saved_direct_return") == 0
+
+
+@tool
+async def lento() -> str:
+    """Consulta lenta."""
+    await asyncio.sleep(2)
+    return "lento"
+
+
+@tool
+async def sin_tiempo() -> str:
+    """Consulta que agota el plazo de la petición."""
+    raise DeadlineExceeded("Chat request deadline exceeded.")
+
+
+def test_async_tool_times_out_but_deadline_propagates(monkeypatch):
+    monkeypatch.setitem(tool_execution.TOOL_TIMEOUTS, "lento", 0.3)
+    node = tool_execution.create_tool_node([lento, sin_tiempo])
+
+    def step(name):
+        graph = create_react_agent(ScriptedChat(tool_names=[name]), node)
+        return asyncio.run(graph.ainvoke({"messages": [HumanMessage("hola")]}))["messages"]
+
+    tool_message = next(m for m in step("lento") if m.type == "tool")
+    assert tool_message.status == "error"
+    assert tool_message.content.startswith("La herramienta lento no respondió")
+    with pytest.raises(DeadlineExceeded):
+        step("sin_tiempo")